@@ -40,10 +40,28 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 # Initialize the app with SQLAlchemy
 db.init_app(app)
 
+# Escritor en segundo plano del uso de API
+from services.api_usage_writer import api_usage_writer
+from services.api_analytics import usage_rollups
+api_usage_writer.init_app(app)
+api_usage_writer.add_listener(usage_rollups.ingest)
+
+# Medición automática de tiempos en todas las rutas /api/*
+from services.request_timing import init_request_timing
+init_request_timing(app)
+
+# Compresión gzip/brotli negociada por Accept-Encoding
+from services.compression import init_compression
+init_compression(app)
+
 with app.app_context():
     # Import models to create tables
     import models
     db.create_all()
+    
+    # Índices declarados en los modelos para tablas ya existentes
+    from db_migrations import apply_migrations
+    apply_migrations(db)
 
 # Import routes
 from routes import *
@@ -0,0 +1,104 @@
+"""
+Micro-benchmark del caché de utils.CacheManager
+Compara la latencia por acierto del esquema anterior (JSON con sangría, exists +
+getmtime + json.load en cada lectura) con el nivel de disco compacto y el LRU en memoria
+
+Uso:
+    python benchmark_cache.py              # resultados de búsqueda sintéticos
+    python benchmark_cache.py 200          # número de canciones por resultado
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+from typing import Any, Callable, Dict
+
+from utils import CacheManager
+from services.cache_backends import DiskBackend
+
+
+def resultado_busqueda(canciones: int) -> Dict[str, Any]:
+    """Resultado con la forma de search_songs"""
+    return {
+        'success': True,
+        'source': 'scraping',
+        'total': canciones,
+        'songs': [{
+            'id': f'song-{i}',
+            'title': f'Canción {i}',
+            'artist': f'Artista {random.randint(1, 50)}',
+            'album': f'Álbum {random.randint(1, 20)}',
+            'duration': random.randint(120, 360),
+            'preview_url': f'https://example.com/preview/{i}.mp3',
+            'image': f'https://example.com/cover/{i}.jpg',
+            'genres': ['pop', 'latino', 'regional'][: random.randint(1, 3)]
+        } for i in range(canciones)]
+    }
+
+
+def lectura_anterior(cache_dir: str, cache_key: str, duracion: int = 86400):
+    """Lectura de disco como la hacía CacheManager antes del nivel en memoria"""
+    cache_file = os.path.join(cache_dir, f"{cache_key}.json")
+    if not os.path.exists(cache_file):
+        return None
+    if time.time() - os.path.getmtime(cache_file) > duracion:
+        return None
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def medir(funcion: Callable[[], object], repeticiones: int) -> float:
+    """Microsegundos por acierto (mejor de 3 rondas)"""
+    mejores = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        mejores.append((time.perf_counter() - inicio) / repeticiones * 1e6)
+    return min(mejores)
+
+
+def run(canciones: int = 50, repeticiones: int = 2000) -> None:
+    datos = resultado_busqueda(canciones)
+    with tempfile.TemporaryDirectory() as directorio:
+        # Archivo con el formato anterior (indent=2) para la lectura de referencia
+        anterior = os.path.join(directorio, 'anterior')
+        os.makedirs(anterior)
+        with open(os.path.join(anterior, 'k.json'), 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, indent=2)
+
+        # Backend de disco explícito: la comparación no depende de CACHE_BACKEND
+        disco = CacheManager(memory_entries=0, backend=DiskBackend('disco', os.path.join(directorio, 'disco')))
+        disco.cache_data('k', dict(datos))
+        niveles = CacheManager(backend=DiskBackend('niveles', os.path.join(directorio, 'niveles')))
+        niveles.cache_data('k', dict(datos))
+
+        tam_anterior = os.path.getsize(os.path.join(anterior, 'k.json'))
+        tam_compacto = os.path.getsize(disco.backend.index.path_for(DiskBackend.file_key('k')))
+
+        casos = [
+            ('disco anterior (indent=2)', tam_anterior, lambda: lectura_anterior(anterior, 'k')),
+            ('disco compacto', tam_compacto, lambda: disco.get_cached_data('k')),
+            ('memoria LRU', tam_compacto, lambda: niveles.get_cached_data('k')),
+        ]
+
+        print(f"{canciones} canciones por resultado, {repeticiones} lecturas por ronda")
+        print(f"{'nivel':<28}{'KB':>8}{'µs/acierto':>14}{'mejora':>9}")
+        base = None
+        for nombre, tamano, leer in casos:
+            assert leer()['songs'] == datos['songs']
+            tiempo = medir(leer, repeticiones)
+            base = base or tiempo
+            print(f"{nombre:<28}{tamano / 1024:>8.1f}{tiempo:>14.1f}{base / tiempo:>8.1f}x")
+
+        print()
+        for nombre, manager in (('disco', disco), ('niveles', niveles)):
+            print(f"{nombre}: {json.dumps(manager.get_cache_stats()['tiers'])}")
+
+
+if __name__ == '__main__':
+    random.seed(2025)
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
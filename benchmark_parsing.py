@@ -0,0 +1,111 @@
+"""
+Micro-benchmark de parseo HTML para los scrapers de Panel L3HO
+Compara html.parser con árbol completo contra lxml con parseo parcial por región
+
+Uso:
+    python benchmark_parsing.py                 # páginas sintéticas
+    python benchmark_parsing.py pagina.html     # páginas reales guardadas (región 'tablas')
+"""
+
+import sys
+import time
+import random
+from typing import Callable, List, Tuple
+
+from bs4 import BeautifulSoup
+
+from services.html_parsing import parse_html, PARSER, ESPN_MATCH_CLASS, MATCH_CLASS, NEWS_CLASS
+
+
+def _ruido(n: int) -> str:
+    """Navegación, scripts y anuncios que rodean el contenido útil en las páginas reales"""
+    bloques = []
+    for i in range(n):
+        bloques.append(
+            f'<nav class="nav-{i}"><ul>' + ''.join(f'<li><a href="/s/{j}">Sección {j}</a></li>' for j in range(15)) + '</ul></nav>'
+            f'<script>window.__data_{i} = {{"k": {i}, "v": "{"x" * 200}"}};</script>'
+            f'<div class="ad-slot"><iframe src="/ad/{i}"></iframe><p>{"Publicidad " * 20}</p></div>'
+        )
+    return ''.join(bloques)
+
+
+def pagina_tabla() -> str:
+    filas = ''.join(
+        f'<tr class="Table__TR"><td>{i}</td><td><a href="/e/{i}">Equipo {i}</a></td>'
+        + ''.join(f'<td>{random.randint(0, 40)}</td>' for _ in range(8)) + '</tr>'
+        for i in range(1, 19)
+    )
+    return (f'<html><head><title>Tabla</title></head><body>{_ruido(60)}'
+            f'<div class="Table__Scroller"><table class="Table"><tr><th>Equipo</th></tr>{filas}</table></div>'
+            f'{_ruido(60)}</body></html>')
+
+
+def pagina_partidos() -> str:
+    tarjetas = ''.join(
+        f'<div class="ScoreCell"><span class="team">Local {i}</span><span class="score">{i % 4}</span>'
+        f'<span class="team">Visitante {i}</span><span class="status">Final</span></div>'
+        f'<article class="match-card">Local {i} vs Visitante {i} {i % 3}-{i % 2}</article>'
+        for i in range(20)
+    )
+    return f'<html><body>{_ruido(80)}{tarjetas}{_ruido(40)}</body></html>'
+
+
+def pagina_noticias() -> str:
+    articulos = ''.join(
+        f'<article class="news-item"><h3 class="title">Noticia {i}</h3><a href="/n/{i}">Leer</a>'
+        f'<time class="date">2025-08-{i % 28 + 1:02d}</time><p>{"Texto " * 50}</p></article>'
+        for i in range(25)
+    )
+    return f'<html><body>{_ruido(70)}{articulos}{_ruido(70)}</body></html>'
+
+
+# (nombre, html, región, extracción común a ambas variantes)
+CASOS: List[Tuple[str, Callable[[], str], str, Callable]] = [
+    ('tabla_posiciones', pagina_tabla, 'tablas',
+     lambda soup: [row.get_text('|', strip=True) for row in soup.find_all('tr')]),
+    ('partidos_espn', pagina_partidos, 'espn_partidos',
+     lambda soup: [div.get_text('|', strip=True) for div in soup.find_all('div', class_=ESPN_MATCH_CLASS)]),
+    ('partidos_ligamx', pagina_partidos, 'partidos',
+     lambda soup: [el.get_text('|', strip=True) for el in soup.find_all(['div', 'article'], class_=MATCH_CLASS)]),
+    ('noticias', pagina_noticias, 'noticias',
+     lambda soup: [el.get_text('|', strip=True) for el in soup.find_all(['article', 'div'], class_=NEWS_CLASS)]),
+]
+
+
+def medir(funcion: Callable[[], object], repeticiones: int) -> float:
+    """Milisegundos por ejecución (mejor de 3 rondas)"""
+    mejores = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        mejores.append((time.perf_counter() - inicio) / repeticiones * 1000)
+    return min(mejores)
+
+
+def run(archivos: List[str], repeticiones: int = 20) -> None:
+    casos = CASOS
+    if archivos:
+        casos = []
+        for ruta in archivos:
+            with open(ruta, 'rb') as f:
+                contenido = f.read()
+            casos.append((ruta, lambda contenido=contenido: contenido, 'tablas', CASOS[0][3]))
+
+    print(f"Parser rápido: {PARSER}")
+    print(f"{'página':<22}{'KB':>8}{'html.parser':>14}{'lxml+región':>14}{'mejora':>9}  resultado")
+    for nombre, generar, region, extraer in casos:
+        html = generar()
+        base = lambda: extraer(BeautifulSoup(html, 'html.parser'))
+        nuevo = lambda: extraer(parse_html(html, region))
+
+        iguales = base() == nuevo()
+        t_base = medir(base, repeticiones)
+        t_nuevo = medir(nuevo, repeticiones)
+        print(f"{nombre:<22}{len(html) / 1024:>8.1f}{t_base:>12.2f}ms{t_nuevo:>12.2f}ms"
+              f"{t_base / t_nuevo:>8.1f}x  {'idéntico' if iguales else 'DIFERENTE'}")
+
+
+if __name__ == '__main__':
+    random.seed(2025)
+    run(sys.argv[1:])
@@ -0,0 +1,242 @@
+"""
+Servidor de caché local con protocolo Redis (RESP2) para Panel L3HO
+Sustituto ligero de Redis para desarrollo y pruebas del backend CACHE_BACKEND=redis:
+todos los workers de gunicorn y el actualizador comparten su contenido.
+Solo implementa los comandos que usa services/cache_backends.py y algunos de diagnóstico.
+
+Uso:
+    python cache_server.py                 # 127.0.0.1:6379
+    python cache_server.py 6380            # otro puerto
+    CACHE_BACKEND=redis CACHE_REDIS_URL=redis://127.0.0.1:6380/0 gunicorn main:app
+"""
+
+import sys
+import time
+import fnmatch
+import threading
+import socketserver
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RespCommandError(Exception):
+    """Error devuelto al cliente como -ERR"""
+
+
+class CacheStore:
+    """Diccionario con expiración en milisegundos, protegido por un lock"""
+
+    def __init__(self):
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.commands = 0
+
+    def _live(self, key: bytes) -> Optional[Tuple[bytes, Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and time.time() >= entry[1]:
+            del self._data[key]
+            return None
+        return entry
+
+    def _purge(self) -> None:
+        ahora = time.time()
+        for key in [k for k, (_, exp) in self._data.items() if exp is not None and ahora >= exp]:
+            del self._data[key]
+
+    def execute(self, args: List[bytes]) -> Any:
+        if not args:
+            raise RespCommandError('empty command')
+        comando = args[0].upper().decode('ascii', 'replace')
+        handler = getattr(self, f'cmd_{comando.lower()}', None)
+        if handler is None:
+            raise RespCommandError(f"unknown command '{comando}'")
+        with self._lock:
+            self.commands += 1
+            return handler(*args[1:])
+
+    # ==================== COMANDOS ====================
+
+    def cmd_ping(self, *args: bytes) -> Any:
+        return args[0] if args else 'PONG'
+
+    def cmd_echo(self, mensaje: bytes) -> bytes:
+        return mensaje
+
+    def cmd_select(self, db: bytes) -> str:
+        return 'OK'
+
+    def cmd_auth(self, *args: bytes) -> str:
+        return 'OK'
+
+    def cmd_get(self, key: bytes) -> Optional[bytes]:
+        entry = self._live(key)
+        return entry[0] if entry else None
+
+    def cmd_set(self, key: bytes, value: bytes, *opciones: bytes) -> Optional[str]:
+        expires_at, nx, xx = None, False, False
+        i = 0
+        while i < len(opciones):
+            opcion = opciones[i].upper()
+            if opcion in (b'EX', b'PX') and i + 1 < len(opciones):
+                cantidad = int(opciones[i + 1])
+                if cantidad <= 0:
+                    raise RespCommandError("invalid expire time in 'set' command")
+                expires_at = time.time() + (cantidad if opcion == b'EX' else cantidad / 1000)
+                i += 2
+            elif opcion == b'NX':
+                nx, i = True, i + 1
+            elif opcion == b'XX':
+                xx, i = True, i + 1
+            else:
+                raise RespCommandError('syntax error')
+        existe = self._live(key) is not None
+        if (nx and existe) or (xx and not existe):
+            return None
+        self._data[key] = (value, expires_at)
+        return 'OK'
+
+    def cmd_del(self, *keys: bytes) -> int:
+        return sum(1 for key in keys if self._live(key) is not None and self._data.pop(key, None) is not None)
+
+    def cmd_exists(self, *keys: bytes) -> int:
+        return sum(1 for key in keys if self._live(key) is not None)
+
+    def cmd_expire(self, key: bytes, segundos: bytes) -> int:
+        return self.cmd_pexpire(key, str(int(segundos) * 1000).encode())
+
+    def cmd_pexpire(self, key: bytes, milisegundos: bytes) -> int:
+        entry = self._live(key)
+        if entry is None:
+            return 0
+        self._data[key] = (entry[0], time.time() + int(milisegundos) / 1000)
+        return 1
+
+    def cmd_pttl(self, key: bytes) -> int:
+        entry = self._live(key)
+        if entry is None:
+            return -2
+        if entry[1] is None:
+            return -1
+        return max(0, int((entry[1] - time.time()) * 1000))
+
+    def cmd_ttl(self, key: bytes) -> int:
+        pttl = self.cmd_pttl(key)
+        return pttl if pttl < 0 else (pttl + 999) // 1000
+
+    def cmd_keys(self, patron: bytes) -> List[bytes]:
+        self._purge()
+        return [key for key in self._data if fnmatch.fnmatchcase(key, patron)]
+
+    def cmd_scan(self, cursor: bytes, *opciones: bytes) -> List[Any]:
+        patron, cantidad = b'*', 10
+        for i in range(0, len(opciones) - 1, 2):
+            if opciones[i].upper() == b'MATCH':
+                patron = opciones[i + 1]
+            elif opciones[i].upper() == b'COUNT':
+                cantidad = int(opciones[i + 1])
+        self._purge()
+        # Cursor = posición en el orden de las claves; suficiente para un servidor de pruebas
+        claves = sorted(self._data)
+        inicio = int(cursor)
+        lote = claves[inicio:inicio + cantidad]
+        siguiente = inicio + cantidad if inicio + cantidad < len(claves) else 0
+        return [str(siguiente).encode(), [key for key in lote if fnmatch.fnmatchcase(key, patron)]]
+
+    def cmd_dbsize(self) -> int:
+        self._purge()
+        return len(self._data)
+
+    def cmd_flushdb(self, *args: bytes) -> str:
+        self._data.clear()
+        return 'OK'
+
+    cmd_flushall = cmd_flushdb
+
+    def cmd_info(self, *args: bytes) -> bytes:
+        self._purge()
+        lineas = [
+            '# Server', 'redis_version:7.0.0-l3ho', f'uptime_in_seconds:{int(time.time() - self.started_at)}',
+            '# Stats', f'total_commands_processed:{self.commands}',
+            '# Keyspace', f'db0:keys={len(self._data)}'
+        ]
+        return '\r\n'.join(lineas).encode()
+
+
+def encode(valor: Any) -> bytes:
+    """Serializar una respuesta en RESP2"""
+    if valor is None:
+        return b'$-1\r\n'
+    if isinstance(valor, RespCommandError):
+        return f'-ERR {valor}\r\n'.encode()
+    if isinstance(valor, str):
+        return f'+{valor}\r\n'.encode()
+    if isinstance(valor, int):
+        return b':%d\r\n' % valor
+    if isinstance(valor, bytes):
+        return b'$%d\r\n%s\r\n' % (len(valor), valor)
+    return b'*%d\r\n' % len(valor) + b''.join(encode(v) for v in valor)
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+    """Una conexión de cliente: lee arrays de bulk strings y responde en orden"""
+
+    def _read_command(self) -> Optional[List[bytes]]:
+        linea = self.rfile.readline()
+        if not linea:
+            return None
+        if not linea.startswith(b'*'):
+            # Comandos inline (redis-cli/telnet)
+            return linea.strip().split()
+        args = []
+        for _ in range(int(linea[1:-2])):
+            longitud = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(longitud + 2)[:-2])
+        return args
+
+    def handle(self) -> None:
+        while True:
+            try:
+                args = self._read_command()
+            except (OSError, ValueError):
+                return
+            if args is None:
+                return
+            if args and args[0].upper() == b'QUIT':
+                self.wfile.write(encode('OK'))
+                return
+            try:
+                respuesta = self.server.store.execute(args)
+            except RespCommandError as e:
+                respuesta = e
+            except (TypeError, ValueError):
+                respuesta = RespCommandError(f"wrong arguments for '{args[0].decode('ascii', 'replace')}' command")
+            try:
+                self.wfile.write(encode(respuesta))
+            except OSError:
+                return
+
+
+class CacheServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int]):
+        super().__init__(address, RespHandler)
+        self.store = CacheStore()
+
+
+def main(port: int = 6379, host: str = '127.0.0.1') -> None:
+    with CacheServer((host, port)) as server:
+        logger.info(f"Servidor de caché RESP escuchando en {host}:{port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Servidor de caché detenido")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 6379)
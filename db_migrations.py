@@ -0,0 +1,235 @@
+"""
+Migraciones de esquema para Panel L3HO
+db.create_all() solo crea tablas nuevas: aquí se agregan las columnas e
+índices declarados en los modelos a tablas ya existentes y se verifica con
+EXPLAIN que las consultas frecuentes usen índice.
+
+Uso:
+    python db_migrations.py          # aplicar migraciones y verificar planes
+"""
+
+import sys
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Any
+
+from sqlalchemy import inspect, select, func, or_
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(db) -> List[str]:
+    """Agregar con ALTER TABLE las columnas nuevas (nullable) de los modelos"""
+    engine = db.engine
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    existing_tables = set(inspector.get_table_names())
+    added = []
+
+    for table in db.metadata.tables.values():
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if column.primary_key or not column.nullable:
+                logger.warning(f"Columna {table.name}.{column.name} requiere migración manual (NOT NULL)")
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            ddl = (f'ALTER TABLE {preparer.format_table(table)} '
+                   f'ADD COLUMN {preparer.format_column(column)} {column_type}')
+            try:
+                with engine.begin() as connection:
+                    connection.exec_driver_sql(ddl)
+                added.append(f'{table.name}.{column.name}')
+                logger.info(f"Columna creada: {table.name}.{column.name}")
+            except Exception as e:
+                logger.error(f"Error creando columna {table.name}.{column.name}: {e}")
+
+    return added
+
+
+def apply_migrations(db) -> List[str]:
+    """Crear las columnas e índices declarados en los modelos que falten en la base de datos"""
+    created = add_missing_columns(db)
+
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in db.metadata.tables.values():
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing_indexes:
+                continue
+            try:
+                index.create(bind=engine, checkfirst=True)
+                created.append(index.name)
+                logger.info(f"Índice creado: {index.name} en {table.name}")
+            except Exception as e:
+                logger.error(f"Error creando índice {index.name}: {e}")
+
+    fingerprint_rollup_api_keys(db)
+    return created
+
+
+def fingerprint_rollup_api_keys(db) -> int:
+    """Reemplazar las API keys guardadas en claro en los rollups por su huella"""
+    from services.api_analytics import (API_KEY_FINGERPRINT_LENGTH, api_key_fingerprint,
+                                        histogram_percentile, load_histogram)
+    from models import ApiUsageRollup
+
+    try:
+        filas = ApiUsageRollup.query.filter(
+            ApiUsageRollup.dimension == 'api_key',
+            func.length(ApiUsageRollup.dimension_value) > API_KEY_FINGERPRINT_LENGTH
+        ).all()
+        for fila in filas:
+            huella = api_key_fingerprint(fila.dimension_value)
+            destino = ApiUsageRollup.query.filter_by(
+                granularity=fila.granularity, bucket_start=fila.bucket_start,
+                dimension='api_key', dimension_value=huella
+            ).first()
+            if destino is None:
+                fila.dimension_value = huella
+                db.session.flush()
+                continue
+            # Ya existe la cubeta con la huella: sumar los contadores y borrar la fila en claro
+            histograma = load_histogram(destino.latency_histogram)
+            for index, count in load_histogram(fila.latency_histogram).items():
+                histograma[index] += count
+            destino.request_count = (destino.request_count or 0) + (fila.request_count or 0)
+            destino.error_count = (destino.error_count or 0) + (fila.error_count or 0)
+            destino.total_response_time = (destino.total_response_time or 0.0) + (fila.total_response_time or 0.0)
+            destino.max_response_time = max(destino.max_response_time or 0.0, fila.max_response_time or 0.0)
+            destino.latency_histogram = json.dumps(histograma, separators=(',', ':'))
+            destino.p50_response_time = histogram_percentile(histograma, 0.50)
+            destino.p95_response_time = histogram_percentile(histograma, 0.95)
+            destino.p99_response_time = histogram_percentile(histograma, 0.99)
+            db.session.delete(fila)
+            db.session.flush()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error reemplazando API keys de los rollups: {e}")
+        return 0
+
+    if filas:
+        logger.info(f"API keys reemplazadas por huella en rollups: {len(filas)}")
+    return len(filas)
+
+
+def hot_queries() -> Dict[str, Any]:
+    """Consultas frecuentes de routes.py y routes_liga_mx.py que deben usar índice"""
+    from models import (LigaMXEquipo, LigaMXPosicion, LigaMXPartido, LigaMXNoticia,
+                        SystemLog, ApiUsage)
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    return {
+        'tabla_posiciones': select(LigaMXEquipo, LigaMXPosicion).join(
+            LigaMXPosicion, LigaMXEquipo.id == LigaMXPosicion.equipo_id
+        ).where(LigaMXPosicion.temporada == '2024').order_by(
+            LigaMXPosicion.puntos.desc(),
+            LigaMXPosicion.diferencia_goles.desc(),
+            LigaMXPosicion.goles_favor.desc()
+        ),
+        'posicion_equipo': select(LigaMXPosicion).where(
+            LigaMXPosicion.equipo_id == 1, LigaMXPosicion.temporada == '2024'
+        ),
+        'partidos_temporada': select(LigaMXPartido).where(
+            LigaMXPartido.temporada == '2024'
+        ).order_by(LigaMXPartido.fecha_partido.desc()).limit(10),
+        'resultados_recientes': select(LigaMXPartido).where(
+            LigaMXPartido.estado == 'finalizado',
+            LigaMXPartido.fecha_partido >= today
+        ).order_by(LigaMXPartido.fecha_partido.desc()),
+        'partidos_equipo': select(LigaMXPartido).where(
+            or_(LigaMXPartido.equipo_local_id == 1, LigaMXPartido.equipo_visitante_id == 1)
+        ).order_by(LigaMXPartido.fecha_partido.desc()).limit(5),
+        'noticias_activas': select(LigaMXNoticia).where(
+            LigaMXNoticia.is_active == True
+        ).order_by(LigaMXNoticia.created_at.desc()).limit(5),
+        'logs_hoy': select(func.count(SystemLog.id)).where(SystemLog.created_at >= today),
+        'logs_recientes': select(SystemLog).order_by(SystemLog.created_at.desc()).limit(10),
+        'uso_api_hoy': select(func.count(ApiUsage.id)).where(ApiUsage.created_at >= today),
+    }
+
+
+def _plan_uses_index(dialect: str, plan: List[str]) -> bool:
+    """Determinar si un plan de ejecución evita recorridos completos de tabla"""
+    if dialect == 'postgresql':
+        return not any('Seq Scan' in line for line in plan)
+    # SQLite: cada SCAN debe ir acompañado de un índice
+    for line in plan:
+        if line.startswith('SCAN') and 'USING' not in line:
+            return False
+    return True
+
+
+def check_query_plans(db) -> Dict[str, Dict[str, Any]]:
+    """Ejecutar EXPLAIN sobre las consultas frecuentes y reportar si usan índice"""
+    engine = db.engine
+    dialect = engine.dialect.name
+    results = {}
+
+    with engine.connect() as connection:
+        for name, statement in hot_queries().items():
+            compiled = statement.compile(dialect=engine.dialect)
+            params = compiled.construct_params()
+            if compiled.positional:
+                params = tuple(params[key] for key in compiled.positiontup)
+
+            transaction = connection.begin()
+            try:
+                if dialect == 'postgresql':
+                    # Con tablas pequeñas el planificador prefiere Seq Scan aunque exista índice
+                    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+                    rows = connection.exec_driver_sql(f'EXPLAIN {compiled}', params).fetchall()
+                    plan = [row[0] for row in rows]
+                elif dialect == 'sqlite':
+                    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params).fetchall()
+                    plan = [row[-1] for row in rows]
+                else:
+                    rows = connection.exec_driver_sql(f'EXPLAIN {compiled}', params).fetchall()
+                    plan = [' '.join(str(value) for value in row) for row in rows]
+            finally:
+                transaction.rollback()
+
+            results[name] = {
+                'uses_index': _plan_uses_index(dialect, plan),
+                'plan': plan
+            }
+
+    return results
+
+
+def run() -> int:
+    """Aplicar migraciones y verificar planes; devuelve código de salida"""
+    from app import app, db
+
+    with app.app_context():
+        created = apply_migrations(db)
+        print(f"Columnas e índices creados: {len(created)}")
+        for name in created:
+            print(f"  + {name}")
+
+        failures = 0
+        for name, result in check_query_plans(db).items():
+            status = 'OK ' if result['uses_index'] else 'SIN ÍNDICE'
+            print(f"[{status}] {name}")
+            if not result['uses_index']:
+                failures += 1
+                for line in result['plan']:
+                    print(f"      {line}")
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(run())
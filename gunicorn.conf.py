@@ -0,0 +1,34 @@
+"""
+Configuración de gunicorn para Panel L3HO
+gunicorn la carga automáticamente desde el directorio de trabajo; las opciones
+pasadas por línea de comandos (--bind, --workers, --reload) tienen prioridad.
+
+El stream SSE /api/transmisiones/stream mantiene conexiones abiertas durante
+horas: con workers síncronos cada suscriptor ocuparía un worker completo.
+Con gevent (dependencia del proyecto) cada conexión es un greenlet; si no está
+instalado se usan hilos y el número de suscriptores por worker se limita a la
+mitad de los hilos (SSE_MAX_SUBSCRIBERS): por encima el stream responde 503.
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+
+try:
+    import gevent  # noqa: F401
+    worker_class = 'gevent'
+    # Conexiones simultáneas por worker (suscriptores SSE incluidos)
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '2000'))
+    # Reservar conexiones para el resto de las peticiones
+    os.environ.setdefault('SSE_MAX_SUBSCRIBERS', str(max(1, worker_connections - 200)))
+except ImportError:
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', '32'))
+    # Cada suscriptor ocupa un hilo: dejar la mitad libres para la API
+    os.environ.setdefault('SSE_MAX_SUBSCRIBERS', str(max(1, threads // 2)))
+
+# El latido de los workers no depende de la duración de las peticiones en gevent/gthread
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
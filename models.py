@@ -116,8 +116,15 @@ class LigaMXPosicion(db.Model):
     diferencia_goles = db.Column(db.Integer, default=0)
     puntos = db.Column(db.Integer, default=0)
     fuente = db.Column(db.String(100))
+    fingerprint = db.Column(db.String(64))  # Hash del registro scrapeado normalizado
     ultima_actualizacion = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Tabla de posiciones: filtro por temporada y orden por puntos/diferencia/goles
+        db.Index('ix_liga_mx_posiciones_tabla', 'temporada', 'puntos', 'diferencia_goles', 'goles_favor'),
+        db.Index('ix_liga_mx_posiciones_equipo', 'equipo_id', 'temporada'),
+    )
 
 class LigaMXPartido(db.Model):
     """Partidos y calendario Liga MX"""
@@ -137,8 +144,17 @@ class LigaMXPartido(db.Model):
     asistencia = db.Column(db.Integer)
     minuto_actual = db.Column(db.Integer)
     fuente = db.Column(db.String(100))
+    fingerprint = db.Column(db.String(64))  # Hash del registro scrapeado normalizado
     ultima_actualizacion = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Calendario por temporada y resultados por estado, ordenados por fecha
+        db.Index('ix_liga_mx_partidos_temporada_fecha', 'temporada', 'fecha_partido'),
+        db.Index('ix_liga_mx_partidos_estado_fecha', 'estado', 'fecha_partido'),
+        db.Index('ix_liga_mx_partidos_local_fecha', 'equipo_local_id', 'fecha_partido'),
+        db.Index('ix_liga_mx_partidos_visitante_fecha', 'equipo_visitante_id', 'fecha_partido'),
+    )
 
 class LigaMXJugador(db.Model):
     """Jugadores Liga MX"""
@@ -157,6 +173,7 @@ class LigaMXJugador(db.Model):
     valor_mercado = db.Column(db.String(50))
     foto_url = db.Column(db.String(500))
     is_active = db.Column(db.Boolean, default=True)
+    fingerprint = db.Column(db.String(64))  # Hash del registro scrapeado normalizado
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -202,6 +219,11 @@ class LigaMXNoticia(db.Model):
     
     # Relación con equipo
     equipo = db.relationship('LigaMXEquipo', backref='noticias')
+    
+    __table_args__ = (
+        # Noticias activas más recientes
+        db.Index('ix_liga_mx_noticias_activas_fecha', 'is_active', 'created_at'),
+    )
 
 class LigaMXActualizacion(db.Model):
     """Log de actualizaciones del sistema Liga MX"""
@@ -209,7 +231,10 @@ class LigaMXActualizacion(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     tipo_actualizacion = db.Column(db.String(100), nullable=False)  # tabla, calendario, jugadores, etc.
-    elementos_actualizados = db.Column(db.Integer, default=0)
+    elementos_actualizados = db.Column(db.Integer, default=0)  # Insertados + modificados
+    elementos_insertados = db.Column(db.Integer, default=0)
+    elementos_modificados = db.Column(db.Integer, default=0)
+    elementos_sin_cambios = db.Column(db.Integer, default=0)
     fuentes_consultadas = db.Column(db.Text)  # JSON con fuentes usadas
     errores = db.Column(db.Text)  # JSON con errores encontrados
     tiempo_ejecucion = db.Column(db.Float)  # Segundos
@@ -233,6 +258,21 @@ class LigaMXActualizacion(db.Model):
         """Establece las configuraciones desde un diccionario"""
         self.settings = json.dumps(settings_dict)
 
+class LigaMXCambio(db.Model):
+    """Registro monotónico de inserciones y modificaciones de datos Liga MX (cursor de since=)"""
+    __tablename__ = 'liga_mx_cambios'
+
+    id = db.Column(db.Integer, primary_key=True)  # Cursor: siempre creciente
+    entidad = db.Column(db.String(30), nullable=False)  # partido, noticia, posicion, jugador
+    registro_id = db.Column(db.Integer, nullable=False)
+    operacion = db.Column(db.String(10), nullable=False)  # insert, update
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Cambios de una entidad posteriores a un cursor
+        db.Index('ix_liga_mx_cambios_entidad_id', 'entidad', 'id'),
+    )
+
 # Modelos de contenido temporalmente comentados para evitar errores de relación
 # class ContentItem(db.Model):
 #     """Items de contenido individual para cada sección"""
@@ -270,6 +310,11 @@ class SystemLog(db.Model):
     
     # Relación con usuario
     user = db.relationship('User', backref='system_logs')
+    
+    __table_args__ = (
+        db.Index('ix_system_log_created_at', 'created_at'),
+        db.Index('ix_system_log_level_created_at', 'level', 'created_at'),
+    )
 
 class Notification(db.Model):
     """Sistema de notificaciones internas"""
@@ -319,3 +364,30 @@ class ApiUsage(db.Model):
     
     # Relación con usuario
     user = db.relationship('User', backref='api_usage')
+    
+    __table_args__ = (
+        db.Index('ix_api_usage_created_at', 'created_at'),
+    )
+
+class ApiUsageRollup(db.Model):
+    """Agregados incrementales de uso de API por minuto, hora y día"""
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(10), nullable=False)  # minute, hour, day
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    dimension = db.Column(db.String(20), nullable=False)  # total, endpoint, api_key
+    dimension_value = db.Column(db.String(255), nullable=False, default='')
+    request_count = db.Column(db.Integer, default=0)
+    error_count = db.Column(db.Integer, default=0)  # Respuestas con status >= 400
+    total_response_time = db.Column(db.Float, default=0.0)  # En milisegundos
+    max_response_time = db.Column(db.Float, default=0.0)
+    latency_histogram = db.Column(db.Text)  # JSON con conteos por cubeta de latencia
+    p50_response_time = db.Column(db.Float)
+    p95_response_time = db.Column(db.Float)
+    p99_response_time = db.Column(db.Float)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('granularity', 'bucket_start', 'dimension', 'dimension_value',
+                            name='uq_api_usage_rollup_bucket'),
+        db.Index('ix_api_usage_rollup_lookup', 'granularity', 'dimension', 'bucket_start'),
+    )
@@ -1,13 +1,20 @@
-from flask import render_template, request, redirect, url_for, session, flash, jsonify, send_from_directory
+from flask import render_template, request, redirect, url_for, session, flash, jsonify, send_from_directory, g, Response
 from werkzeug.security import generate_password_hash
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import ClosingIterator
 from app import app, db
 from models import (User, ApiKey, WebsiteControl, ContentSection, 
-                   MediaFile, SystemLog, Notification, ScheduledTask, ApiUsage,
+                   MediaFile, SystemLog, Notification, ScheduledTask,
                    LigaMXEquipo, LigaMXPosicion, LigaMXPartido, LigaMXJugador, 
                    LigaMXEstadisticaJugador, LigaMXNoticia, LigaMXActualizacion)
-from services.futbol import FutbolService
-from services.transmisiones import TransmisionesService
+from services.registry import get_futbol_service, get_transmisiones_service, get_liga_mx_data_manager
+from services.api_key_cache import api_key_cache
+from services.api_analytics import usage_rollups
+from services.dashboard_stats import dashboard_stats
+from services.response_cache import response_cache
+from services.single_flight import single_flight_stats
+from services.live_matches import live_match_engine, resumen_partido
+from services.compression import compression_stats
 # from services.content_manager import ContentManager  # Temporalmente comentado
 from datetime import datetime, timedelta
 import requests
@@ -80,15 +87,16 @@ def dashboard():
         return redirect(url_for('login'))
     
     # Get statistics
+    counters = dashboard_stats.get_stats()
     stats = {
-        'total_apis': ApiKey.query.count(),
-        'active_apis': ApiKey.query.filter_by(is_active=True).count(),
-        'total_websites': WebsiteControl.query.count(),
-        'active_websites': WebsiteControl.query.filter_by(status='active').count(),
-        'movies_sites': WebsiteControl.query.filter_by(category='movies').count(),
-        'music_sites': WebsiteControl.query.filter_by(category='music').count(),
-        'mod_apps_sites': WebsiteControl.query.filter_by(category='mod_apps').count(),
-        'football_sites': WebsiteControl.query.filter_by(category='football').count()
+        'total_apis': counters['total_apis'],
+        'active_apis': counters['active_apis'],
+        'total_websites': counters['total_websites'],
+        'active_websites': counters['active_websites'],
+        'movies_sites': counters['movies_sites'],
+        'music_sites': counters['music_sites'],
+        'mod_apps_sites': counters['mod_apps_sites'],
+        'football_sites': counters['football_sites']
     }
     
     recent_websites = WebsiteControl.query.order_by(WebsiteControl.created_at.desc()).limit(5).all()
@@ -315,15 +323,16 @@ def require_api_key(f):
                 'message': 'Incluye el parámetro ?key=TU_API_KEY en la URL'
             }), 401
         
-        # Verificar que la API key existe y pertenece a un usuario válido
-        user = User.query.filter_by(api_key=api_key).first()
+        # Verificar que la API key existe y pertenece a un usuario válido (resuelto desde caché)
+        user = api_key_cache.resolve(api_key, 'api_key')
         if not user:
             return jsonify({
                 'error': 'API Key inválida',
                 'message': 'La clave proporcionada no es válida'
             }), 403
         
-        # Pasar el usuario al endpoint
+        # Pasar el usuario al endpoint y al registro de uso de API
+        g.api_user = user
         return f(user, *args, **kwargs)
     return decorated_function
 
@@ -338,15 +347,16 @@ def require_transmisiones_api_key(f):
                 'message': 'Incluye el parámetro ?key=TU_API_KEY_TRANSMISIONES en la URL'
             }), 401
         
-        # Verificar que la API key de transmisiones existe y pertenece a un usuario válido
-        user = User.query.filter_by(api_key_transmisiones=api_key).first()
+        # Verificar que la API key de transmisiones existe y pertenece a un usuario válido (resuelto desde caché)
+        user = api_key_cache.resolve(api_key, 'api_key_transmisiones')
         if not user:
             return jsonify({
                 'error': 'API Key de transmisiones inválida',
                 'message': 'La clave proporcionada no es válida para transmisiones'
             }), 403
         
-        # Pasar el usuario al endpoint
+        # Pasar el usuario al endpoint y al registro de uso de API
+        g.api_user = user
         return f(user, *args, **kwargs)
     return decorated_function
 
@@ -354,17 +364,25 @@ def require_transmisiones_api_key(f):
 # API PRIVADA DE FÚTBOL
 # ========================================
 
+# Tabla y calendario salen del scraping en vivo, no de la base de datos: la versión del grupo
+# liga_mx no cambia con cada refresco, así que las respuestas se guardan poco tiempo para que
+# timestamp y data_age_seconds no queden congelados
+LIVE_SCRAPE_CACHE_TTL = 30
+
 @app.route('/api/tabla')
 @require_api_key
+# La API key va en la query string (?key=): forma parte de la clave de caché
+@response_cache.cached('liga_mx', ttl=LIVE_SCRAPE_CACHE_TTL, max_age=LIVE_SCRAPE_CACHE_TTL, private=True)
 def api_tabla_liga_mx(user):
     """API: Obtiene la tabla completa de posiciones de Liga MX con todos los datos"""
     try:
-        futbol_service = FutbolService()
+        futbol_service = get_futbol_service()
         tabla = futbol_service.get_liga_mx_tabla_completa()
         
         return jsonify({
             'success': True,
             'data': tabla,
+            'data_age_seconds': tabla.get('data_age_seconds'),
             'api_version': '2.0',
             'usuario': user.username,
             'timestamp': datetime.now().isoformat()
@@ -389,7 +407,7 @@ def api_jugadores_equipo(user):
         }), 400
     
     try:
-        futbol_service = FutbolService()
+        futbol_service = get_futbol_service()
         jugadores = futbol_service.get_jugadores_equipo(equipo)
         
         return jsonify({
@@ -419,7 +437,7 @@ def api_equipo_detallado(user):
         }), 400
     
     try:
-        futbol_service = FutbolService()
+        futbol_service = get_futbol_service()
         equipo_data = futbol_service.get_equipo_detallado(equipo)
         
         return jsonify({
@@ -448,7 +466,7 @@ def api_logo_equipo(user):
         }), 400
     
     try:
-        futbol_service = FutbolService()
+        futbol_service = get_futbol_service()
         equipo_data = futbol_service.get_equipo_detallado(equipo)
         
         if not equipo_data.get('success'):
@@ -480,10 +498,12 @@ def api_logo_equipo(user):
 
 @app.route('/api/calendario')
 @require_api_key
+# La API key va en la query string (?key=): forma parte de la clave de caché
+@response_cache.cached('liga_mx', ttl=LIVE_SCRAPE_CACHE_TTL, max_age=LIVE_SCRAPE_CACHE_TTL, private=True)
 def api_calendario_liga_mx(user):
     """API: Obtiene el calendario completo de partidos con resultados y próximos juegos"""
     try:
-        futbol_service = FutbolService()
+        futbol_service = get_futbol_service()
         calendario = futbol_service.get_calendario_completo()
         
         return jsonify({
@@ -505,7 +525,7 @@ def api_calendario_liga_mx(user):
 def api_estadisticas_globales(user):
     """API: Obtiene estadísticas globales y rankings de Liga MX"""
     try:
-        futbol_service = FutbolService()
+        futbol_service = get_futbol_service()
         estadisticas = futbol_service.get_estadisticas_globales()
         
         return jsonify({
@@ -527,7 +547,7 @@ def api_estadisticas_globales(user):
 def api_lista_equipos(user):
     """API: Lista todos los equipos de Liga MX con información básica"""
     try:
-        futbol_service = FutbolService()
+        futbol_service = get_futbol_service()
         equipos_lista = []
         
         for equipo_id in futbol_service.equipos_ligamx.keys():
@@ -721,8 +741,8 @@ def api_info(user):
 def api_transmisiones_en_vivo(user):
     """API Transmisiones: Obtiene todos los partidos en vivo con datos reales"""
     try:
-        transmisiones_service = TransmisionesService()
-        partidos = transmisiones_service.get_partidos_en_vivo()
+        # Datos del motor en vivo; solo se scrapea aquí si aún no hay un primer sondeo
+        partidos = live_match_engine.get_snapshot() or get_transmisiones_service().get_partidos_en_vivo()
         
         return jsonify({
             'success': True,
@@ -739,6 +759,72 @@ def api_transmisiones_en_vivo(user):
             'message': str(e)
         }), 500
 
+# Segundos entre comentarios de latido para que proxies y clientes no cierren la conexión
+SSE_HEARTBEAT = 15
+
+
+# Suscriptores SSE simultáneos por worker; gunicorn.conf.py lo ajusta al tipo de worker
+# para que los streams no acaparen los hilos que atienden el resto de las peticiones
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', '16'))
+
+
+def _sse(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    """Formatear un evento Server-Sent Events"""
+    lineas = []
+    if event_id is not None:
+        lineas.append(f"id: {event_id}")
+    lineas.append(f"event: {event}")
+    lineas.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return '\n'.join(lineas) + '\n\n'
+
+
+def _stream_transmisiones(cursor: Optional[int]):
+    """Estado completo al conectar (o al perder eventos) y después solo los cambios"""
+    yield f"retry: {SSE_HEARTBEAT * 1000}\n\n"
+    while True:
+        if cursor is None:
+            cursor = live_match_engine.sequence
+            partidos = [resumen_partido(p) for p in live_match_engine.get_matches()]
+            yield _sse('snapshot', {'partidos': partidos, 'timestamp': datetime.now().isoformat()},
+                       live_match_engine.event_id(cursor))
+
+        cambios, ultimo = live_match_engine.wait_for_changes(cursor, SSE_HEARTBEAT)
+        if cambios is None:
+            # El cliente se quedó atrás del registro de cambios: reenviar el estado completo
+            cursor = None
+            continue
+        if not cambios:
+            yield ": ping\n\n"
+            continue
+        for cambio in cambios:
+            yield _sse(cambio['tipo'], cambio, live_match_engine.event_id(cambio['seq']))
+        cursor = ultimo
+
+
+@app.route('/api/transmisiones/stream')
+@require_transmisiones_api_key
+def api_transmisiones_stream(user):
+    """API Transmisiones: Stream SSE con cambios de marcador, minuto y estado"""
+    # Ids "<época>-<secuencia>": al reconectar a otro worker se recibe el estado completo
+    cursor = live_match_engine.parse_event_id(
+        request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    )
+
+    if not live_match_engine.add_subscriber(SSE_MAX_SUBSCRIBERS):
+        return jsonify({
+            'success': False,
+            'error': 'Stream lleno',
+            'message': 'Demasiados suscriptores en este servidor, reintenta en unos segundos'
+        }), 503, {'Retry-After': str(SSE_HEARTBEAT)}
+
+    # Sin stream_with_context: la conexión a la base de datos se libera al empezar el stream.
+    # El lugar se libera al cerrar la respuesta, aunque el generador no haya empezado
+    stream = ClosingIterator(_stream_transmisiones(cursor), [live_match_engine.remove_subscriber])
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/api/transmisiones/detalle')
 @require_transmisiones_api_key
 def api_transmisiones_detalle(user):
@@ -751,7 +837,7 @@ def api_transmisiones_detalle(user):
         }), 400
     
     try:
-        transmisiones_service = TransmisionesService()
+        transmisiones_service = get_transmisiones_service()
         detalle = transmisiones_service.get_detalle_partido(partido_id)
         
         return jsonify({
@@ -799,6 +885,17 @@ def api_transmisiones_info(user):
                     'Partidos próximos y recientes del día'
                 ]
             },
+            '/api/transmisiones/stream': {
+                'descripcion': 'Stream Server-Sent Events con los cambios de los partidos en vivo',
+                'parametros': 'key (requerido)',
+                'ejemplo': '/api/transmisiones/stream?key=TU_API_KEY_TRANSMISIONES',
+                'datos_incluidos': [
+                    'Evento snapshot con todos los partidos al conectar',
+                    'Eventos cambio con marcador, minuto y estado',
+                    'Eventos nuevo y eliminado cuando entra o sale un partido',
+                    'Reanudación con la cabecera Last-Event-ID'
+                ]
+            },
             '/api/transmisiones/detalle': {
                 'descripcion': 'Detalles completos de un partido específico',
                 'parametros': 'key (requerido), id (requerido)',
@@ -883,9 +980,13 @@ def regenerate_api_key():
         return jsonify({'success': False, 'message': 'Usuario no encontrado'})
     
     # Generar nueva API key
+    old_key = user.api_key
     user.api_key = secrets.token_hex(32)
     db.session.commit()
     
+    # La key anterior debe dejar de funcionar de inmediato
+    api_key_cache.invalidate(old_key, user.api_key)
+    
     return jsonify({
         'success': True, 
         'message': 'API Key regenerada exitosamente',
@@ -987,11 +1088,16 @@ def api_status():
     if not valid_api:
         return jsonify({'error': 'Invalid API Key'}), 401
     
+    counters = dashboard_stats.get_stats()
     stats = {
-        'total_apis': ApiKey.query.count(),
-        'active_apis': ApiKey.query.filter_by(is_active=True).count(),
-        'total_websites': WebsiteControl.query.count(),
-        'active_websites': WebsiteControl.query.filter_by(status='active').count(),
+        'total_apis': counters['total_apis'],
+        'active_apis': counters['active_apis'],
+        'total_websites': counters['total_websites'],
+        'active_websites': counters['active_websites'],
+        'single_flight': single_flight_stats(),
+        'live_matches': live_match_engine.get_stats(),
+        'compression': compression_stats.get_stats(),
+        'response_cache': response_cache.get_stats(),
         'last_updated': datetime.utcnow().isoformat(),
         'system_status': 'operational'
     }
@@ -1027,16 +1133,15 @@ def master_panel():
     # #content_manager.initialize_default_sections()  # Temporalmente comentado
     
     # Obtener estadísticas del sistema
+    counters = dashboard_stats.get_stats()
     stats = {
-        'total_sections': ContentSection.query.count(),
-        'active_sections': ContentSection.query.filter_by(is_active=True).count(),
+        'total_sections': counters['total_sections'],
+        'active_sections': counters['active_sections'],
         # 'total_content': ContentItem.query.count(),  # Temporalmente comentado
         # 'published_content': ContentItem.query.filter_by(status='published').count(),  # Temporalmente comentado
-        'total_users': User.query.count(),
+        'total_users': counters['total_users'],
         'api_requests_today': get_api_requests_today(),
-        'system_logs_today': SystemLog.query.filter(
-            SystemLog.created_at >= datetime.now().date()
-        ).count(),
+        'system_logs_today': counters['system_logs_today'],
         'unread_notifications': get_unread_notifications_count(session.get('user_id'))
     }
     
@@ -1109,8 +1214,8 @@ def api_section_content(section_name):
                     'error': 'API Key inválida'
                 }), 403
             
-            # Registrar uso de API
-            record_api_usage(api_key, request.endpoint, user.id, request.remote_addr)
+            # Asociar el usuario al registro automático de uso de API
+            g.api_user = user
     
     # Obtener contenido
     # content_data = #content_manager.get_section_content(section_name, **kwargs)
@@ -1188,11 +1293,12 @@ def system_logs_panel():
     )
     
     # Obtener estadísticas
+    counters = dashboard_stats.get_stats()
     log_stats = {
-        'total': SystemLog.query.count(),
-        'today': SystemLog.query.filter(SystemLog.created_at >= datetime.now().date()).count(),
-        'errors': SystemLog.query.filter_by(level='ERROR').count(),
-        'warnings': SystemLog.query.filter_by(level='WARNING').count()
+        'total': counters['system_logs_total'],
+        'today': counters['system_logs_today'],
+        'errors': counters['system_logs_errors'],
+        'warnings': counters['system_logs_warnings']
     }
     
     return render_template('system_logs.html', logs=logs, log_stats=log_stats)
@@ -1412,6 +1518,7 @@ def analytics_dashboard():
         'user_activity': get_user_activity_stats(),
         'system_health': get_system_health_stats(),
         'top_endpoints': get_top_api_endpoints(),
+        'top_api_keys': get_top_api_keys(),
         'error_rates': get_error_rates_stats()
     }
     
@@ -1420,9 +1527,8 @@ def analytics_dashboard():
 # ==================== FUNCIONES AUXILIARES ====================
 
 def get_api_requests_today():
-    """Obtiene el número de requests API de hoy"""
-    today = datetime.now().date()
-    return ApiUsage.query.filter(ApiUsage.created_at >= today).count()
+    """Obtiene el número de requests API de hoy (desde los rollups diarios)"""
+    return usage_rollups.requests_today()
 
 def get_unread_notifications_count(user_id):
     """Obtiene el número de notificaciones no leídas"""
@@ -1443,26 +1549,9 @@ def get_recent_notifications(user_id, limit=5):
         (Notification.user_id == user_id) | (Notification.user_id.is_(None))
     ).order_by(Notification.created_at.desc()).limit(limit).all()
 
-def record_api_usage(api_key, endpoint, user_id, ip_address, status_code=200, response_time=None):
-    """Registra el uso de una API"""
-    try:
-        usage = ApiUsage()
-        usage.api_key = api_key
-        usage.endpoint = endpoint
-        usage.user_id = user_id
-        usage.ip_address = ip_address
-        usage.status_code = status_code
-        usage.response_time = response_time
-        
-        db.session.add(usage)
-        db.session.commit()
-    except Exception as e:
-        logging.error(f"Error registrando uso de API: {e}")
-
 def get_daily_api_usage(days=30):
     """Obtiene estadísticas de uso de API por día"""
-    # Implementación básica - se puede expandir
-    return []
+    return usage_rollups.daily_usage(days)
 
 def get_content_views_stats():
     """Obtiene estadísticas de vistas de contenido"""
@@ -1473,20 +1562,20 @@ def get_user_activity_stats():
     return {}
 
 def get_system_health_stats():
-    """Obtiene estadísticas de salud del sistema"""
-    return {
-        'status': 'healthy',
-        'uptime': '99.9%',
-        'response_time': '120ms'
-    }
+    """Obtiene estadísticas de salud del sistema (últimos 15 minutos)"""
+    return usage_rollups.health(minutes=15)
 
-def get_top_api_endpoints():
+def get_top_api_endpoints(limit=10):
     """Obtiene los endpoints API más utilizados"""
-    return []
+    return usage_rollups.top('endpoint', days=30, limit=limit)
+
+def get_top_api_keys(limit=10):
+    """Obtiene las API keys con más peticiones"""
+    return usage_rollups.top('api_key', days=30, limit=limit)
 
 def get_error_rates_stats():
-    """Obtiene estadísticas de errores"""
-    return {}
+    """Obtiene estadísticas de errores de las últimas 24 horas"""
+    return usage_rollups.error_rates(hours=24)
 
 # ==================== API PROFESIONAL DE MÚSICA ====================
 
@@ -1549,25 +1638,22 @@ def api_music_search_songs(user):
         
         # Verificar caché primero
         cache_key = cache_manager.get_cache_key(f"search_songs_{query}_{limit}")
-        cached_result = cache_manager.get_cached_data(cache_key)
         
-        if cached_result:
-            cached_result['from_cache'] = True
-            return jsonify(cached_result)
+        def cargar():
+            # Buscar canciones usando SCRAPING REAL como prioridad
+            result = scraping_service.search_songs(query, limit)
+            
+            # Si scraping falla, fallback a APIs oficiales
+            if not result['success']:
+                result = music_service.search_songs(query, limit)
+            return result
         
-        # Buscar canciones usando SCRAPING REAL como prioridad
-        result = scraping_service.search_songs(query, limit)
+        # Una sola búsqueda por clave aunque varios workers no la encuentren a la vez en caché
+        result, from_cache = cache_manager.get_or_fill(cache_key, cargar)
         
-        # Si scraping falla, fallback a APIs oficiales
-        if not result['success']:
-            result = music_service.search_songs(query, limit)
-        
-        if result['success']:
-            # Guardar en caché
-            cache_manager.cache_data(cache_key, result)
-            
-            # Registrar uso de API
-            record_api_usage(user.api_key, '/api/music/search/songs', user.id, request.remote_addr)
+        if from_cache:
+            result['from_cache'] = True
+            return jsonify(result)
         
         result['api_version'] = '1.0'
         result['usuario'] = user.username
@@ -1601,22 +1687,22 @@ def api_music_search_albums(user):
         
         # Verificar caché
         cache_key = cache_manager.get_cache_key(f"search_albums_{query}_{limit}")
-        cached_result = cache_manager.get_cached_data(cache_key)
         
-        if cached_result:
-            cached_result['from_cache'] = True
-            return jsonify(cached_result)
+        def cargar():
+            # Buscar álbumes usando SCRAPING REAL como prioridad
+            result = scraping_service.search_albums(query, limit)
+            
+            # Si scraping falla, fallback a APIs oficiales
+            if not result['success']:
+                result = music_service.search_albums(query, limit)
+            return result
         
-        # Buscar álbumes usando SCRAPING REAL como prioridad
-        result = scraping_service.search_albums(query, limit)
+        # Una sola búsqueda por clave aunque varios workers no la encuentren a la vez en caché
+        result, from_cache = cache_manager.get_or_fill(cache_key, cargar)
         
-        # Si scraping falla, fallback a APIs oficiales
-        if not result['success']:
-            result = music_service.search_albums(query, limit)
-        
-        if result['success']:
-            cache_manager.cache_data(cache_key, result)
-            record_api_usage(user.api_key, '/api/music/search/albums', user.id, request.remote_addr)
+        if from_cache:
+            result['from_cache'] = True
+            return jsonify(result)
         
         result['api_version'] = '1.0'
         result['usuario'] = user.username
@@ -1644,22 +1730,22 @@ def api_music_charts(user):
         
         # Verificar caché
         cache_key = cache_manager.get_cache_key(f"charts_{country}_{chart_type}_{limit}")
-        cached_result = cache_manager.get_cached_data(cache_key)
-        
-        if cached_result:
-            cached_result['from_cache'] = True
-            return jsonify(cached_result)
         
-        # Obtener charts usando SCRAPING REAL como prioridad
-        result = scraping_service.get_top_charts(country, limit)
+        def cargar():
+            # Obtener charts usando SCRAPING REAL como prioridad
+            result = scraping_service.get_top_charts(country, limit)
+            
+            # Si scraping falla, fallback a APIs oficiales
+            if not result['success']:
+                result = music_service.get_top_charts(country, chart_type, limit)
+            return result
         
-        # Si scraping falla, fallback a APIs oficiales
-        if not result['success']:
-            result = music_service.get_top_charts(country, chart_type, limit)
+        # Una sola búsqueda por clave aunque varios workers no la encuentren a la vez en caché
+        result, from_cache = cache_manager.get_or_fill(cache_key, cargar)
         
-        if result['success']:
-            cache_manager.cache_data(cache_key, result)
-            record_api_usage(user.api_key, '/api/music/charts', user.id, request.remote_addr)
+        if from_cache:
+            result['from_cache'] = True
+            return jsonify(result)
         
         result['api_version'] = '1.0'
         result['usuario'] = user.username
@@ -1683,18 +1769,15 @@ def api_music_artist_details(user, artist_name):
         
         # Verificar caché
         cache_key = cache_manager.get_cache_key(f"artist_{artist_name}")
-        cached_result = cache_manager.get_cached_data(cache_key)
         
-        if cached_result:
-            cached_result['from_cache'] = True
-            return jsonify(cached_result)
-        
-        # Obtener detalles del artista
-        result = music_service.get_artist_details(artist_name)
+        # Obtener detalles del artista (una sola consulta por clave entre workers)
+        result, from_cache = cache_manager.get_or_fill(
+            cache_key, lambda: music_service.get_artist_details(artist_name)
+        )
         
-        if result['success']:
-            cache_manager.cache_data(cache_key, result)
-            record_api_usage(user.api_key, f'/api/music/artist/{artist_name}', user.id, request.remote_addr)
+        if from_cache:
+            result['from_cache'] = True
+            return jsonify(result)
         
         result['api_version'] = '1.0'
         result['usuario'] = user.username
@@ -1727,22 +1810,22 @@ def api_music_lyrics(user):
         
         # Verificar caché
         cache_key = cache_manager.get_cache_key(f"lyrics_{song_title}_{artist_name}")
-        cached_result = cache_manager.get_cached_data(cache_key)
         
-        if cached_result:
-            cached_result['from_cache'] = True
-            return jsonify(cached_result)
+        def cargar():
+            # Obtener letras usando SCRAPING REAL como prioridad
+            result = scraping_service.get_song_lyrics(song_title, artist_name)
+            
+            # Si scraping falla, fallback a APIs oficiales
+            if not result['success']:
+                result = music_service.get_song_lyrics(song_title, artist_name)
+            return result
         
-        # Obtener letras usando SCRAPING REAL como prioridad
-        result = scraping_service.get_song_lyrics(song_title, artist_name)
+        # Una sola búsqueda por clave aunque varios workers no la encuentren a la vez en caché
+        result, from_cache = cache_manager.get_or_fill(cache_key, cargar)
         
-        # Si scraping falla, fallback a APIs oficiales
-        if not result['success']:
-            result = music_service.get_song_lyrics(song_title, artist_name)
-        
-        if result['success']:
-            cache_manager.cache_data(cache_key, result)
-            record_api_usage(user.api_key, '/api/music/lyrics', user.id, request.remote_addr)
+        if from_cache:
+            result['from_cache'] = True
+            return jsonify(result)
         
         result['api_version'] = '1.0'
         result['usuario'] = user.username
@@ -1791,17 +1874,6 @@ def api_music_download(user):
         if not result['success']:
             result = music_service.download_song(song_data, quality)
         
-        if result['success']:
-            record_api_usage(user.api_key, '/api/music/download', user.id, request.remote_addr)
-            
-            # Log de descarga
-            # #content_manager.log_system_action(
-            #     'INFO', 'MUSIC', 
-            #     f'Canción descargada: {song_data["title"]} - {song_data["artist"]}',
-            #     {'user_id': user.id, 'quality': quality, 'from_cache': result.get('from_cache', False)},
-            #     user.id
-            # )
-        
         result['api_version'] = '1.0'
         result['usuario'] = user.username
         result['timestamp'] = datetime.now().isoformat()
@@ -2146,8 +2218,7 @@ def football_module():
     
     try:
         # Actualizar datos reales automáticamente
-        from services.liga_mx_data_manager import LigaMXDataManager
-        data_manager = LigaMXDataManager()
+        data_manager = get_liga_mx_data_manager()
         
         # Obtener tabla actualizada con datos reales
         tabla_actualizada = data_manager.get_tabla_actualizada()
@@ -2185,8 +2256,7 @@ def football_module():
 def api_actualizar_datos_reales():
     """API para forzar actualización con datos reales desde fuentes mexicanas"""
     try:
-        from services.liga_mx_data_manager import LigaMXDataManager
-        data_manager = LigaMXDataManager()
+        data_manager = get_liga_mx_data_manager()
         
         # Forzar actualización desde fuentes reales
         result = data_manager.update_all_data()
@@ -2214,14 +2284,15 @@ def api_actualizar_datos_reales():
         })
 
 @app.route('/api/liga-mx/data-completa')
+@response_cache.cached('liga_mx')
 def api_liga_mx_data_completa():
     """API para obtener todos los datos de Liga MX desde base de datos (datos reales)"""
     try:
-        from services.liga_mx_data_manager import LigaMXDataManager
-        data_manager = LigaMXDataManager()
+        data_manager = get_liga_mx_data_manager()
         
-        # Obtener tabla actualizada
-        tabla_datos = data_manager.get_tabla_actualizada()
+        # Obtener tabla actualizada (snapshot materializado)
+        tabla_snapshot = data_manager.get_tabla_snapshot()
+        tabla_datos = tabla_snapshot['tabla']
         
         # Obtener partidos recientes del 2025
         partidos = LigaMXPartido.query.filter_by(temporada='2025').order_by(LigaMXPartido.fecha_partido.desc()).limit(10).all()
@@ -2234,6 +2305,7 @@ def api_liga_mx_data_completa():
         
         data = {
             'tabla': tabla_datos,
+            'tabla_version': tabla_snapshot['version'],
             'partidos': [{
                 'id': p.id,
                 'jornada': p.jornada,
@@ -2278,7 +2350,17 @@ def api_liga_mx_data_completa():
 
 # ==================== API PUBLICA PARA PAGINAS EXTERNAS ====================
 
+def _liga_mx_data_version():
+    """Marca de datos Liga MX: cambia cuando inicia o termina cualquier actualización (incluso en otro proceso)"""
+    return tuple(db.session.query(
+        db.func.max(LigaMXActualizacion.id),
+        db.func.count(LigaMXActualizacion.id).filter(LigaMXActualizacion.status == 'running')
+    ).one())
+
+response_cache.register_version_source('liga_mx', _liga_mx_data_version)
+
 @app.route('/api/public/liga-mx')
+@response_cache.cached('liga_mx', vary_headers=('X-API-Key',))
 def api_publica_liga_mx():
     """API pública para usar Liga MX en páginas externas"""
     
@@ -2299,11 +2381,11 @@ def api_publica_liga_mx():
         }), 403
     
     try:
-        from services.liga_mx_data_manager import LigaMXDataManager
-        data_manager = LigaMXDataManager()
+        data_manager = get_liga_mx_data_manager()
         
-        # Obtener datos actualizados
-        tabla_datos = data_manager.get_tabla_actualizada()
+        # Obtener datos actualizados (snapshot materializado)
+        tabla_snapshot = data_manager.get_tabla_snapshot()
+        tabla_datos = tabla_snapshot['tabla']
         
         # Obtener partidos recientes
         partidos = LigaMXPartido.query.filter_by(temporada='2024').order_by(LigaMXPartido.fecha_partido.desc()).limit(10).all()
@@ -2333,6 +2415,7 @@ def api_publica_liga_mx():
             } for n in noticias],
             'meta': {
                 'total_equipos': len(tabla_datos),
+                'tabla_version': tabla_snapshot['version'],
                 'fuentes': ['ESPN México', 'Mediotiempo', 'Liga MX Oficial'],
                 'ultima_actualizacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'api_version': '1.0'
@@ -2355,93 +2438,8 @@ def api_docs_liga_mx():
 
 # Endpoints públicos de Liga MX Apertura 2025 - TODOS los datos reales
 
-@app.route('/api/tabla')
-def api_tabla():
-    """Endpoint: /api/tabla - Tabla de posiciones Liga MX Apertura 2025"""
-    api_key = request.args.get('api_key')
-    if api_key != 'L3HO_LIGAMX_MASTER_KEY_2025_UNLIMITED':
-        return jsonify({'error': 'API key inválida'}), 401
-    
-    try:
-        # Tabla REAL Apertura 2025 - Jornada 4 (14 agosto 2025)
-        tabla_real = [
-            {'equipo': 'Pachuca', 'puntos': 12, 'partidos_jugados': 4, 'ganados': 4, 'empatados': 0, 'perdidos': 0, 'goles_favor': 8, 'goles_contra': 1, 'diferencia_goles': 7},
-            {'equipo': 'Tigres', 'puntos': 9, 'partidos_jugados': 3, 'ganados': 3, 'empatados': 0, 'perdidos': 0, 'goles_favor': 9, 'goles_contra': 2, 'diferencia_goles': 7},
-            {'equipo': 'Monterrey', 'puntos': 9, 'partidos_jugados': 4, 'ganados': 3, 'empatados': 0, 'perdidos': 1, 'goles_favor': 7, 'goles_contra': 3, 'diferencia_goles': 4},
-            {'equipo': 'Toluca', 'puntos': 9, 'partidos_jugados': 4, 'ganados': 3, 'empatados': 0, 'perdidos': 1, 'goles_favor': 8, 'goles_contra': 4, 'diferencia_goles': 4},
-            {'equipo': 'Cruz Azul', 'puntos': 7, 'partidos_jugados': 4, 'ganados': 2, 'empatados': 1, 'perdidos': 1, 'goles_favor': 7, 'goles_contra': 4, 'diferencia_goles': 3},
-            {'equipo': 'América', 'puntos': 7, 'partidos_jugados': 4, 'ganados': 2, 'empatados': 1, 'perdidos': 1, 'goles_favor': 5, 'goles_contra': 3, 'diferencia_goles': 2},
-            {'equipo': 'Pumas', 'puntos': 5, 'partidos_jugados': 4, 'ganados': 1, 'empatados': 2, 'perdidos': 1, 'goles_favor': 4, 'goles_contra': 4, 'diferencia_goles': 0},
-            {'equipo': 'Santos', 'puntos': 5, 'partidos_jugados': 4, 'ganados': 1, 'empatados': 2, 'perdidos': 1, 'goles_favor': 3, 'goles_contra': 3, 'diferencia_goles': 0},
-            {'equipo': 'León', 'puntos': 5, 'partidos_jugados': 4, 'ganados': 1, 'empatados': 2, 'perdidos': 1, 'goles_favor': 2, 'goles_contra': 2, 'diferencia_goles': 0},
-            {'equipo': 'Guadalajara', 'puntos': 4, 'partidos_jugados': 4, 'ganados': 1, 'empatados': 1, 'perdidos': 2, 'goles_favor': 3, 'goles_contra': 4, 'diferencia_goles': -1},
-            {'equipo': 'Tijuana', 'puntos': 4, 'partidos_jugados': 4, 'ganados': 1, 'empatados': 1, 'perdidos': 2, 'goles_favor': 2, 'goles_contra': 4, 'diferencia_goles': -2},
-            {'equipo': 'Necaxa', 'puntos': 4, 'partidos_jugados': 4, 'ganados': 1, 'empatados': 1, 'perdidos': 2, 'goles_favor': 3, 'goles_contra': 6, 'diferencia_goles': -3},
-            {'equipo': 'Atlas', 'puntos': 3, 'partidos_jugados': 4, 'ganados': 1, 'empatados': 0, 'perdidos': 3, 'goles_favor': 2, 'goles_contra': 6, 'diferencia_goles': -4},
-            {'equipo': 'Querétaro', 'puntos': 3, 'partidos_jugados': 4, 'ganados': 1, 'empatados': 0, 'perdidos': 3, 'goles_favor': 1, 'goles_contra': 5, 'diferencia_goles': -4},
-            {'equipo': 'Puebla', 'puntos': 2, 'partidos_jugados': 4, 'ganados': 0, 'empatados': 2, 'perdidos': 2, 'goles_favor': 2, 'goles_contra': 4, 'diferencia_goles': -2},
-            {'equipo': 'Juárez', 'puntos': 2, 'partidos_jugados': 4, 'ganados': 0, 'empatados': 2, 'perdidos': 2, 'goles_favor': 1, 'goles_contra': 3, 'diferencia_goles': -2},
-            {'equipo': 'San Luis', 'puntos': 1, 'partidos_jugados': 4, 'ganados': 0, 'empatados': 1, 'perdidos': 3, 'goles_favor': 1, 'goles_contra': 4, 'diferencia_goles': -3},
-            {'equipo': 'Mazatlán', 'puntos': 0, 'partidos_jugados': 4, 'ganados': 0, 'empatados': 0, 'perdidos': 4, 'goles_favor': 0, 'goles_contra': 7, 'diferencia_goles': -7}
-        ]
-        
-        return jsonify({
-            'temporada': 'Apertura 2025',
-            'jornada_actual': 4,
-            'tabla_posiciones': tabla_real,
-            'ultima_actualizacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'fuente': 'ESPN México, Mediotiempo, Liga MX Oficial'
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/calendario')
-def api_calendario():
-    """Endpoint: /api/calendario - Calendario de partidos REALES Apertura 2025"""
-    api_key = request.args.get('api_key')
-    if api_key != 'L3HO_LIGAMX_MASTER_KEY_2025_UNLIMITED':
-        return jsonify({'error': 'API key inválida'}), 401
-        
-    equipo = request.args.get('equipo')
-    
-    try:
-        # Partidos REALES Apertura 2025
-        partidos_reales = [
-            # JORNADA 4 - COMPLETADA (8-11 agosto)
-            {'jornada': 4, 'equipo_local': 'Pachuca', 'equipo_visitante': 'Atlas', 'fecha': '2025-08-08 21:00', 'goles_local': 4, 'goles_visitante': 0, 'estado': 'finalizado'},
-            {'jornada': 4, 'equipo_local': 'Puebla', 'equipo_visitante': 'América', 'fecha': '2025-08-09 19:00', 'goles_local': 1, 'goles_visitante': 2, 'estado': 'finalizado'},
-            {'jornada': 4, 'equipo_local': 'Monterrey', 'equipo_visitante': 'Mazatlán', 'fecha': '2025-08-09 21:00', 'goles_local': 3, 'goles_visitante': 0, 'estado': 'finalizado'},
-            {'jornada': 4, 'equipo_local': 'Santos', 'equipo_visitante': 'León', 'fecha': '2025-08-10 17:00', 'goles_local': 1, 'goles_visitante': 1, 'estado': 'finalizado'},
-            {'jornada': 4, 'equipo_local': 'Cruz Azul', 'equipo_visitante': 'Tijuana', 'fecha': '2025-08-10 19:00', 'goles_local': 2, 'goles_visitante': 0, 'estado': 'finalizado'},
-            {'jornada': 4, 'equipo_local': 'Toluca', 'equipo_visitante': 'Guadalajara', 'fecha': '2025-08-11 17:00', 'goles_local': 2, 'goles_visitante': 1, 'estado': 'finalizado'},
-            
-            # JORNADA 5 - PRÓXIMA (15-18 agosto)
-            {'jornada': 5, 'equipo_local': 'Puebla', 'equipo_visitante': 'San Luis', 'fecha': '2025-08-16 19:00', 'goles_local': None, 'goles_visitante': None, 'estado': 'programado'},
-            {'jornada': 5, 'equipo_local': 'Necaxa', 'equipo_visitante': 'León', 'fecha': '2025-08-16 21:00', 'goles_local': None, 'goles_visitante': None, 'estado': 'programado'},
-            {'jornada': 5, 'equipo_local': 'Guadalajara', 'equipo_visitante': 'Juárez', 'fecha': '2025-08-17 17:00', 'goles_local': None, 'goles_visitante': None, 'estado': 'programado'},
-            {'jornada': 5, 'equipo_local': 'Pachuca', 'equipo_visitante': 'Tijuana', 'fecha': '2025-08-17 19:00', 'goles_local': None, 'goles_visitante': None, 'estado': 'programado'},
-            {'jornada': 5, 'equipo_local': 'Tigres', 'equipo_visitante': 'América', 'fecha': '2025-08-17 21:00', 'goles_local': None, 'goles_visitante': None, 'estado': 'programado'},
-        ]
-        
-        # Filtrar por equipo si se especifica
-        if equipo:
-            partidos_filtrados = [p for p in partidos_reales 
-                                if equipo.lower() in p['equipo_local'].lower() or 
-                                   equipo.lower() in p['equipo_visitante'].lower()]
-        else:
-            partidos_filtrados = partidos_reales
-        
-        return jsonify({
-            'temporada': 'Apertura 2025',
-            'equipo_filtro': equipo or 'Todos',
-            'partidos': partidos_filtrados,
-            'total_partidos': len(partidos_filtrados),
-            'ultima_actualizacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
 @app.route('/api/goleadores')
+@response_cache.cached('liga_mx')
 def api_goleadores():
     """Endpoint: /api/goleadores - Tabla de goleadores REAL Apertura 2025"""
     api_key = request.args.get('api_key')
@@ -2506,6 +2504,7 @@ def api_jugadores():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/noticias')
+@response_cache.cached('liga_mx')
 def api_noticias():
     """Endpoint: /api/noticias - Noticias REALES de Liga MX"""
     api_key = request.args.get('api_key')
@@ -2637,12 +2636,13 @@ def api_liga_mx_tabla_quick():
 def api_stats():
     """API para estadísticas del dashboard"""
     try:
+        counters = dashboard_stats.get_stats()
         stats = {
-            'total_apis': ApiKey.query.count(),
-            'active_apis': ApiKey.query.filter_by(is_active=True).count(),
-            'total_websites': WebsiteControl.query.count(),
-            'active_websites': WebsiteControl.query.filter_by(status='active').count(),
-            'liga_mx_equipos': LigaMXEquipo.query.count(),
+            'total_apis': counters['total_apis'],
+            'active_apis': counters['active_apis'],
+            'total_websites': counters['total_websites'],
+            'active_websites': counters['active_websites'],
+            'liga_mx_equipos': counters['liga_mx_equipos'],
             'last_updated': datetime.utcnow().isoformat(),
             'system_status': 'operational'
         }
@@ -3,10 +3,15 @@ Rutas de la API Liga MX - Integrada con Panel L3HO
 Sistema profesional de datos de fútbol mexicano
 """
 
-from flask import jsonify, request, abort
+from flask import jsonify, request, abort, g
 from app import app, db
-from models import User, LigaMXEquipo, LigaMXPosicion, LigaMXPartido, LigaMXJugador, LigaMXEstadisticaJugador, LigaMXNoticia, LigaMXActualizacion
+from models import LigaMXEquipo, LigaMXPosicion, LigaMXPartido, LigaMXJugador, LigaMXEstadisticaJugador, LigaMXNoticia, LigaMXActualizacion
 from services.liga_mx import liga_mx_scraper
+from services.api_key_cache import api_key_cache
+from services.http_client import http_fetcher
+from services.change_log import change_log, parse_cursor, ordenar_por_ids, InvalidCursor
+from services.registry import get_liga_mx_data_manager
+from sqlalchemy.orm import aliased
 from datetime import datetime, timedelta
 from functools import wraps
 import json
@@ -32,9 +37,9 @@ def require_api_key(f):
                 'message': 'Incluye tu API key en el header Authorization: Bearer YOUR_KEY o como parámetro ?api_key=YOUR_KEY'
             }), 401
         
-        # Validar API key contra usuarios del panel
-        user = User.query.filter_by(api_key=api_key, is_admin=True).first()
-        if not user:
+        # Validar API key contra usuarios del panel (resuelto desde caché)
+        user = api_key_cache.resolve(api_key, 'api_key')
+        if not user or not user.is_admin:
             return jsonify({
                 'error': 'API key inválida',
                 'message': 'La API key proporcionada no es válida o no tiene permisos'
@@ -42,9 +47,30 @@ def require_api_key(f):
         
         # Agregar usuario a la request para uso posterior
         request.current_user = user
+        g.api_user = user
         return f(*args, **kwargs)
     return decorated_function
 
+def _partidos_query():
+    """Partidos con el nombre del equipo local y visitante (una tabla de equipos por lado)"""
+    local = aliased(LigaMXEquipo)
+    visitante = aliased(LigaMXEquipo)
+    query = db.session.query(LigaMXPartido, local.nombre.label('local'), visitante.nombre.label('visitante')).join(
+        local, LigaMXPartido.equipo_local_id == local.id
+    ).join(visitante, LigaMXPartido.equipo_visitante_id == visitante.id)
+    return query, local, visitante
+
+def _since_param():
+    """Cursor ?since= de la petición; None si no se envió"""
+    return parse_cursor(request.args.get('since'))
+
+def _cursor_invalido(e):
+    return jsonify({
+        'success': False,
+        'error': 'Cursor inválido',
+        'message': f'{e}. Use el valor de "cursor" de la respuesta anterior'
+    }), 400
+
 # ==================== ENDPOINTS PRINCIPALES ====================
 
 @app.route('/api/liga-mx/info', methods=['GET'])
@@ -60,7 +86,9 @@ def liga_mx_info():
             '/tabla': 'Tabla de posiciones actual',
             '/calendario': 'Calendario de partidos',
             '/calendario?fecha=YYYY-MM-DD': 'Partidos de una fecha específica',
+            '/calendario?since=CURSOR': 'Solo los partidos que cambiaron desde el cursor',
             '/resultados': 'Resultados recientes',
+            '/resultados?since=CURSOR': 'Solo los resultados que cambiaron desde el cursor',
             '/equipos': 'Lista de todos los equipos',
             '/equipos/{nombre}': 'Información específica de un equipo',
             '/jugadores': 'Lista de jugadores',
@@ -69,6 +97,7 @@ def liga_mx_info():
             '/estadisticas/asistencias': 'Tabla de asistencias',
             '/noticias': 'Noticias generales de Liga MX',
             '/noticias?equipo=NOMBRE': 'Noticias de un equipo específico',
+            '/noticias?since=CURSOR': 'Solo las noticias nuevas desde el cursor',
             '/actualizacion': 'Actualizar todos los datos (POST)',
             '/status': 'Estado del sistema'
         },
@@ -148,16 +177,18 @@ def get_tabla_posiciones():
 @app.route('/api/liga-mx/calendario', methods=['GET'])
 @require_api_key
 def get_calendario():
-    """Obtener calendario de partidos"""
+    """Obtener calendario de partidos (con ?since=CURSOR solo los partidos que cambiaron)"""
     try:
         fecha = request.args.get('fecha')
         equipo = request.args.get('equipo')
-        temporada = request.args.get('temporada', '2024')
+        try:
+            since = _since_param()
+        except InvalidCursor as e:
+            return _cursor_invalido(e)
+        # Con since solo se filtra por temporada si se pide explícitamente
+        temporada = request.args.get('temporada', None if since is not None else '2024')
         
-        query = db.session.query(LigaMXPartido, LigaMXEquipo.nombre.label('local'), 
-                                LigaMXEquipo.nombre.label('visitante')).join(
-            LigaMXEquipo, LigaMXPartido.equipo_local_id == LigaMXEquipo.id
-        ).join(LigaMXEquipo, LigaMXPartido.equipo_visitante_id == LigaMXEquipo.id, aliased=True)
+        query, local, visitante = _partidos_query()
         
         if fecha:
             try:
@@ -172,34 +203,47 @@ def get_calendario():
         
         if equipo:
             query = query.filter(
-                db.or_(LigaMXEquipo.nombre.ilike(f'%{equipo}%'),
-                       LigaMXEquipo.nombre.ilike(f'%{equipo}%'))
+                db.or_(local.nombre.ilike(f'%{equipo}%'),
+                       visitante.nombre.ilike(f'%{equipo}%'))
             )
         
-        partidos = query.filter(LigaMXPartido.temporada == temporada).order_by(LigaMXPartido.fecha_partido).all()
+        if temporada:
+            query = query.filter(LigaMXPartido.temporada == temporada)
+        
+        if since is not None:
+            cambios = change_log.since('partido', since)
+            partidos = query.filter(LigaMXPartido.id.in_(cambios['ids'])).all() if cambios['ids'] else []
+            partidos = ordenar_por_ids(partidos, cambios['ids'], clave=lambda fila: fila[0].id)
+            calendario = [_partido_calendario(partido, nombre_local, nombre_visitante)
+                          for partido, nombre_local, nombre_visitante in partidos]
+            return jsonify({
+                'success': True,
+                'data': calendario,
+                'total_partidos': len(calendario),
+                'since': since,
+                'cursor': cambios['cursor'],
+                'has_more': cambios['has_more'],
+                'filtros': {
+                    'fecha': fecha,
+                    'equipo': equipo,
+                    'temporada': temporada
+                },
+                'timestamp': datetime.utcnow().isoformat()
+            })
+        
+        # Cursor tomado antes de leer: los cambios posteriores llegarán en el siguiente since
+        cursor = change_log.latest_cursor()
+        partidos = query.order_by(LigaMXPartido.fecha_partido).all()
         
         if partidos:
-            calendario = []
-            for partido, local, visitante in partidos:
-                calendario.append({
-                    'id': partido.id,
-                    'jornada': partido.jornada,
-                    'equipo_local': local,
-                    'equipo_visitante': visitante,
-                    'fecha': partido.fecha_partido.isoformat() if partido.fecha_partido else None,
-                    'estado': partido.estado,
-                    'goles_local': partido.goles_local,
-                    'goles_visitante': partido.goles_visitante,
-                    'estadio': partido.estadio,
-                    'arbitro': partido.arbitro,
-                    'minuto_actual': partido.minuto_actual,
-                    'ultima_actualizacion': partido.ultima_actualizacion.isoformat()
-                })
+            calendario = [_partido_calendario(partido, nombre_local, nombre_visitante)
+                          for partido, nombre_local, nombre_visitante in partidos]
             
             return jsonify({
                 'success': True,
                 'data': calendario,
                 'total_partidos': len(calendario),
+                'cursor': cursor,
                 'filtros': {
                     'fecha': fecha,
                     'equipo': equipo,
@@ -226,6 +270,22 @@ def get_calendario():
             'message': str(e)
         }), 500
 
+def _partido_calendario(partido, local, visitante):
+    return {
+        'id': partido.id,
+        'jornada': partido.jornada,
+        'equipo_local': local,
+        'equipo_visitante': visitante,
+        'fecha': partido.fecha_partido.isoformat() if partido.fecha_partido else None,
+        'estado': partido.estado,
+        'goles_local': partido.goles_local,
+        'goles_visitante': partido.goles_visitante,
+        'estadio': partido.estadio,
+        'arbitro': partido.arbitro,
+        'minuto_actual': partido.minuto_actual,
+        'ultima_actualizacion': partido.ultima_actualizacion.isoformat() if partido.ultima_actualizacion else None
+    }
+
 @app.route('/api/liga-mx/equipos', methods=['GET'])
 @require_api_key
 def get_equipos():
@@ -387,10 +447,14 @@ def get_goleadores():
 @app.route('/api/liga-mx/noticias', methods=['GET'])
 @require_api_key
 def get_noticias():
-    """Obtener noticias de Liga MX"""
+    """Obtener noticias de Liga MX (con ?since=CURSOR solo las noticias nuevas)"""
     try:
         equipo = request.args.get('equipo')
         limit = int(request.args.get('limit', 10))
+        try:
+            since = _since_param()
+        except InvalidCursor as e:
+            return _cursor_invalido(e)
         
         query = LigaMXNoticia.query.filter_by(is_active=True)
         
@@ -399,27 +463,32 @@ def get_noticias():
             if equipo_obj:
                 query = query.filter_by(equipo_id=equipo_obj.id)
         
-        noticias = query.order_by(LigaMXNoticia.fecha_publicacion.desc()).limit(limit).all()
+        if since is not None:
+            cambios = change_log.since('noticia', since)
+            noticias = query.filter(LigaMXNoticia.id.in_(cambios['ids'])).all() if cambios['ids'] else []
+            noticias_data = [_noticia_dict(noticia) for noticia in ordenar_por_ids(noticias, cambios['ids'])]
+            return jsonify({
+                'success': True,
+                'data': noticias_data,
+                'total_noticias': len(noticias_data),
+                'since': since,
+                'cursor': cambios['cursor'],
+                'has_more': cambios['has_more'],
+                'filtros': {'equipo': equipo},
+                'timestamp': datetime.utcnow().isoformat()
+            })
+        
+        cursor = change_log.latest_cursor()
+        noticias = query.order_by(LigaMXNoticia.fecha.desc()).limit(limit).all()
         
         if noticias:
-            noticias_data = []
-            for noticia in noticias:
-                noticias_data.append({
-                    'id': noticia.id,
-                    'titulo': noticia.titulo,
-                    'contenido': noticia.contenido[:200] + '...' if noticia.contenido and len(noticia.contenido) > 200 else noticia.contenido,
-                    'url': noticia.url_externa,
-                    'imagen': noticia.imagen_url,
-                    'equipo': noticia.equipo.nombre if noticia.equipo else 'Liga MX',
-                    'categoria': noticia.categoria,
-                    'fecha_publicacion': noticia.fecha_publicacion.isoformat() if noticia.fecha_publicacion else None,
-                    'fuente': noticia.fuente
-                })
+            noticias_data = [_noticia_dict(noticia) for noticia in noticias]
             
             return jsonify({
                 'success': True,
                 'data': noticias_data,
                 'total_noticias': len(noticias_data),
+                'cursor': cursor,
                 'filtros': {'equipo': equipo},
                 'timestamp': datetime.utcnow().isoformat()
             })
@@ -442,6 +511,19 @@ def get_noticias():
             'message': str(e)
         }), 500
 
+def _noticia_dict(noticia):
+    return {
+        'id': noticia.id,
+        'titulo': noticia.titulo,
+        'contenido': noticia.resumen[:200] + '...' if noticia.resumen and len(noticia.resumen) > 200 else noticia.resumen,
+        'url': noticia.url,
+        'imagen': noticia.imagen_url,
+        'equipo': noticia.equipo.nombre if noticia.equipo else 'Liga MX',
+        'categoria': noticia.categoria,
+        'fecha_publicacion': noticia.fecha.isoformat() if noticia.fecha else None,
+        'fuente': noticia.fuente
+    }
+
 @app.route('/api/liga-mx/actualizacion', methods=['POST'])
 @require_api_key
 def actualizar_datos():
@@ -449,28 +531,31 @@ def actualizar_datos():
     try:
         start_time = time.time()
         
-        # Ejecutar actualización completa
-        resultados = liga_mx_scraper.update_all_data()
+        # Un solo scraping: el gestor guarda los datos, registra cada cambio para since=,
+        # deja su propio registro de actualización e invalida las respuestas cacheadas
+        persistencia = get_liga_mx_data_manager().update_all_data()
         
         execution_time = time.time() - start_time
         
-        # Registrar la actualización
-        actualizacion = LigaMXActualizacion(
-            tipo_actualizacion='completa',
-            elementos_actualizados=resultados.get('stats', {}).get('total_items', 0),
-            fuentes_consultadas=json.dumps(resultados.get('stats', {}).get('sources_used', [])),
-            tiempo_ejecucion=execution_time,
-            status='success',
-            detalles=json.dumps(resultados.get('stats', {}))
-        )
-        
-        db.session.add(actualizacion)
-        db.session.commit()
+        if 'error' in persistencia:
+            return jsonify({
+                'success': False,
+                'error': 'Error actualizando datos',
+                'message': persistencia['error']
+            }), 500
         
+        conteos = persistencia.get('conteos', {})
         return jsonify({
             'success': True,
             'message': 'Datos actualizados correctamente',
-            'estadisticas': resultados.get('stats', {}),
+            'estadisticas': {
+                'total_items': sum(conteo['insertados'] + conteo['actualizados'] for conteo in conteos.values()),
+                'sources_used': persistencia.get('fuentes_exitosas', []),
+                'errores': persistencia.get('errores', []),
+                'last_update': datetime.utcnow().isoformat()
+            },
+            'conteos': conteos,
+            'cursor': change_log.latest_cursor(),
             'tiempo_ejecucion': f"{execution_time:.2f}s",
             'timestamp': datetime.utcnow().isoformat()
         })
@@ -533,6 +618,8 @@ def get_status():
             'ultima_actualizacion': ultima_actualizacion.created_at.isoformat() if ultima_actualizacion else None,
             'fuentes': fuentes_estado,
             'cache_activo': len(liga_mx_scraper.cache),
+            'cache': liga_mx_scraper.cache.get_stats(),
+            'descargas_condicionales': http_fetcher.get_stats(),
             'uptime': datetime.utcnow().isoformat(),
             'timestamp': datetime.utcnow().isoformat()
         }
@@ -555,38 +642,51 @@ def get_status():
 @app.route('/api/liga-mx/resultados', methods=['GET'])
 @require_api_key
 def get_resultados():
-    """Obtener resultados recientes"""
+    """Obtener resultados recientes (con ?since=CURSOR solo los resultados que cambiaron)"""
     try:
         dias = int(request.args.get('dias', 7))
-        fecha_limite = datetime.utcnow() - timedelta(days=dias)
-        
-        resultados = db.session.query(LigaMXPartido, 
-                                    LigaMXEquipo.nombre.label('local'),
-                                    LigaMXEquipo.nombre.label('visitante')).join(
-            LigaMXEquipo, LigaMXPartido.equipo_local_id == LigaMXEquipo.id
-        ).join(LigaMXEquipo, LigaMXPartido.equipo_visitante_id == LigaMXEquipo.id, aliased=True).filter(
-            LigaMXPartido.estado == 'finalizado',
-            LigaMXPartido.fecha_partido >= fecha_limite
-        ).order_by(LigaMXPartido.fecha_partido.desc()).all()
+        try:
+            since = _since_param()
+        except InvalidCursor as e:
+            return _cursor_invalido(e)
+        
+        query, _, _ = _partidos_query()
+        query = query.filter(LigaMXPartido.estado == 'finalizado')
+        
+        if since is not None:
+            cambios = change_log.since('partido', since)
+            resultados = query.filter(LigaMXPartido.id.in_(cambios['ids'])).all() if cambios['ids'] else []
+            resultados = ordenar_por_ids(resultados, cambios['ids'], clave=lambda fila: fila[0].id)
+        else:
+            cursor = change_log.latest_cursor()
+            fecha_limite = datetime.utcnow() - timedelta(days=dias)
+            resultados = query.filter(
+                LigaMXPartido.fecha_partido >= fecha_limite
+            ).order_by(LigaMXPartido.fecha_partido.desc()).all()
         
         resultados_data = []
         for partido, local, visitante in resultados:
             resultados_data.append({
+                'id': partido.id,
                 'equipo_local': local,
                 'equipo_visitante': visitante,
                 'goles_local': partido.goles_local,
                 'goles_visitante': partido.goles_visitante,
-                'fecha': partido.fecha_partido.isoformat(),
+                'fecha': partido.fecha_partido.isoformat() if partido.fecha_partido else None,
                 'jornada': partido.jornada
             })
         
-        return jsonify({
+        respuesta = {
             'success': True,
             'data': resultados_data,
             'total_resultados': len(resultados_data),
-            'periodo': f'{dias} días',
             'timestamp': datetime.utcnow().isoformat()
-        })
+        }
+        if since is not None:
+            respuesta.update(since=since, cursor=cambios['cursor'], has_more=cambios['has_more'])
+        else:
+            respuesta.update(periodo=f'{dias} días', cursor=cursor)
+        return jsonify(respuesta)
         
     except Exception as e:
         return jsonify({
@@ -0,0 +1,345 @@
+"""
+Motor de agregación de uso de API para Panel L3HO
+Mantiene rollups por minuto, hora y día para que el dashboard no recorra ApiUsage
+"""
+
+import json
+import math
+import hashlib
+import time
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ('minute', 'hour', 'day')
+DIMENSIONS = ('total', 'endpoint', 'api_key')
+
+# Retención de cada granularidad
+RETENTION = {
+    'minute': timedelta(days=2),
+    'hour': timedelta(days=90),
+    'day': timedelta(days=730)
+}
+
+# Caracteres de sha256 que identifican una API key en los rollups (nunca se guarda la key)
+API_KEY_FINGERPRINT_LENGTH = 12
+
+# Cubetas geométricas de latencia (ms): límites superiores de 0.5 ms a ~2 min
+LATENCY_BOUNDS = [round(0.5 * (1.25 ** i), 3) for i in range(56)]
+
+
+def api_key_fingerprint(api_key: Optional[str]) -> str:
+    """Huella corta de la API key para la dimensión api_key ('' si no hay key)"""
+    if not api_key:
+        return ''
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:API_KEY_FINGERPRINT_LENGTH]
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Truncar una fecha al inicio de su cubeta"""
+    if granularity == 'minute':
+        return moment.replace(second=0, microsecond=0)
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def latency_bucket(response_time: float) -> int:
+    """Índice de la cubeta de latencia correspondiente"""
+    if response_time <= LATENCY_BOUNDS[0]:
+        return 0
+    index = int(math.ceil(math.log(response_time / 0.5, 1.25)))
+    return min(max(index, 0), len(LATENCY_BOUNDS))
+
+
+def histogram_percentile(histogram: Dict[int, int], quantile: float) -> Optional[float]:
+    """Estimar un percentil interpolando dentro de la cubeta del histograma"""
+    total = sum(histogram.values())
+    if total == 0:
+        return None
+
+    rank = quantile * total
+    seen = 0
+    for index in sorted(histogram):
+        count = histogram[index]
+        if seen + count >= rank:
+            upper = LATENCY_BOUNDS[index] if index < len(LATENCY_BOUNDS) else LATENCY_BOUNDS[-1] * 1.25
+            lower = LATENCY_BOUNDS[index - 1] if index > 0 else 0.0
+            fraction = (rank - seen) / count if count else 1.0
+            return round(lower + (upper - lower) * fraction, 2)
+        seen += count
+    return LATENCY_BOUNDS[-1]
+
+
+def load_histogram(raw: Optional[str]) -> Dict[int, int]:
+    """Histograma de latencia guardado en JSON como diccionario de conteos"""
+    histogram: Dict[int, int] = defaultdict(int)
+    if raw:
+        for index, count in json.loads(raw).items():
+            histogram[int(index)] += count
+    return histogram
+
+
+class RollupAccumulator:
+    """Agregado en memoria de una cubeta antes de fusionarlo con la base de datos"""
+
+    __slots__ = ('request_count', 'error_count', 'total_response_time', 'max_response_time', 'histogram')
+
+    def __init__(self):
+        self.request_count = 0
+        self.error_count = 0
+        self.total_response_time = 0.0
+        self.max_response_time = 0.0
+        self.histogram: Dict[int, int] = defaultdict(int)
+
+    def add(self, status_code: Optional[int], response_time: Optional[float]) -> None:
+        self.request_count += 1
+        if status_code is not None and status_code >= 400:
+            self.error_count += 1
+        if response_time is not None:
+            self.total_response_time += response_time
+            self.max_response_time = max(self.max_response_time, response_time)
+            self.histogram[latency_bucket(response_time)] += 1
+
+
+class ApiUsageRollups:
+    """Actualiza y consulta los rollups de ApiUsage"""
+
+    def __init__(self, prune_interval: int = 600):
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+
+    # ==================== ESCRITURA ====================
+
+    def ingest(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Fusionar un lote de registros de uso en los rollups (requiere contexto de aplicación)"""
+        from sqlalchemy.exc import IntegrityError
+        from app import db
+
+        accumulators = self._accumulate(rows)
+        if not accumulators:
+            return
+
+        # Un worker concurrente puede crear la misma cubeta: reintentar una vez
+        for attempt in range(2):
+            try:
+                self._merge(accumulators)
+                db.session.commit()
+                break
+            except IntegrityError:
+                db.session.rollback()
+                if attempt:
+                    logger.error("Conflicto persistente actualizando rollups de uso de API")
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error actualizando rollups de uso de API: {e}")
+                break
+
+        if time.monotonic() - self._last_prune > self.prune_interval:
+            self._last_prune = time.monotonic()
+            self.prune()
+
+    def prune(self) -> None:
+        """Eliminar rollups fuera del periodo de retención"""
+        from app import db
+        from models import ApiUsageRollup
+
+        now = datetime.utcnow()
+        try:
+            for granularity, retention in RETENTION.items():
+                ApiUsageRollup.query.filter(
+                    ApiUsageRollup.granularity == granularity,
+                    ApiUsageRollup.bucket_start < now - retention
+                ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error depurando rollups de uso de API: {e}")
+
+    def _accumulate(self, rows: Iterable[Dict[str, Any]]) -> Dict[Tuple[str, datetime, str, str], RollupAccumulator]:
+        """Agrupar los registros por granularidad, cubeta y dimensión"""
+        accumulators: Dict[Tuple[str, datetime, str, str], RollupAccumulator] = {}
+        for row in rows:
+            created_at = row.get('created_at') or datetime.utcnow()
+            dimensions = (
+                ('total', ''),
+                ('endpoint', (row.get('endpoint') or '')[:255]),
+                ('api_key', api_key_fingerprint(row.get('api_key')))
+            )
+            for granularity in GRANULARITIES:
+                start = bucket_start(created_at, granularity)
+                for dimension, value in dimensions:
+                    key = (granularity, start, dimension, value)
+                    accumulator = accumulators.get(key)
+                    if accumulator is None:
+                        accumulator = accumulators[key] = RollupAccumulator()
+                    accumulator.add(row.get('status_code'), row.get('response_time'))
+        return accumulators
+
+    def _merge(self, accumulators: Dict[Tuple[str, datetime, str, str], RollupAccumulator]) -> None:
+        """Sumar los acumuladores a las filas existentes o crear filas nuevas"""
+        from sqlalchemy import tuple_
+        from app import db
+        from models import ApiUsageRollup
+
+        keys = list(accumulators)
+        key_columns = tuple_(ApiUsageRollup.granularity, ApiUsageRollup.bucket_start,
+                             ApiUsageRollup.dimension, ApiUsageRollup.dimension_value)
+        existing = {
+            (r.granularity, r.bucket_start, r.dimension, r.dimension_value): r
+            for r in ApiUsageRollup.query.filter(key_columns.in_(keys)).with_for_update().all()
+        }
+
+        for key, accumulator in accumulators.items():
+            rollup = existing.get(key)
+            if rollup is None:
+                granularity, start, dimension, value = key
+                rollup = ApiUsageRollup(
+                    granularity=granularity,
+                    bucket_start=start,
+                    dimension=dimension,
+                    dimension_value=value,
+                    request_count=0,
+                    error_count=0,
+                    total_response_time=0.0,
+                    max_response_time=0.0
+                )
+                db.session.add(rollup)
+
+            histogram = load_histogram(rollup.latency_histogram)
+            for index, count in accumulator.histogram.items():
+                histogram[index] += count
+
+            rollup.request_count = (rollup.request_count or 0) + accumulator.request_count
+            rollup.error_count = (rollup.error_count or 0) + accumulator.error_count
+            rollup.total_response_time = (rollup.total_response_time or 0.0) + accumulator.total_response_time
+            rollup.max_response_time = max(rollup.max_response_time or 0.0, accumulator.max_response_time)
+            rollup.latency_histogram = json.dumps(histogram, separators=(',', ':'))
+            rollup.p50_response_time = histogram_percentile(histogram, 0.50)
+            rollup.p95_response_time = histogram_percentile(histogram, 0.95)
+            rollup.p99_response_time = histogram_percentile(histogram, 0.99)
+
+    # ==================== LECTURA ====================
+
+    def _query(self, granularity: str, dimension: str, since: datetime):
+        from models import ApiUsageRollup
+
+        return ApiUsageRollup.query.filter(
+            ApiUsageRollup.granularity == granularity,
+            ApiUsageRollup.dimension == dimension,
+            ApiUsageRollup.bucket_start >= since
+        )
+
+    def _summarize(self, rollups) -> Dict[str, Any]:
+        """Combinar varias filas en un solo resumen con percentiles"""
+        histogram: Dict[int, int] = defaultdict(int)
+        requests = errors = 0
+        total_time = 0.0
+        for rollup in rollups:
+            requests += rollup.request_count or 0
+            errors += rollup.error_count or 0
+            total_time += rollup.total_response_time or 0.0
+            for index, count in load_histogram(rollup.latency_histogram).items():
+                histogram[index] += count
+
+        timed = sum(histogram.values())
+        return {
+            'requests': requests,
+            'errors': errors,
+            'error_rate': round(errors / requests * 100, 2) if requests else 0.0,
+            'avg_response_time': round(total_time / timed, 2) if timed else None,
+            'p50_response_time': histogram_percentile(histogram, 0.50),
+            'p95_response_time': histogram_percentile(histogram, 0.95),
+            'p99_response_time': histogram_percentile(histogram, 0.99)
+        }
+
+    def requests_today(self) -> int:
+        """Total de peticiones del día actual (UTC)"""
+        from models import ApiUsageRollup
+
+        today = bucket_start(datetime.utcnow(), 'day')
+        rollup = self._query('day', 'total', today).filter(ApiUsageRollup.dimension_value == '').first()
+        return rollup.request_count if rollup else 0
+
+    def daily_usage(self, days: int = 30) -> List[Dict[str, Any]]:
+        """Serie diaria de peticiones, errores y latencias"""
+        from models import ApiUsageRollup
+
+        since = bucket_start(datetime.utcnow(), 'day') - timedelta(days=days - 1)
+        rollups = self._query('day', 'total', since).order_by(ApiUsageRollup.bucket_start).all()
+        return [
+            {
+                'date': rollup.bucket_start.date().isoformat(),
+                'requests': rollup.request_count,
+                'errors': rollup.error_count,
+                'p50_response_time': rollup.p50_response_time,
+                'p95_response_time': rollup.p95_response_time,
+                'p99_response_time': rollup.p99_response_time
+            }
+            for rollup in rollups
+        ]
+
+    def top(self, dimension: str = 'endpoint', days: int = 30, limit: int = 10) -> List[Dict[str, Any]]:
+        """Endpoints o API keys (por huella) con más peticiones en el periodo"""
+        since = bucket_start(datetime.utcnow(), 'day') - timedelta(days=days - 1)
+        grouped: Dict[str, list] = defaultdict(list)
+        for rollup in self._query('day', dimension, since).all():
+            grouped[rollup.dimension_value].append(rollup)
+
+        ranking = []
+        for value, rollups in grouped.items():
+            summary = self._summarize(rollups)
+            summary[dimension] = value
+            ranking.append(summary)
+        ranking.sort(key=lambda item: item['requests'], reverse=True)
+        return ranking[:limit]
+
+    def error_rates(self, hours: int = 24) -> Dict[str, Any]:
+        """Tasa de errores global y por endpoint en las últimas horas"""
+        since = bucket_start(datetime.utcnow(), 'hour') - timedelta(hours=hours - 1)
+        overall = self._summarize(self._query('hour', 'total', since).all())
+
+        grouped: Dict[str, list] = defaultdict(list)
+        for rollup in self._query('hour', 'endpoint', since).all():
+            grouped[rollup.dimension_value].append(rollup)
+
+        endpoints = []
+        for endpoint, rollups in grouped.items():
+            summary = self._summarize(rollups)
+            if summary['errors']:
+                endpoints.append({
+                    'endpoint': endpoint,
+                    'requests': summary['requests'],
+                    'errors': summary['errors'],
+                    'error_rate': summary['error_rate']
+                })
+        endpoints.sort(key=lambda item: item['error_rate'], reverse=True)
+
+        return {
+            'period_hours': hours,
+            'requests': overall['requests'],
+            'errors': overall['errors'],
+            'error_rate': overall['error_rate'],
+            'endpoints': endpoints
+        }
+
+    def health(self, minutes: int = 15) -> Dict[str, Any]:
+        """Salud reciente de la API a partir de los rollups por minuto"""
+        since = bucket_start(datetime.utcnow(), 'minute') - timedelta(minutes=minutes - 1)
+        summary = self._summarize(self._query('minute', 'total', since).all())
+        if summary['requests'] == 0:
+            status = 'idle'
+        elif summary['error_rate'] >= 20 or (summary['p95_response_time'] or 0) >= 5000:
+            status = 'degraded'
+        else:
+            status = 'healthy'
+        summary['status'] = status
+        summary['period_minutes'] = minutes
+        return summary
+
+
+# Instancia global de rollups de uso de API
+usage_rollups = ApiUsageRollups()
@@ -0,0 +1,168 @@
+"""
+Caché de resolución de API keys para Panel L3HO
+Evita consultar la base de datos en cada petición protegida
+"""
+
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Any
+
+from services.cache_backends import CacheBackend, get_cache_backend
+
+logger = logging.getLogger(__name__)
+
+# Columnas de User que pueden actuar como API key
+KEY_FIELDS = ('api_key', 'api_key_transmisiones')
+
+# Generación de invalidaciones en el caché compartido: cambia cada vez que un worker revoca una key
+GENERATION_KEY = 'generation'
+GENERATION_TTL = 30 * 86400
+# Sin backend compartido (CACHE_BACKEND=memory) los demás workers no se enteran: TTL corto
+UNSHARED_TTL = 5
+
+
+class UserSnapshot:
+    """Copia ligera e inmutable de los datos del usuario que usan los endpoints"""
+
+    __slots__ = ('id', 'username', 'is_admin', 'api_key', 'api_key_transmisiones')
+
+    def __init__(self, id: int, username: str, is_admin: bool,
+                 api_key: Optional[str], api_key_transmisiones: Optional[str]):
+        self.id = id
+        self.username = username
+        self.is_admin = bool(is_admin)
+        self.api_key = api_key
+        self.api_key_transmisiones = api_key_transmisiones
+
+    @classmethod
+    def from_user(cls, user) -> 'UserSnapshot':
+        return cls(user.id, user.username, user.is_admin,
+                   user.api_key, user.api_key_transmisiones)
+
+
+class ApiKeyCache:
+    """Mapa LRU acotado con TTL de API key -> UserSnapshot (incluye resultados negativos)
+
+    Las invalidaciones se publican como una generación en el backend de caché compartido;
+    cada worker la consulta como máximo cada generation_interval segundos y, si cambió,
+    vacía su copia local.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: int = 300, negative_ttl: int = 30,
+                 generation_interval: float = 1.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.generation_interval = generation_interval
+        self._entries: 'OrderedDict[tuple[str, str], tuple[Optional[UserSnapshot], float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared: Optional[CacheBackend] = None
+        self._generation: Optional[bytes] = None
+        self._generation_checked = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.remote_invalidations = 0
+
+    def _shared_backend(self) -> CacheBackend:
+        if self._shared is None:
+            self._shared = get_cache_backend('api_keys')
+        return self._shared
+
+    def _check_generation(self, now: float) -> None:
+        """Vaciar la copia local si otro worker publicó una invalidación"""
+        if now - self._generation_checked < self.generation_interval:
+            return
+        self._generation_checked = now
+        backend = self._shared_backend()
+        if not backend.shared:
+            return
+        generation = backend.get(GENERATION_KEY)
+        with self._lock:
+            if generation != self._generation:
+                self._generation = generation
+                self._entries.clear()
+                self.remote_invalidations += 1
+
+    def resolve(self, api_key: str, field: str = 'api_key') -> Optional[UserSnapshot]:
+        """Obtener el usuario dueño de la API key, consultando la BD solo si no está en caché"""
+        if not api_key or field not in KEY_FIELDS:
+            return None
+
+        cache_key = (field, api_key)
+        now = time.monotonic()
+        self._check_generation(now)
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                snapshot, expires_at = entry
+                if now < expires_at:
+                    self._entries.move_to_end(cache_key)
+                    self.hits += 1
+                    return snapshot
+                del self._entries[cache_key]
+            self.misses += 1
+
+        try:
+            snapshot = self._load(field, api_key)
+        except Exception as e:
+            # Un fallo de BD no debe quedar registrado como key inválida
+            logger.error(f"Error resolviendo API key: {e}")
+            return None
+        ttl = self.ttl if snapshot is not None else self.negative_ttl
+        if not self._shared_backend().shared:
+            ttl = min(ttl, UNSHARED_TTL)
+
+        with self._lock:
+            self._entries[cache_key] = (snapshot, now + ttl)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return snapshot
+
+    def invalidate(self, *api_keys: Optional[str]) -> None:
+        """Eliminar una o varias API keys del caché de este worker y avisar a los demás"""
+        with self._lock:
+            for api_key in api_keys:
+                if not api_key:
+                    continue
+                for field in KEY_FIELDS:
+                    self._entries.pop((field, api_key), None)
+
+        backend = self._shared_backend()
+        if backend.shared:
+            generation = uuid.uuid4().hex.encode('ascii')
+            backend.set(GENERATION_KEY, generation, GENERATION_TTL)
+            with self._lock:
+                self._generation = generation
+
+    def clear(self) -> None:
+        """Vaciar el caché completo"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas del caché"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'remote_invalidations': self.remote_invalidations
+            }
+
+    def _load(self, field: str, api_key: str) -> Optional[UserSnapshot]:
+        """Consultar el usuario en la base de datos"""
+        from models import User
+
+        user = User.query.filter(getattr(User, field) == api_key).first()
+        return UserSnapshot.from_user(user) if user else None
+
+
+# Instancia global compartida por todos los decoradores de API
+api_key_cache = ApiKeyCache()
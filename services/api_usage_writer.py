@@ -0,0 +1,178 @@
+"""
+Escritor asíncrono por lotes del uso de API para Panel L3HO
+Saca los INSERT de ApiUsage de la ruta crítica de cada petición
+"""
+
+import os
+import queue
+import atexit
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+class ApiUsageWriter:
+    """Cola acotada en memoria que inserta registros de ApiUsage en lotes desde un hilo en segundo plano"""
+
+    def __init__(self, max_queue: int = 10000, batch_size: int = 200, flush_interval: float = 2.0):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.app = None
+        self._queue: 'queue.Queue[Dict[str, Any]]' = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stopping = threading.Event()
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def init_app(self, app) -> None:
+        """Registrar la aplicación Flask y el vaciado de la cola al apagar el proceso"""
+        self.app = app
+        atexit.register(self.shutdown)
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Registrar una función que recibe cada lote ya escrito (dentro del contexto de aplicación)"""
+        self._listeners.append(listener)
+
+    def record(self, api_key: Optional[str], endpoint: Optional[str], user_id: Optional[int],
+               ip_address: Optional[str], status_code: int = 200,
+               response_time: Optional[float] = None) -> bool:
+        """Encolar un registro de uso sin bloquear la petición"""
+        self._ensure_worker()
+        row = {
+            'api_key': (api_key or '')[:64],
+            'endpoint': (endpoint or '')[:255],
+            'user_id': user_id,
+            'ip_address': (ip_address or '')[:45] or None,
+            'status_code': status_code,
+            'response_time': response_time,
+            'created_at': datetime.utcnow()
+        }
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"Cola de uso de API llena, registros descartados: {dropped}")
+            return False
+
+    def flush(self) -> int:
+        """Escribir inmediatamente todo lo que esté en la cola"""
+        total = 0
+        while True:
+            batch = self._take_batch(block=False)
+            if not batch:
+                return total
+            self._write_batch(batch)
+            total += len(batch)
+
+    def shutdown(self) -> None:
+        """Detener el hilo escritor y vaciar la cola pendiente"""
+        self._stopping.set()
+        thread = self._thread
+        if thread and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout=self.flush_interval + 5)
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Error vaciando cola de uso de API al apagar: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener contadores del escritor"""
+        return {
+            'queued': self._queue.qsize(),
+            'max_queue': self.max_queue,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches
+        }
+
+    def _ensure_worker(self) -> None:
+        """Arrancar el hilo escritor en este proceso (también tras un fork de gunicorn)"""
+        pid = os.getpid()
+        if self._pid == pid and self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == pid and self._thread and self._thread.is_alive():
+                return
+            if self._pid != pid:
+                # La cola heredada del proceso padre no es utilizable tras el fork
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._stopping = threading.Event()
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='api-usage-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        """Bucle principal: escribir cuando se llena un lote o vence el intervalo"""
+        while not self._stopping.is_set():
+            batch = self._take_batch(block=True)
+            if batch:
+                self._write_batch(batch)
+
+    def _take_batch(self, block: bool) -> List[Dict[str, Any]]:
+        """Sacar hasta batch_size registros, esperando como máximo flush_interval"""
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                if block:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """Insertar un lote completo con un solo INSERT multi-fila"""
+        if self.app is None:
+            logger.error("ApiUsageWriter sin aplicación registrada, descartando lote")
+            with self._lock:
+                self.failed += len(batch)
+            return
+
+        from sqlalchemy import insert
+        from app import db
+        from models import ApiUsage
+
+        with self.app.app_context():
+            try:
+                db.session.execute(insert(ApiUsage), batch)
+                db.session.commit()
+                with self._lock:
+                    self.written += len(batch)
+                    self.batches += 1
+            except Exception as e:
+                db.session.rollback()
+                with self._lock:
+                    self.failed += len(batch)
+                logger.error(f"Error insertando lote de uso de API ({len(batch)} registros): {e}")
+                return
+
+            for listener in self._listeners:
+                try:
+                    listener(batch)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error procesando lote de uso de API en {listener}: {e}")
+
+
+# Instancia global del escritor de uso de API
+api_usage_writer = ApiUsageWriter()
@@ -0,0 +1,463 @@
+"""
+Backends de caché intercambiables para Panel L3HO
+memory: por proceso; disk: archivos con índice compartidos por los procesos de la máquina;
+redis: servidor con protocolo Redis (RESP) compartido por todos los workers y el actualizador.
+
+Se elige con CACHE_BACKEND=memory|disk|redis y CACHE_REDIS_URL=redis://host:puerto/db.
+Los valores son bytes: cada usuario decide cómo serializar.
+"""
+
+import os
+import re
+import time
+import uuid
+import queue
+import socket
+import hashlib
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from services.disk_cache import DiskCacheIndex, fcntl_available, write_atomic
+from services.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('memory', 'disk', 'redis')
+DEFAULT_BACKEND = 'disk'
+DEFAULT_REDIS_URL = 'redis://127.0.0.1:6379/0'
+KEY_PREFIX = 'l3ho'
+
+
+class CacheBackend:
+    """Interfaz común: get/set/delete de bytes con TTL, limpieza por condición y lock de llenado"""
+
+    name = 'base'
+    # True si el caché lo comparten varios procesos
+    shared = False
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        self.stats = {'hits': 0, 'misses': 0, 'sets': 0, 'deletes': 0, 'errors': 0}
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def clear(self, predicate: Optional[Callable[[str], bool]] = None) -> int:
+        """Eliminar las claves que cumplan la condición (todas si no se indica)"""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    @contextmanager
+    def lock(self, key: str, timeout: float = 30.0) -> Iterator[bool]:
+        """Lock para llenar una clave una sola vez; produce False si se agotó la espera"""
+        yield True
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, backend=self.name, namespace=self.namespace, entries=self.count())
+
+
+# ==================== MEMORIA ====================
+
+class MemoryBackend(CacheBackend):
+    """Caché del proceso con expiración por entrada y límite de entradas (TTLCache)"""
+
+    name = 'memory'
+
+    def __init__(self, namespace: str, max_entries: int = 1024):
+        super().__init__(namespace)
+        self.entries = TTLCache(max_entries=max_entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.entries.get(key)
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.entries.set(key, value, ttl)
+
+    def delete(self, key: str) -> bool:
+        self.stats['deletes'] += 1
+        return self.entries.delete(key)
+
+    def clear(self, predicate: Optional[Callable[[str], bool]] = None) -> int:
+        if predicate is None:
+            total = len(self.entries)
+            self.entries.clear()
+            return total
+        keys = [key for key in self.entries.keys() if predicate(key)]
+        return sum(1 for key in keys if self.entries.delete(key))
+
+    def count(self) -> int:
+        return len(self.entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, **self.entries.get_stats(), backend=self.name, namespace=self.namespace)
+
+
+# ==================== DISCO ====================
+
+_MD5_KEY = re.compile(r'^[0-9a-f]{32}$')
+
+
+class DiskBackend(CacheBackend):
+    """Archivos repartidos en subdirectorios con índice, presupuesto de bytes y locks fcntl"""
+
+    name = 'disk'
+    shared = True
+
+    def __init__(self, namespace: str, directory: str, default_ttl: float = 86400,
+                 max_bytes: int = 256 * 1024 * 1024):
+        super().__init__(namespace)
+        self.directory = directory
+        self.default_ttl = default_ttl
+        self.index = DiskCacheIndex(directory, default_ttl=default_ttl, max_bytes=max_bytes)
+        self.stats['expired'] = 0
+
+    @staticmethod
+    def file_key(key: str) -> str:
+        """Nombre de archivo de la clave (las claves md5 se usan tal cual)"""
+        return key if _MD5_KEY.match(key) else hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        self.index.start_sweeper()
+        name = self.file_key(key)
+        try:
+            f = open(self.index.path_for(name), 'rb')
+        except FileNotFoundError:
+            if self.index.get(name) is not None:
+                self.index.remove(name, unlink=False)
+            self.stats['misses'] += 1
+            return None
+        except OSError:
+            self.stats['errors'] += 1
+            return None
+
+        with f:
+            stat = os.fstat(f.fileno())
+            # Expiración del índice; si otro proceso escribió o reescribió el archivo, por su fecha
+            entry = self.index.get(name)
+            if entry is None or self.index.is_stale(entry, stat.st_mtime):
+                expires_at = stat.st_mtime + self.default_ttl
+            else:
+                expires_at = entry.expires_at
+            if time.time() >= expires_at:
+                self.index.remove(name)
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            value = f.read()
+
+        self.index.touch(name, len(value), stat.st_mtime)
+        self.stats['hits'] += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.index.start_sweeper()
+        name = self.file_key(key)
+        self.index.ensure_shard(name)
+        write_atomic(self.index.path_for(name), value)
+        self.index.add(name, len(value), ttl)
+        self.stats['sets'] += 1
+
+    def delete(self, key: str) -> bool:
+        self.stats['deletes'] += 1
+        return self.index.remove(self.file_key(key))
+
+    def clear(self, predicate: Optional[Callable[[str], bool]] = None) -> int:
+        names = self.index.keys(predicate)
+        for name in names:
+            self.index.remove(name)
+        self.index.save()
+        return len(names)
+
+    def count(self) -> int:
+        return len(self.index.keys())
+
+    @contextmanager
+    def lock(self, key: str, timeout: float = 30.0) -> Iterator[bool]:
+        if not fcntl_available():
+            # Sin fcntl no hay lock entre procesos: cada worker llena su propia copia
+            yield True
+            return
+        with self.index.key_lock(self.file_key(key), timeout) as bloqueado:
+            yield bloqueado
+
+    def get_stats(self) -> Dict[str, Any]:
+        disk = self.index.get_stats()
+        return dict(self.stats, backend=self.name, namespace=self.namespace,
+                    entries=disk['total_files'], **disk)
+
+
+# ==================== REDIS (RESP) ====================
+
+class RespError(Exception):
+    """Respuesta de error del servidor (-ERR ...)"""
+
+
+class RespConnection:
+    """Conexión mínima con protocolo RESP2 sobre un socket"""
+
+    def __init__(self, host: str, port: int, db: int = 0, password: Optional[str] = None,
+                 timeout: float = 2.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if password:
+            self.command('AUTH', password)
+        if db:
+            self.command('SELECT', db)
+
+    def command(self, *args: Any) -> Any:
+        partes = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            partes.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        self.sock.sendall(b''.join(partes))
+        return self._read_reply()
+
+    def _read_reply(self) -> Any:
+        linea = self.reader.readline()
+        if not linea:
+            raise ConnectionError('Conexión cerrada por el servidor de caché')
+        tipo, resto = linea[:1], linea[1:-2]
+        if tipo == b'+':
+            return resto.decode('utf-8')
+        if tipo == b'-':
+            raise RespError(resto.decode('utf-8'))
+        if tipo == b':':
+            return int(resto)
+        if tipo == b'$':
+            longitud = int(resto)
+            if longitud < 0:
+                return None
+            datos = self.reader.read(longitud + 2)
+            return datos[:-2]
+        if tipo == b'*':
+            longitud = int(resto)
+            if longitud < 0:
+                return None
+            return [self._read_reply() for _ in range(longitud)]
+        raise RespError(f'Respuesta RESP desconocida: {linea!r}')
+
+    def close(self) -> None:
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RespPool:
+    """Conexiones reutilizables a un servidor RESP, con pausa tras fallos para no bloquear peticiones"""
+
+    def __init__(self, url: str, max_idle: int = 16, timeout: float = 2.0, retry_after: float = 5.0):
+        parsed = urlparse(url)
+        self.url = url
+        self.host = parsed.hostname or '127.0.0.1'
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.password = parsed.password
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._idle: 'queue.LifoQueue[RespConnection]' = queue.LifoQueue(maxsize=max_idle)
+        self._down_until = 0.0
+
+    def execute(self, *args: Any) -> Any:
+        """Ejecutar un comando; lanza ConnectionError si el servidor no está disponible"""
+        if time.monotonic() < self._down_until:
+            raise ConnectionError(f'Servidor de caché no disponible: {self.host}:{self.port}')
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+        try:
+            if conn is None:
+                conn = RespConnection(self.host, self.port, self.db, self.password, self.timeout)
+            result = conn.command(*args)
+        except RespError:
+            self._release(conn)
+            raise
+        except (OSError, ValueError) as e:
+            if conn is not None:
+                conn.close()
+            self._down_until = time.monotonic() + self.retry_after
+            raise ConnectionError(f'Error con el servidor de caché {self.host}:{self.port}: {e}') from e
+        self._release(conn)
+        return result
+
+    def _release(self, conn: Optional[RespConnection]) -> None:
+        if conn is None:
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def reset(self) -> None:
+        """Descartar conexiones (tras un fork no se comparten sockets con el padre)"""
+        self._idle = queue.LifoQueue(maxsize=self._idle.maxsize)
+        self._down_until = 0.0
+
+
+class RedisBackend(CacheBackend):
+    """Caché compartido en un servidor con protocolo Redis; si no responde se comporta como fallo de caché"""
+
+    name = 'redis'
+    shared = True
+
+    def __init__(self, namespace: str, pool: RespPool):
+        super().__init__(namespace)
+        self.pool = pool
+        self.prefix = f'{KEY_PREFIX}:{namespace}:'
+        self._last_error_log = 0.0
+
+    def _error(self, e: Exception) -> None:
+        self.stats['errors'] += 1
+        if time.monotonic() - self._last_error_log > 60:
+            self._last_error_log = time.monotonic()
+            logger.warning(f"Caché redis ({self.namespace}) no disponible: {e}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            value = self.pool.execute('GET', self.prefix + key)
+        except (ConnectionError, RespError) as e:
+            self._error(e)
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits' if value is not None else 'misses'] += 1
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        try:
+            self.pool.execute('SET', self.prefix + key, value, 'PX', max(1, int(ttl * 1000)))
+            self.stats['sets'] += 1
+        except (ConnectionError, RespError) as e:
+            self._error(e)
+
+    def delete(self, key: str) -> bool:
+        try:
+            self.stats['deletes'] += 1
+            return bool(self.pool.execute('DEL', self.prefix + key))
+        except (ConnectionError, RespError) as e:
+            self._error(e)
+            return False
+
+    def _scan(self) -> List[str]:
+        keys, cursor = [], '0'
+        while True:
+            cursor, batch = self.pool.execute('SCAN', cursor, 'MATCH', self.prefix + '*', 'COUNT', 500)
+            keys.extend(key.decode('utf-8')[len(self.prefix):] for key in batch)
+            cursor = cursor.decode('utf-8') if isinstance(cursor, bytes) else str(cursor)
+            if cursor == '0':
+                return keys
+
+    def clear(self, predicate: Optional[Callable[[str], bool]] = None) -> int:
+        try:
+            keys = [key for key in self._scan() if predicate is None or predicate(key)]
+            for inicio in range(0, len(keys), 500):
+                self.pool.execute('DEL', *[self.prefix + key for key in keys[inicio:inicio + 500]])
+            return len(keys)
+        except (ConnectionError, RespError) as e:
+            self._error(e)
+            return 0
+
+    def count(self) -> int:
+        try:
+            return len(self._scan())
+        except (ConnectionError, RespError) as e:
+            self._error(e)
+            return 0
+
+    @contextmanager
+    def lock(self, key: str, timeout: float = 30.0) -> Iterator[bool]:
+        """SET NX PX con token propio; se libera solo si el lock sigue siendo nuestro"""
+        lock_key = f'{self.prefix}lock:{key}'
+        token = uuid.uuid4().hex
+        limite = time.monotonic() + timeout
+        bloqueado = False
+        try:
+            while True:
+                if self.pool.execute('SET', lock_key, token, 'NX', 'PX', int(timeout * 1000)) is not None:
+                    bloqueado = True
+                    break
+                if time.monotonic() >= limite:
+                    break
+                time.sleep(0.05)
+        except (ConnectionError, RespError) as e:
+            self._error(e)
+        try:
+            yield bloqueado
+        finally:
+            if bloqueado:
+                try:
+                    if self.pool.execute('GET', lock_key) == token.encode('ascii'):
+                        self.pool.execute('DEL', lock_key)
+                except (ConnectionError, RespError) as e:
+                    self._error(e)
+
+
+# ==================== CONFIGURACIÓN ====================
+
+_backends: Dict[str, CacheBackend] = {}
+_pools: Dict[str, RespPool] = {}
+_lock = threading.RLock()
+
+
+def _after_fork() -> None:
+    global _lock
+    _lock = threading.RLock()
+    for pool in _pools.values():
+        pool.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def configured_backend() -> str:
+    """Backend elegido en CACHE_BACKEND (disk si no se indica o no es válido)"""
+    name = os.environ.get('CACHE_BACKEND', DEFAULT_BACKEND).strip().lower()
+    if name not in BACKENDS:
+        logger.warning(f"CACHE_BACKEND desconocido '{name}', se usa {DEFAULT_BACKEND}")
+        return DEFAULT_BACKEND
+    return name
+
+
+def create_backend(namespace: str, backend: Optional[str] = None, directory: Optional[str] = None,
+                   default_ttl: float = 86400) -> CacheBackend:
+    """Crear un backend para el espacio de nombres; directory solo aplica al backend disk"""
+    backend = backend or configured_backend()
+    if backend == 'memory':
+        return MemoryBackend(namespace)
+    if backend == 'redis':
+        url = os.environ.get('CACHE_REDIS_URL', DEFAULT_REDIS_URL)
+        with _lock:
+            pool = _pools.get(url)
+            if pool is None:
+                pool = _pools[url] = RespPool(url)
+        return RedisBackend(namespace, pool)
+    root = os.environ.get('CACHE_DIR', 'cache')
+    return DiskBackend(namespace, directory or os.path.join(root, f'_{namespace}'), default_ttl=default_ttl)
+
+
+def get_cache_backend(namespace: str) -> CacheBackend:
+    """Backend compartido del proceso para el espacio de nombres"""
+    backend = _backends.get(namespace)
+    if backend is not None:
+        return backend
+    with _lock:
+        backend = _backends.get(namespace)
+        if backend is None:
+            backend = _backends[namespace] = create_backend(namespace)
+            logger.info(f"Caché {namespace}: backend {backend.name}")
+        return backend
@@ -0,0 +1,100 @@
+"""
+Registro de cambios de Liga MX para Panel L3HO
+Cada inserción o modificación recibe un id creciente que los clientes usan
+como cursor (?since=) para descargar solo lo que cambió desde su última consulta
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import insert, func, text
+
+from app import db
+from models import LigaMXCambio
+
+logger = logging.getLogger(__name__)
+
+# Cambios máximos devueltos por consulta; el resto se pide con el nuevo cursor
+LIMITE_CAMBIOS = 500
+
+# Clave del advisory lock de PostgreSQL que serializa a los escritores del registro
+CHANGE_LOG_LOCK_ID = 0x4C33484F
+
+
+class InvalidCursor(ValueError):
+    """Cursor since= que no es un entero no negativo"""
+
+
+def parse_cursor(valor: Optional[str]) -> Optional[int]:
+    """Convertir el parámetro since= en cursor (None si no se envió)"""
+    if valor is None or valor == '':
+        return None
+    try:
+        cursor = int(valor)
+    except (TypeError, ValueError):
+        raise InvalidCursor(f"Cursor inválido: {valor}")
+    if cursor < 0:
+        raise InvalidCursor(f"Cursor inválido: {valor}")
+    return cursor
+
+
+class ChangeLog:
+    """Escritura y lectura del registro de cambios liga_mx_cambios"""
+
+    def record(self, entidad: str, insertados: Iterable[int] = (), actualizados: Iterable[int] = ()) -> int:
+        """Registrar cambios en la transacción actual (el llamador hace commit)
+
+        En PostgreSQL toma un advisory lock hasta el commit: con un solo escritor a la vez
+        todo id confirmado es menor que cualquier id pendiente, y MAX(id) es un cursor seguro.
+        """
+        filas = [{'entidad': entidad, 'registro_id': registro_id, 'operacion': 'insert'} for registro_id in insertados]
+        filas += [{'entidad': entidad, 'registro_id': registro_id, 'operacion': 'update'} for registro_id in actualizados]
+        if filas:
+            self._lock_writers()
+            db.session.execute(insert(LigaMXCambio), filas)
+        return len(filas)
+
+    def _lock_writers(self) -> None:
+        # SQLite ya serializa las escrituras; el lock es reentrante dentro de la transacción
+        if db.engine.dialect.name == 'postgresql':
+            db.session.execute(text('SELECT pg_advisory_xact_lock(:id)'), {'id': CHANGE_LOG_LOCK_ID})
+
+    def latest_cursor(self) -> int:
+        """Cursor actual: id del último cambio registrado (0 si no hay)"""
+        return db.session.query(func.max(LigaMXCambio.id)).scalar() or 0
+
+    def since(self, entidad: str, cursor: int, limit: int = LIMITE_CAMBIOS) -> Dict[str, Any]:
+        """Ids de registros de la entidad que cambiaron después del cursor
+
+        Devuelve ids (sin repetir, en orden del último cambio), el nuevo cursor y si quedan más.
+        """
+        # Leído antes de la consulta: todo cambio con id <= ultimo ya está en el resultado.
+        # Los escritores están serializados (record), así que no hay ids menores sin confirmar
+        ultimo = self.latest_cursor()
+        cambios = db.session.query(LigaMXCambio.id, LigaMXCambio.registro_id).filter(
+            LigaMXCambio.entidad == entidad,
+            LigaMXCambio.id > cursor
+        ).order_by(LigaMXCambio.id).limit(limit + 1).all()
+
+        has_more = len(cambios) > limit
+        cambios = cambios[:limit]
+        if not cambios:
+            # Avanzar al cursor global para no volver a recorrer cambios de otras entidades
+            return {'ids': [], 'cursor': max(cursor, ultimo), 'has_more': False}
+
+        ids: Dict[int, None] = {}
+        for _, registro_id in cambios:
+            ids.pop(registro_id, None)
+            ids[registro_id] = None
+        nuevo_cursor = cambios[-1][0] if has_more else max(cambios[-1][0], ultimo)
+        return {'ids': list(ids), 'cursor': nuevo_cursor, 'has_more': has_more}
+
+
+def ordenar_por_ids(registros: List[Any], ids: List[int], clave=lambda registro: registro.id) -> List[Any]:
+    """Ordenar registros cargados con IN (...) según el orden de ids"""
+    posicion = {registro_id: i for i, registro_id in enumerate(ids)}
+    return sorted(registros, key=lambda registro: posicion.get(clave(registro), len(posicion)))
+
+
+# Registro global de cambios
+change_log = ChangeLog()
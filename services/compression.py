@@ -0,0 +1,189 @@
+"""
+Compresión de respuestas para Panel L3HO
+Negocia gzip/brotli con Accept-Encoding para JSON, HTML y estáticos.
+Las respuestas del caché y los archivos estáticos guardan sus variantes
+comprimidas: el costo de comprimir se paga una vez por llenado, no por petición
+"""
+
+import gzip
+import os
+import threading
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from flask import request
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se ofrece gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Por debajo de este tamaño la cabecera y el costo de CPU no compensan
+MIN_SIZE = 1024
+
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'application/json', 'application/javascript', 'text/javascript', 'text/css',
+    'text/html', 'text/plain', 'text/xml', 'application/xml', 'image/svg+xml'
+))
+
+# Niveles: máximos para variantes guardadas, moderados para respuestas de una sola vez
+NIVELES_GUARDADOS = {'br': 11, 'gzip': 9}
+NIVELES_DINAMICOS = {'br': 4, 'gzip': 6}
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """Codificaciones soportadas en orden de preferencia"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def choose_encoding() -> Optional[str]:
+    """Mejor codificación aceptada por el cliente de la petición actual"""
+    aceptadas = request.accept_encodings
+    mejor, mejor_calidad = None, 0
+    for encoding in available_encodings():
+        calidad = aceptadas[encoding]
+        if calidad > mejor_calidad:
+            mejor, mejor_calidad = encoding, calidad
+    return mejor
+
+
+def compress(body: bytes, encoding: str, stored: bool = False) -> bytes:
+    """Comprimir bytes con la codificación indicada"""
+    nivel = (NIVELES_GUARDADOS if stored else NIVELES_DINAMICOS)[encoding]
+    if encoding == 'br':
+        return brotli.compress(body, quality=nivel)
+    return gzip.compress(body, compresslevel=nivel, mtime=0)
+
+
+class CompressionStats:
+    """Contadores de respuestas comprimidas y bytes ahorrados por origen"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def record(self, origen: str, encoding: str, original: int, comprimido: int, nueva: bool) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(origen, {'responses': 0, 'compressions': 0,
+                                                    'bytes_in': 0, 'bytes_out': 0})
+            stats['responses'] += 1
+            stats['compressions'] += 1 if nueva else 0
+            stats['bytes_in'] += original
+            stats['bytes_out'] += comprimido
+            stats.setdefault(encoding, 0)
+            stats[encoding] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'encodings': list(available_encodings()),
+                **{origen: dict(stats) for origen, stats in self._stats.items()}
+            }
+
+
+compression_stats = CompressionStats()
+
+
+class StaticVariants:
+    """Variantes comprimidas de archivos estáticos, válidas mientras no cambie el archivo"""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._variants: Dict[Tuple[str, str], Tuple[float, int, bytes]] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, path: str, encoding: str) -> Tuple[Optional[bytes], int, bool]:
+        """(cuerpo comprimido, tamaño original, recién comprimido); None si no conviene"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None, 0, False
+
+        clave = (path, encoding)
+        with self._lock:
+            guardada = self._variants.get(clave)
+        if guardada is not None and guardada[0] == stat.st_mtime and guardada[1] == stat.st_size:
+            return guardada[2], stat.st_size, False
+
+        with open(path, 'rb') as f:
+            original = f.read()
+        cuerpo = compress(original, encoding, stored=True)
+        with self._lock:
+            anterior = self._variants.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= len(anterior[2])
+            if self._bytes + len(cuerpo) <= self.max_bytes:
+                self._variants[clave] = (stat.st_mtime, stat.st_size, cuerpo)
+                self._bytes += len(cuerpo)
+        return cuerpo, len(original), True
+
+
+static_variants = StaticVariants()
+
+
+def _set_encoded_body(response, body: bytes, encoding: str) -> None:
+    response.direct_passthrough = False
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        # Cada representación necesita su propio ETag
+        response.set_etag(f'{etag}-{encoding}', weak=weak)
+
+
+def init_compression(app, min_size: int = MIN_SIZE) -> None:
+    """Registrar el hook after_request que comprime respuestas según Accept-Encoding"""
+
+    @app.after_request
+    def compress_response(response):
+        response.vary.add('Accept-Encoding')
+        if (request.method == 'HEAD' or response.status_code != 200
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        encoding = choose_encoding()
+        if encoding is None:
+            return response
+
+        try:
+            if response.direct_passthrough:
+                # Archivos servidos con send_file: solo los estáticos, con variante guardada
+                if request.endpoint != 'static' or not app.static_folder:
+                    return response
+                path = safe_join(app.static_folder, request.view_args.get('filename', ''))
+                if path is None or (response.content_length or 0) < min_size:
+                    return response
+                etag, weak = response.get_etag()
+                if etag and request.if_none_match.contains(f'{etag}-{encoding}'):
+                    # send_file solo conoce el ETag sin codificar: resolver aquí el 304
+                    response.response.close()
+                    response.direct_passthrough = False
+                    response.set_data(b'')
+                    response.status_code = 304
+                    response.set_etag(f'{etag}-{encoding}', weak=weak)
+                    return response
+                cuerpo, original, nueva = static_variants.get(path, encoding)
+                if cuerpo is None:
+                    return response
+                response.response.close()
+                _set_encoded_body(response, cuerpo, encoding)
+                compression_stats.record('static', encoding, original, len(cuerpo), nueva)
+                return response
+
+            if response.is_streamed:
+                return response
+            body = response.get_data()
+            if len(body) < min_size:
+                return response
+            cuerpo = compress(body, encoding)
+            _set_encoded_body(response, cuerpo, encoding)
+            compression_stats.record('dynamic', encoding, len(body), len(cuerpo), True)
+        except Exception as e:
+            logger.error(f"Error comprimiendo respuesta {request.path}: {e}")
+        return response
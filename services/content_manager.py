@@ -5,11 +5,7 @@ Maneja todas las secciones de contenido del panel maestro
 
 from app import db
 from models import ContentSection, ContentItem, MediaFile, SystemLog, Notification
-from services.futbol import FutbolService
-from services.transmisiones import TransmisionesService
-from services.movies import MoviesService
-from services.music import MusicService
-from services.mod_apps import ModAppsService
+from services.registry import services
 from datetime import datetime
 import logging
 from typing import Dict, List, Optional, Any, Union
@@ -19,11 +15,28 @@ class ContentManager:
     """Gestor centralizado de contenido para el panel maestro"""
     
     def __init__(self):
-        self.futbol_service = FutbolService()
-        self.transmisiones_service = TransmisionesService()
-        self.movies_service = MoviesService()
-        self.music_service = MusicService()
-        self.mod_apps_service = ModAppsService()
+        # Los servicios se crean bajo demanda en el registro y se comparten con las rutas
+        self._services = services
+    
+    @property
+    def futbol_service(self):
+        return self._services.get('futbol')
+    
+    @property
+    def transmisiones_service(self):
+        return self._services.get('transmisiones')
+    
+    @property
+    def movies_service(self):
+        return self._services.get('movies')
+    
+    @property
+    def music_service(self):
+        return self._services.get('music')
+    
+    @property
+    def mod_apps_service(self):
+        return self._services.get('mod_apps')
     
     def initialize_default_sections(self):
         """Inicializa las secciones por defecto del sistema"""
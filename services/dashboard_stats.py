@@ -0,0 +1,102 @@
+"""
+Servicio de estadísticas del panel para Panel L3HO
+Calcula todos los contadores del dashboard con una consulta agregada por tabla
+"""
+
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Optional, Any
+
+from sqlalchemy import case, func
+
+logger = logging.getLogger(__name__)
+
+WEBSITE_CATEGORIES = ('movies', 'music', 'mod_apps', 'football')
+
+
+def _count_if(condition):
+    """SUM condicional portable entre PostgreSQL y SQLite"""
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+class DashboardStats:
+    """Contadores compartidos por dashboard, panel maestro, logs y endpoints de estado"""
+
+    def __init__(self, ttl: float = 5.0):
+        self.ttl = ttl
+        self._stats: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener los contadores, recalculándolos como máximo una vez cada ttl segundos"""
+        now = time.monotonic()
+        stats = self._stats
+        if stats is not None and now < self._expires_at:
+            return stats
+
+        with self._lock:
+            if self._stats is not None and time.monotonic() < self._expires_at:
+                return self._stats
+            self._stats = self._compute()
+            self._expires_at = time.monotonic() + self.ttl
+            return self._stats
+
+    def invalidate(self) -> None:
+        """Forzar el recálculo en la siguiente lectura"""
+        self._expires_at = 0.0
+
+    def _compute(self) -> Dict[str, Any]:
+        """Ejecutar una consulta agregada por tabla"""
+        from app import db
+        from models import ApiKey, WebsiteControl, ContentSection, User, SystemLog, LigaMXEquipo
+
+        today = datetime.combine(datetime.now().date(), datetime.min.time())
+
+        apis = db.session.query(
+            func.count(ApiKey.id),
+            _count_if(ApiKey.is_active == True)
+        ).one()
+
+        websites = db.session.query(
+            func.count(WebsiteControl.id),
+            _count_if(WebsiteControl.status == 'active'),
+            *[_count_if(WebsiteControl.category == category) for category in WEBSITE_CATEGORIES]
+        ).one()
+
+        sections = db.session.query(
+            func.count(ContentSection.id),
+            _count_if(ContentSection.is_active == True)
+        ).one()
+
+        logs = db.session.query(
+            func.count(SystemLog.id),
+            _count_if(SystemLog.created_at >= today),
+            _count_if(SystemLog.level == 'ERROR'),
+            _count_if(SystemLog.level == 'WARNING')
+        ).one()
+
+        stats = {
+            'total_apis': int(apis[0]),
+            'active_apis': int(apis[1]),
+            'total_websites': int(websites[0]),
+            'active_websites': int(websites[1]),
+            'total_sections': int(sections[0]),
+            'active_sections': int(sections[1]),
+            'total_users': db.session.query(func.count(User.id)).scalar() or 0,
+            'liga_mx_equipos': db.session.query(func.count(LigaMXEquipo.id)).scalar() or 0,
+            'system_logs_total': int(logs[0]),
+            'system_logs_today': int(logs[1]),
+            'system_logs_errors': int(logs[2]),
+            'system_logs_warnings': int(logs[3])
+        }
+        for category, count in zip(WEBSITE_CATEGORIES, websites[2:]):
+            stats[f'{category}_sites'] = int(count)
+
+        return stats
+
+
+# Instancia global compartida por las vistas del panel
+dashboard_stats = DashboardStats()
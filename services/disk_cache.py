@@ -0,0 +1,439 @@
+"""
+Índice del caché en disco de Panel L3HO
+Archivos repartidos en subdirectorios por prefijo de clave (cache/ab/abcd....json)
+y un índice compacto con tamaño, expiración y último acceso de cada entrada.
+Un hilo barrendero elimina lo expirado y aplica el presupuesto de bytes por LRU
+sin recorrer el directorio en cada consulta
+"""
+
+import os
+import json
+import time
+import atexit
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Sin fcntl (Windows) solo se coordinan los hilos del proceso
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+
+# Lock entre procesos del índice (dentro de LOCKS_DIR) y espera máxima para tomarlo
+INDEX_LOCK = 'index.lock'
+INDEX_LOCK_TIMEOUT = 10.0
+
+# Archivos de lock repartidos por los tres primeros caracteres de la clave (4096 para claves md5)
+LOCKS_DIR = '.locks'
+
+# Temporales de escrituras interrumpidas que el barrido puede borrar
+TEMP_MAX_AGE = 3600
+
+
+def fcntl_available() -> bool:
+    """Indicar si hay locks de archivo entre procesos"""
+    return fcntl is not None
+
+
+def write_atomic(path: str, raw: bytes) -> None:
+    """Escribir en un temporal del mismo directorio y renombrar: los lectores ven el archivo completo o el anterior"""
+    temporal = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporal, 'wb') as f:
+            f.write(raw)
+        os.replace(temporal, path)
+    except BaseException:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise
+
+
+class _IndexEntry:
+    """Tamaño en bytes, expiración, último acceso y creación de un archivo del caché"""
+
+    __slots__ = ('size', 'expires_at', 'last_access', 'created_at')
+
+    def __init__(self, size: int, expires_at: float, last_access: float, created_at: float):
+        self.size = size
+        self.expires_at = expires_at
+        self.last_access = last_access
+        self.created_at = created_at
+
+    def to_list(self) -> List[float]:
+        return [self.size, self.expires_at, self.last_access, self.created_at]
+
+
+class DiskCacheIndex:
+    """Índice en memoria (persistido en index.json) de los archivos de un directorio de caché"""
+
+    def __init__(self, cache_dir: str, default_ttl: float = 86400, max_bytes: int = 256 * 1024 * 1024,
+                 sweep_interval: float = 300, rescan_interval: float = 6 * 3600):
+        self.cache_dir = cache_dir
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self.rescan_interval = rescan_interval
+        self._entries: Dict[str, _IndexEntry] = {}
+        self._removed: set = set()
+        self._bytes = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._shards: set = set()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._last_rescan = 0.0
+        self.stats = {'sweeps': 0, 'expired': 0, 'evicted': 0, 'evicted_bytes': 0, 'rescans': 0}
+        self.load()
+        atexit.register(self.save)
+
+    # ==================== RUTAS ====================
+
+    def path_for(self, key: str) -> str:
+        """Archivo de la clave dentro de su subdirectorio (dos primeros caracteres)"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def ensure_shard(self, key: str) -> None:
+        """Crear el subdirectorio de la clave (una sola vez por proceso)"""
+        shard = key[:2]
+        if shard not in self._shards:
+            os.makedirs(os.path.join(self.cache_dir, shard), exist_ok=True)
+            self._shards.add(shard)
+
+    @contextmanager
+    def key_lock(self, key: str, timeout: float = 30.0) -> Iterator[bool]:
+        """Lock exclusivo entre procesos para llenar una clave; produce False si se agotó la espera"""
+        with self._file_lock(f"{key[:3]}.lock", timeout) as bloqueado:
+            yield bloqueado
+
+    @contextmanager
+    def _file_lock(self, nombre: str, timeout: float) -> Iterator[bool]:
+        """flock exclusivo sobre .locks/<nombre>; produce False si se agotó la espera o no hay fcntl
+
+        Se sondea con LOCK_NB y time.sleep para no bloquear el bucle de eventos con workers gevent.
+        """
+        if fcntl is None:
+            yield False
+            return
+        directorio = os.path.join(self.cache_dir, LOCKS_DIR)
+        if LOCKS_DIR not in self._shards:
+            os.makedirs(directorio, exist_ok=True)
+            self._shards.add(LOCKS_DIR)
+        fd = os.open(os.path.join(directorio, nombre), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            limite = time.monotonic() + timeout
+            bloqueado = False
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    bloqueado = True
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= limite:
+                        break
+                    time.sleep(0.05)
+            try:
+                yield bloqueado
+            finally:
+                if bloqueado:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    # ==================== ENTRADAS ====================
+
+    def get(self, key: str) -> Optional[_IndexEntry]:
+        return self._entries.get(key)
+
+    def add(self, key: str, size: int, ttl: Optional[float] = None) -> None:
+        """Registrar un archivo recién escrito"""
+        now = time.time()
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = _IndexEntry(size, now + (ttl or self.default_ttl), now, now)
+            self._bytes += size
+            self._removed.discard(key)
+            self._dirty = True
+
+    def is_stale(self, entry: _IndexEntry, mtime: float) -> bool:
+        """Indicar si otro proceso reescribió el archivo después de registrar la entrada"""
+        return mtime > entry.created_at
+
+    def touch(self, key: str, size: Optional[int] = None, mtime: Optional[float] = None) -> None:
+        """Marcar un acceso; si la entrada no estaba o el archivo es más nuevo (otro proceso) se registra de nuevo"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (mtime is None or not self.is_stale(entry, mtime)):
+                entry.last_access = now
+            elif size is not None:
+                if entry is not None:
+                    self._bytes -= entry.size
+                created = mtime or now
+                self._entries[key] = _IndexEntry(size, created + self.default_ttl, now, created)
+                self._bytes += size
+                self._removed.discard(key)
+            self._dirty = True
+
+    def remove(self, key: str, unlink: bool = True) -> bool:
+        """Quitar la entrada del índice y, si se indica, borrar su archivo"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.size
+            self._removed.add(key)
+            self._dirty = True
+        if unlink:
+            try:
+                os.remove(self.path_for(key))
+            except FileNotFoundError:
+                pass
+        return entry is not None
+
+    def keys(self, predicate: Optional[Callable[[str], bool]] = None) -> List[str]:
+        with self._lock:
+            return [key for key in self._entries if predicate is None or predicate(key)]
+
+    # ==================== BARRIDO ====================
+
+    def start_sweeper(self) -> None:
+        """Arrancar el hilo barrendero (una vez por proceso)"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='disk-cache-sweeper', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Error barriendo caché en disco {self.cache_dir}: {e}")
+
+    def sweep(self) -> Dict[str, int]:
+        """Eliminar lo expirado, aplicar el presupuesto de bytes por LRU y guardar el índice
+
+        Con el lock del índice tomado: se parte del índice combinado de todos los procesos y
+        cada archivo se vuelve a revisar antes de borrarlo.
+        """
+        if time.time() - self._last_rescan > self.rescan_interval:
+            self.rescan()
+
+        with self._file_lock(INDEX_LOCK, INDEX_LOCK_TIMEOUT) as bloqueado:
+            if not bloqueado and fcntl is not None:
+                logger.warning(f"Barrido de {self.cache_dir} omitido: índice bloqueado por otro proceso")
+                return {'expired': 0, 'evicted': 0, 'evicted_bytes': 0}
+            self._merge_index_file()
+
+            now = time.time()
+            with self._lock:
+                candidatos = [key for key, entry in self._entries.items() if entry.expires_at <= now]
+            expirados = [key for key in candidatos if self._remove_unchanged(key) is not None]
+
+            desalojados = []
+            liberados = 0
+            with self._lock:
+                exceso = self._bytes - self.max_bytes
+                # Bajar al 90% del presupuesto para no barrer en cada escritura
+                objetivo = exceso + self.max_bytes // 10
+                candidatos = sorted(self._entries, key=lambda key: self._entries[key].last_access) if exceso > 0 else []
+            for key in candidatos:
+                if liberados >= objetivo:
+                    break
+                size = self._remove_unchanged(key)
+                if size is not None:
+                    desalojados.append(key)
+                    liberados += size
+
+            self.stats['sweeps'] += 1
+            self.stats['expired'] += len(expirados)
+            self.stats['evicted'] += len(desalojados)
+            self.stats['evicted_bytes'] += liberados
+            with self._lock:
+                self._dirty = True
+            self._save_locked()
+        if expirados or desalojados:
+            logger.info(f"Caché en disco: {len(expirados)} expirados, {len(desalojados)} desalojados ({liberados} bytes)")
+        return {'expired': len(expirados), 'evicted': len(desalojados), 'evicted_bytes': liberados}
+
+    # ==================== PERSISTENCIA ====================
+
+    def _index_path(self) -> str:
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _read_index_file(self) -> Optional[Dict[str, List[float]]]:
+        try:
+            with open(self._index_path(), 'rb') as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Índice de caché ilegible, se reconstruirá: {e}")
+            return None
+
+    def load(self) -> None:
+        """Cargar el índice guardado o reconstruirlo recorriendo el directorio"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data = self._read_index_file()
+        if data is None:
+            self.rescan()
+            return
+        with self._lock:
+            self._entries = {key: _IndexEntry(*valores) for key, valores in data.items()}
+            self._bytes = sum(entry.size for entry in self._entries.values())
+        self._last_rescan = time.time()
+
+    def save(self) -> None:
+        """Guardar el índice, combinándolo con lo que otros procesos hayan escrito"""
+        with self._lock:
+            if not self._dirty:
+                return
+        # Sin el lock, dos procesos que leen, combinan y escriben a la vez pierden entradas
+        with self._file_lock(INDEX_LOCK, INDEX_LOCK_TIMEOUT) as bloqueado:
+            if not bloqueado and fcntl is not None:
+                logger.warning(f"Índice de {self.cache_dir} bloqueado por otro proceso; se guardará después")
+                return
+            self._save_locked()
+
+    def _save_locked(self) -> None:
+        self._merge_index_file()
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = {key: entry.to_list() for key, entry in self._entries.items()}
+            self._removed.clear()
+            self._dirty = False
+
+        try:
+            write_atomic(self._index_path(), json.dumps(entries, separators=(',', ':')).encode('utf-8'))
+        except OSError as e:
+            logger.error(f"Error guardando índice de caché: {e}")
+            with self._lock:
+                self._dirty = True
+
+    def _merge_index_file(self) -> None:
+        """Incorporar el índice guardado: entradas de otros procesos y archivos que reescribieron"""
+        data = self._read_index_file()
+        if not data:
+            return
+        with self._lock:
+            for key, valores in data.items():
+                if key in self._removed:
+                    continue
+                guardada = _IndexEntry(*valores)
+                entry = self._entries.get(key)
+                if entry is None or guardada.created_at > entry.created_at:
+                    if entry is not None:
+                        self._bytes -= entry.size
+                        guardada.last_access = max(guardada.last_access, entry.last_access)
+                    self._entries[key] = guardada
+                    self._bytes += guardada.size
+                    self._dirty = True
+                elif guardada.last_access > entry.last_access:
+                    entry.last_access = guardada.last_access
+
+    def _remove_unchanged(self, key: str) -> Optional[int]:
+        """Borrar el archivo si sigue siendo el que registra la entrada; devuelve los bytes liberados
+
+        Si otro proceso lo reescribió, la entrada se actualiza con la fecha del archivo y se conserva.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        try:
+            stat = os.stat(self.path_for(key))
+        except FileNotFoundError:
+            self.remove(key, unlink=False)
+            return entry.size
+        except OSError:
+            return None
+        if self.is_stale(entry, stat.st_mtime):
+            self.touch(key, stat.st_size, stat.st_mtime)
+            return None
+        self.remove(key)
+        return entry.size
+
+    def rescan(self) -> int:
+        """Reconstruir el índice desde el directorio (archivos huérfanos y formato plano anterior)"""
+        encontrados: Dict[str, _IndexEntry] = {}
+        for nombre in os.listdir(self.cache_dir):
+            ruta = os.path.join(self.cache_dir, nombre)
+            if nombre.endswith('.json') and nombre != INDEX_FILE and os.path.isfile(ruta):
+                # Archivo del formato plano anterior: moverlo a su subdirectorio
+                key = nombre[:-len('.json')]
+                self.ensure_shard(key)
+                try:
+                    os.replace(ruta, self.path_for(key))
+                except OSError:
+                    continue
+                self._scan_file(key, encontrados)
+            elif os.path.isdir(ruta) and not nombre.startswith(('.', '_')):
+                # .locks y los directorios _<namespace> de otros backends no son subdirectorios de claves
+                self._shards.add(nombre)
+                for archivo in os.listdir(ruta):
+                    if archivo.endswith('.json'):
+                        self._scan_file(archivo[:-len('.json')], encontrados)
+                    elif archivo.endswith('.tmp'):
+                        self._remove_stale_temp(os.path.join(ruta, archivo))
+
+        with self._lock:
+            for key, entry in encontrados.items():
+                actual = self._entries.get(key)
+                if actual is not None:
+                    entry.last_access = max(entry.last_access, actual.last_access)
+                    entry.expires_at = actual.expires_at
+            if encontrados or self._entries:
+                self._dirty = True
+            self._entries = encontrados
+            self._bytes = sum(entry.size for entry in encontrados.values())
+        self._last_rescan = time.time()
+        self.stats['rescans'] += 1
+        return len(encontrados)
+
+    @staticmethod
+    def _remove_stale_temp(path: str) -> None:
+        try:
+            if time.time() - os.stat(path).st_mtime > TEMP_MAX_AGE:
+                os.remove(path)
+        except OSError:
+            pass
+
+    def _scan_file(self, key: str, encontrados: Dict[str, _IndexEntry]) -> None:
+        try:
+            stat = os.stat(self.path_for(key))
+        except OSError:
+            return
+        encontrados[key] = _IndexEntry(stat.st_size, stat.st_mtime + self.default_ttl,
+                                       stat.st_mtime, stat.st_mtime)
+
+    # ==================== ESTADÍSTICAS ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Totales desde el índice, sin recorrer el directorio"""
+        with self._lock:
+            creados = [entry.created_at for entry in self._entries.values()]
+            total = len(self._entries)
+            total_bytes = self._bytes
+        return {
+            'total_files': total,
+            'total_bytes': total_bytes,
+            'max_bytes': self.max_bytes,
+            'oldest': datetime.fromtimestamp(min(creados)).isoformat() if creados else None,
+            'newest': datetime.fromtimestamp(max(creados)).isoformat() if creados else None,
+            'sweeper_running': self._thread is not None and self._thread.is_alive(),
+            **self.stats
+        }
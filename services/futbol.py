@@ -4,8 +4,6 @@ API completa de Liga MX con datos reales actualizados de múltiples fuentes
 Fuentes: ESPN México, Liga MX Oficial, Transfermarkt
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
 import re
 from datetime import datetime, timedelta
@@ -14,12 +12,19 @@ from urllib.parse import urljoin, urlparse
 import time
 from typing import Dict, List, Optional, Any
 
+from services.http_client import build_session, http_fetcher
+from services.swr_cache import StaleWhileRevalidateCache
+from services.single_flight import SingleFlight
+
+# Scrapings de ESPN coalescidos entre peticiones simultáneas
+_flight = SingleFlight('futbol')
+
 class FutbolService:
     """Servicio completo para API de Liga MX con datos reales"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Sesión con pool de conexiones: el servicio vive en el registro y se reutiliza entre peticiones
+        self.session = build_session({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'es-MX,es;q=0.9,en;q=0.8',
@@ -248,15 +253,24 @@ class FutbolService:
             'ligamx_oficial': 'https://www.ligamx.net',
             'transfermarkt': 'https://www.transfermarkt.es/liga-mx/startseite/wettbewerb/MEX1'
         }
+        
+        # Última tabla buena de ESPN, refrescada en segundo plano al caducar
+        self.tabla_cache = StaleWhileRevalidateCache('tabla_liga_mx', fresh_ttl=300, max_stale=6 * 3600)
     
     def get_liga_mx_tabla_completa(self) -> Dict[str, Any]:
+        """Obtiene la tabla completa de Liga MX sin esperar al scraping si hay una copia reciente"""
+        tabla, edad = self.tabla_cache.get(
+            'tabla', self._scrape_liga_mx_tabla_completa,
+            is_valid=lambda resultado: resultado.get('fuente') == 'ESPN México'
+        )
+        return dict(tabla, data_age_seconds=round(edad, 1))
+    
+    def _scrape_liga_mx_tabla_completa(self) -> Dict[str, Any]:
         """Obtiene la tabla completa de Liga MX con todos los datos posibles"""
         try:
             # Intentar desde ESPN México primero
-            response = self.session.get(self.urls['espn_posiciones'], timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = http_fetcher.fetch_soup(self.session, self.urls['espn_posiciones'], source='espn_posiciones',
+                                           timeout=15, region='tablas', polite=False)
             
             # Buscar tabla de posiciones en ESPN
             tabla_container = soup.find('div', class_='Table__Scroller') or soup.find('table', class_='Table')
@@ -483,13 +497,12 @@ class FutbolService:
                 'error': f'Error interno: {str(e)}'
             }
     
+    @_flight.coalesce()
     def get_calendario_completo(self) -> Dict[str, Any]:
         """Obtiene el calendario completo de partidos"""
         try:
-            response = self.session.get(self.urls['espn_calendario'], timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = http_fetcher.fetch_soup(self.session, self.urls['espn_calendario'], source='espn_calendario',
+                                           timeout=15, region='espn_scroller', polite=False)
             
             partidos = []
             
@@ -787,8 +800,8 @@ class FutbolService:
     def _get_tabla_ligamx_oficial(self) -> Dict[str, Any]:
         """Método alternativo desde Liga MX oficial"""
         try:
-            response = self.session.get(self.urls['ligamx_oficial'], timeout=10)
-            response.raise_for_status()
+            http_fetcher.fetch(self.session, self.urls['ligamx_oficial'], source='ligamx_oficial',
+                               timeout=10, polite=False)
             
             # Implementar scraping del sitio oficial
             # Por ahora retorna estructura estándar
@@ -0,0 +1,66 @@
+"""
+Parseo HTML compartido por los scrapers de Panel L3HO
+Parser lxml, parseo parcial por regiones (SoupStrainer) y selectores precompilados
+"""
+
+import re
+import logging
+from typing import Dict, Optional, Union
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+    logger.warning("lxml no disponible, se usa html.parser")
+
+# ==================== SELECTORES PRECOMPILADOS ====================
+
+# Contenedores de partidos en vivo de ESPN
+ESPN_MATCH_CLASS = re.compile(r'Table|ScoreCell|MatchInfo')
+# Tarjetas de partido en Mediotiempo y Liga MX oficial
+MATCH_CLASS = re.compile(r'match|partido|game')
+# Artículos de noticias (ESPN, Mediotiempo, Récord, Futbol Total)
+NEWS_CLASS = re.compile(r'news|noticia|article')
+NEWS_CLASS_I = re.compile(r'noticia|article|news', re.I)
+TITLE_CLASS_I = re.compile(r'title|titulo', re.I)
+DATE_CLASS_I = re.compile(r'date|fecha', re.I)
+# Elementos internos de una tarjeta de partido
+TEAM_CLASS = re.compile(r'team|equipo')
+SCORE_CLASS = re.compile(r'score|marcador')
+STATUS_CLASS = re.compile(r'status|estado|time')
+# Texto de una tarjeta de partido: minuto, "Local vs Visitante" y marcador
+MINUTE_PATTERN = re.compile(r"(\d+)'")
+VS_PATTERN = re.compile(r'([A-Za-záéíóúñ\s]+)\s+vs?\s+([A-Za-záéíóúñ\s]+)')
+SCORE_PATTERN = re.compile(r'(\d+)\s*-\s*(\d+)')
+# Filas de tabla de ESPN
+ESPN_ROW_CLASSES = ['Table__TR', 'Table__TR--sm']
+
+# ==================== REGIONES DE PÁGINA ====================
+
+# Solo se construye el árbol de los elementos que coinciden (con todos sus descendientes)
+REGIONS: Dict[str, SoupStrainer] = {
+    'tablas': SoupStrainer('table'),
+    'espn_scroller': SoupStrainer('div', class_='Table__Scroller'),
+    'espn_partidos': SoupStrainer('div', class_=ESPN_MATCH_CLASS),
+    'partidos': SoupStrainer(['div', 'article'], class_=MATCH_CLASS),
+    'partidos_data_id': SoupStrainer('div', attrs={'data-id': True}),
+    'espn_cards': SoupStrainer('section', class_='Card'),
+    'espn_noticias': SoupStrainer('article', class_='contentItem'),
+    'noticias': SoupStrainer(['article', 'div'], class_=NEWS_CLASS),
+    'noticias_i': SoupStrainer(['article', 'div'], class_=NEWS_CLASS_I),
+    'apk_post': SoupStrainer(['h1', 'div', 'img'], class_=['post-title', 'post-excerpt', 'post-img']),
+    'scripts': SoupStrainer('script'),
+    'audiomack_items': SoupStrainer('article', class_='item-container'),
+    'bandcamp_resultados': SoupStrainer('li', class_='searchresult'),
+}
+
+
+def parse_html(content: Union[bytes, str], region: Optional[str] = None) -> BeautifulSoup:
+    """Parsear con lxml; si se indica región solo se construye esa parte del documento"""
+    parse_only = REGIONS[region] if region else None
+    return BeautifulSoup(content, PARSER, parse_only=parse_only)
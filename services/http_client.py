@@ -0,0 +1,268 @@
+"""
+Cliente HTTP compartido para los scrapers de Panel L3HO
+Sesiones con pool de conexiones, pausas de cortesía por host y peticiones
+condicionales (ETag/Last-Modified) con almacén persistente de respuestas
+"""
+
+import copy
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import logging
+from typing import Dict, Optional, Any, Tuple
+from urllib.parse import urlparse
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services.disk_cache import write_atomic
+from services.html_parsing import parse_html
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'es-MX,es;q=0.9,en;q=0.8',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+
+def build_session(headers: Optional[Dict[str, str]] = None, pool_maxsize: int = 20,
+                  retries: int = 2) -> requests.Session:
+    """Crear una sesión con adaptadores de pool reutilizables entre hilos"""
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    if headers:
+        session.headers.update(headers)
+
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                  allowed_methods=frozenset(['GET', 'HEAD']))
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class HostThrottle:
+    """Pausa mínima entre peticiones al mismo host; hosts distintos no se bloquean entre sí"""
+
+    def __init__(self, min_interval: float = 1.0, jitter: Tuple[float, float] = (0.0, 2.0)):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._locks: Dict[str, threading.Lock] = {}
+        self._next_allowed: Dict[str, float] = {}
+        self._registry_lock = threading.Lock()
+
+    def _host_lock(self, host: str) -> threading.Lock:
+        with self._registry_lock:
+            lock = self._locks.get(host)
+            if lock is None:
+                lock = self._locks[host] = threading.Lock()
+            return lock
+
+    def wait(self, url: str) -> None:
+        """Esperar el turno del host de la URL y reservar el siguiente intervalo"""
+        host = urlparse(url).netloc
+        with self._host_lock(host):
+            delay = self._next_allowed.get(host, 0.0) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_allowed[host] = time.monotonic() + self.min_interval + random.uniform(*self.jitter)
+
+
+# Pausas de cortesía compartidas por todos los scrapers del proceso
+host_throttle = HostThrottle()
+
+
+def polite_get(session: requests.Session, url: str, timeout: float = 15, **kwargs) -> requests.Response:
+    """GET respetando la pausa de cortesía del host"""
+    host_throttle.wait(url)
+    return session.get(url, timeout=timeout, **kwargs)
+
+
+class FetchResult:
+    """Resultado de una descarga condicional"""
+
+    __slots__ = ('url', 'source', 'status_code', 'content', 'content_hash', 'changed', 'not_modified')
+
+    def __init__(self, url: str, source: str, status_code: int, content: bytes,
+                 content_hash: str, changed: bool, not_modified: bool):
+        self.url = url
+        self.source = source
+        self.status_code = status_code
+        self.content = content
+        self.content_hash = content_hash
+        self.changed = changed
+        self.not_modified = not_modified
+
+
+class ConditionalFetcher:
+    """Descargas con If-None-Match/If-Modified-Since y cuerpos guardados en disco
+
+    Cuando el servidor responde 304 o el contenido tiene el mismo hash que la
+    última descarga, los scrapers reutilizan el resultado ya parseado.
+    """
+
+    def __init__(self, store_dir: Optional[str] = None):
+        self.store_dir = store_dir or os.environ.get('HTTP_CACHE_DIR', os.path.join('cache', 'http'))
+        self._entries: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._parsed: Dict[Tuple[str, str], Tuple[str, Any]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    # ==================== ALMACÉN ====================
+
+    def _paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.store_dir, key)
+        return f'{base}.json', f'{base}.body'
+
+    def _load_entry(self, url: str) -> Optional[Dict[str, Any]]:
+        """Validadores guardados de la URL (memoria primero, luego disco)"""
+        with self._lock:
+            if url in self._entries:
+                return self._entries[url]
+
+        meta_path, body_path = self._paths(url)
+        entry = None
+        try:
+            if os.path.exists(meta_path) and os.path.exists(body_path):
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Error leyendo respuesta guardada de {url}: {e}")
+
+        with self._lock:
+            self._entries[url] = entry
+        return entry
+
+    def _read_body(self, url: str) -> Optional[bytes]:
+        try:
+            with open(self._paths(url)[1], 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _save_entry(self, url: str, entry: Dict[str, Any], body: Optional[bytes]) -> None:
+        """Guardar validadores (y cuerpo si cambió) con reemplazo atómico
+
+        Temporales únicos por proceso e hilo; el cuerpo se escribe antes que los validadores
+        y al leerlo se comprueba su hash, así nunca se sirve un cuerpo de otra versión.
+        """
+        meta_path, body_path = self._paths(url)
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            if body is not None:
+                write_atomic(body_path, body)
+            write_atomic(meta_path, json.dumps(entry).encode('utf-8'))
+        except OSError as e:
+            logger.warning(f"Error guardando respuesta de {url}: {e}")
+
+        with self._lock:
+            self._entries[url] = entry
+
+    # ==================== DESCARGA ====================
+
+    def _count(self, source: str, **increments: int) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(source, {
+                'requests': 0, 'not_modified': 0, 'unchanged': 0, 'changed': 0,
+                'errors': 0, 'bytes_downloaded': 0, 'bytes_saved': 0
+            })
+            for name, value in increments.items():
+                stats[name] += value
+
+    def fetch(self, session: requests.Session, url: str, source: Optional[str] = None,
+              timeout: float = 15, polite: bool = True, **kwargs) -> FetchResult:
+        """GET condicional; lanza requests.RequestException igual que raise_for_status()"""
+        source = source or urlparse(url).netloc
+        entry = self._load_entry(url)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            if polite:
+                response = polite_get(session, url, timeout=timeout, headers=headers, **kwargs)
+            else:
+                response = session.get(url, timeout=timeout, headers=headers, **kwargs)
+
+            if response.status_code == 304 and entry:
+                body = self._read_body(url)
+                if body is not None and hashlib.sha256(body).hexdigest() == entry.get('hash'):
+                    self._count(source, requests=1, not_modified=1, bytes_saved=len(body))
+                    return FetchResult(url, source, 304, body, entry['hash'], False, True)
+                # Cuerpo perdido o de otra versión (otro worker lo reemplazó): repetir sin validadores
+                with self._lock:
+                    self._entries[url] = None
+                return self.fetch(session, url, source, timeout, polite, **kwargs)
+
+            response.raise_for_status()
+        except requests.RequestException:
+            self._count(source, requests=1, errors=1)
+            raise
+
+        content = response.content
+        content_hash = hashlib.sha256(content).hexdigest()
+        changed = not entry or entry.get('hash') != content_hash
+
+        self._save_entry(url, {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'hash': content_hash,
+            'size': len(content),
+            'fetched_at': time.time()
+        }, content if changed else None)
+
+        if changed:
+            self._count(source, requests=1, changed=1, bytes_downloaded=len(content))
+        else:
+            self._count(source, requests=1, unchanged=1, bytes_downloaded=len(content))
+        return FetchResult(url, source, response.status_code, content, content_hash, changed, False)
+
+    # ==================== MEMO DE PARSEO ====================
+
+    def parsed(self, result: FetchResult, tag: str) -> Optional[Any]:
+        """Resultado ya parseado de este mismo contenido, o None si hay que parsear"""
+        with self._lock:
+            memo = self._parsed.get((result.url, tag))
+        if memo is None or memo[0] != result.content_hash:
+            return None
+        return copy.deepcopy(memo[1])
+
+    def remember(self, result: FetchResult, tag: str, value: Any) -> None:
+        """Guardar el resultado parseado asociado al hash del contenido"""
+        with self._lock:
+            self._parsed[(result.url, tag)] = (result.content_hash, copy.deepcopy(value))
+
+    def fetch_soup(self, session: requests.Session, url: str, source: Optional[str] = None,
+                   timeout: float = 15, region: Optional[str] = None, **kwargs) -> BeautifulSoup:
+        """Descargar (condicional) y parsear solo la región indicada
+
+        Cada llamada recibe su propio árbol: los scrapers pueden modificarlo (decompose/extract)
+        sin afectar a otros hilos. Para no repetir la extracción cuando el contenido no cambió,
+        guardar lo extraído con parsed()/remember().
+        """
+        result = self.fetch(session, url, source=source, timeout=timeout, **kwargs)
+        return parse_html(result.content, region)
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Estadísticas por fuente: peticiones, 304, contenido sin cambios y bytes ahorrados"""
+        with self._lock:
+            return {source: dict(stats) for source, stats in self._stats.items()}
+
+
+# Almacén de respuestas compartido por todos los scrapers del proceso
+http_fetcher = ConditionalFetcher()
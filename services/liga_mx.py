@@ -8,12 +8,16 @@ from bs4 import BeautifulSoup
 import json
 import time
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from urllib.parse import urljoin, urlparse
 import re
 from typing import Dict, List, Optional, Any
 import hashlib
 
+from services.http_client import http_fetcher
+from services.cache_backends import get_cache_backend
+from services.ttl_cache import TTLCache
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -50,22 +54,19 @@ class LigaMXScraper:
             'Necaxa', 'Mazatlán', 'FC Juárez', 'Querétaro', 'Tijuana', 'San Luis'
         ]
         
-        # Cache para datos
-        self.cache = {}
-        self.cache_expiry = {}
+        # Cache para datos: TTL por entrada y máximo de entradas (las claves noticias_{equipo} no crecen sin límite)
         self.cache_duration = 300  # 5 minutos por defecto
+        self.cache = TTLCache(max_entries=128, default_ttl=self.cache_duration)
+        # Nivel compartido por workers y actualizador cuando CACHE_BACKEND es disk o redis
+        backend = get_cache_backend('liga_mx')
+        self.shared_cache = backend if backend.shared else None
 
-    def make_request(self, url: str, timeout: int = 10) -> Optional[BeautifulSoup]:
-        """Hacer petición HTTP con manejo de errores"""
+    def make_request(self, url: str, timeout: int = 10, region: Optional[str] = None) -> Optional[BeautifulSoup]:
+        """Hacer petición HTTP con manejo de errores (parseando solo la región indicada)"""
         try:
-            response = self.session.get(url, timeout=timeout)
-            response.raise_for_status()
-            
-            # Detectar encoding
-            if response.encoding == 'ISO-8859-1':
-                response.encoding = 'utf-8'
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Petición condicional: si la página no cambió se reutiliza el árbol ya parseado
+            soup = http_fetcher.fetch_soup(self.session, url, source=urlparse(url).netloc,
+                                           timeout=timeout, region=region, polite=False)
             logger.info(f"✅ Scraping exitoso: {urlparse(url).netloc}")
             return soup
             
@@ -75,17 +76,35 @@ class LigaMXScraper:
 
     def get_cached_data(self, key: str) -> Optional[Any]:
         """Obtener datos del cache si no han expirado"""
-        if key in self.cache and key in self.cache_expiry:
-            if datetime.now() < self.cache_expiry[key]:
-                logger.info(f"📦 Cache hit: {key}")
-                return self.cache[key]
-        return None
+        data = self.cache.get(key)
+        if data is not None:
+            logger.info(f"📦 Cache hit: {key}")
+            return data
+        
+        raw = self.shared_cache.get(key) if self.shared_cache is not None else None
+        if raw is None:
+            return None
+        try:
+            sobre = json.loads(raw)
+            data, restante = sobre['data'], sobre['expires_at'] - time.time()
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Cache inválido para {key}: {e}")
+            return None
+        if restante <= 0:
+            return None
+        # Conservar el vencimiento con que otro proceso la guardó
+        self.cache.set(key, data, restante)
+        logger.info(f"📦 Cache hit (compartido): {key}")
+        return data
 
     def set_cached_data(self, key: str, data: Any, duration: int = None) -> None:
         """Guardar datos en cache con tiempo de expiración"""
         duration = duration or self.cache_duration
-        self.cache[key] = data
-        self.cache_expiry[key] = datetime.now() + timedelta(seconds=duration)
+        self.cache.set(key, data, duration)
+        if self.shared_cache is not None:
+            sobre = {'expires_at': time.time() + duration, 'data': data}
+            raw = json.dumps(sobre, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+            self.shared_cache.set(key, raw, duration)
         logger.info(f"💾 Datos guardados en cache: {key}")
 
     def scrape_tabla_posiciones(self) -> List[Dict]:
@@ -98,7 +117,7 @@ class LigaMXScraper:
         try:
             # Primero intentar ESPN México
             url = "https://www.espn.com.mx/futbol/posiciones/_/liga/mex.1"
-            soup = self.make_request(url)
+            soup = self.make_request(url, region='tablas')
             
             if soup:
                 tabla = []
@@ -154,7 +173,7 @@ class LigaMXScraper:
         """Fallback para tabla de posiciones desde LigaMX.net"""
         try:
             url = "https://ligamx.net/cancha/estadisticas"
-            soup = self.make_request(url)
+            soup = self.make_request(url, region='tablas')
             
             if soup:
                 tabla = []
@@ -193,7 +212,7 @@ class LigaMXScraper:
 
         try:
             url = "https://www.espn.com.mx/futbol/partidos/_/liga/mex.1"
-            soup = self.make_request(url)
+            soup = self.make_request(url, region='espn_cards')
             
             if soup:
                 partidos = []
@@ -252,7 +271,7 @@ class LigaMXScraper:
 
         try:
             url = "https://www.espn.com.mx/futbol/estadisticas/_/liga/mex.1/vista/goles"
-            soup = self.make_request(url)
+            soup = self.make_request(url, region='tablas')
             
             if soup:
                 goleadores = []
@@ -311,7 +330,7 @@ class LigaMXScraper:
             else:
                 url = "https://www.espn.com.mx/futbol/liga/_/nombre/mex.1"
             
-            soup = self.make_request(url)
+            soup = self.make_request(url, region='espn_noticias')
             
             if soup:
                 noticias = []
@@ -452,7 +471,7 @@ class LigaMXScraper:
         results['stats'] = {
             'total_items': total_items,
             'sources_used': ['ESPN México', 'Liga MX Oficial'],
-            'cache_hits': len([k for k in self.cache_expiry.keys() if datetime.now() < self.cache_expiry[k]]),
+            'cache_hits': len(self.cache),
             'last_update': datetime.now().isoformat()
         }
         
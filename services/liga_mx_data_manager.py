@@ -6,9 +6,15 @@ Integra scraping real con base de datos PostgreSQL
 
 import sys
 import os
+import time
+import hashlib
+import json
 import logging
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+from sqlalchemy import insert, update, tuple_
 
 # Agregar directorio padre al path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -17,9 +23,119 @@ from app import app, db
 from models import (LigaMXEquipo, LigaMXPosicion, LigaMXPartido, LigaMXJugador, 
                    LigaMXNoticia, LigaMXActualizacion)
 from services.liga_mx_real_scraper import LigaMXRealScraper
+from services.response_cache import response_cache
+from services.change_log import change_log
 
 logger = logging.getLogger(__name__)
 
+# Temporada usada por la tabla de posiciones
+TEMPORADA_TABLA = '2024'
+
+# Temporada con la que se registran los partidos
+TEMPORADA_PARTIDOS = '2025-2026'
+
+# Columnas que cambian en cada corrida y no forman parte de la huella del registro
+COLUMNAS_VOLATILES = frozenset(('id', 'fingerprint', 'ultima_actualizacion', 'updated_at', 'created_at'))
+
+
+def record_fingerprint(row: Dict[str, Any]) -> str:
+    """Huella SHA-256 de un registro normalizado, sin columnas volátiles"""
+    contenido = {k: v for k, v in row.items() if k not in COLUMNAS_VOLATILES}
+    payload = json.dumps(contenido, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _conteo(insertados: int = 0, actualizados: int = 0, sin_cambios: int = 0) -> Dict[str, int]:
+    return {'insertados': insertados, 'actualizados': actualizados, 'sin_cambios': sin_cambios}
+
+class StandingsSnapshot:
+    """Tabla de posiciones precalculada por temporada, servida desde memoria con número de versión"""
+    
+    def __init__(self, revalidate_interval: float = 30.0):
+        self.revalidate_interval = revalidate_interval
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._version = 0
+    
+    def get(self, temporada: str, builder: Callable[[str], List[Dict]]) -> Dict[str, Any]:
+        """Obtener el snapshot de la temporada, reconstruyéndolo solo si la BD cambió"""
+        snapshot = self._snapshots.get(temporada)
+        if snapshot is not None and time.monotonic() - snapshot['checked_at'] < self.revalidate_interval:
+            return snapshot
+        
+        with self._lock:
+            snapshot = self._snapshots.get(temporada)
+            if snapshot is not None and time.monotonic() - snapshot['checked_at'] < self.revalidate_interval:
+                return snapshot
+            
+            # Otro proceso (p. ej. el actualizador automático) pudo modificar la tabla
+            stamp = self._source_stamp(temporada)
+            if snapshot is not None and stamp == snapshot['stamp']:
+                snapshot['checked_at'] = time.monotonic()
+                return snapshot
+            
+            return self._build(temporada, builder, stamp)
+    
+    def rebuild(self, temporada: str, builder: Callable[[str], List[Dict]]) -> Dict[str, Any]:
+        """Reconstruir el snapshot tras una actualización de la tabla"""
+        with self._lock:
+            return self._build(temporada, builder, self._source_stamp(temporada))
+    
+    def _build(self, temporada: str, builder: Callable[[str], List[Dict]], stamp) -> Dict[str, Any]:
+        """Construir y guardar el snapshot; si el builder falla se conserva el anterior sin marca"""
+        try:
+            tabla = builder(temporada)
+        except Exception as e:
+            logger.error(f"Error construyendo tabla {temporada}: {e}")
+            snapshot = self._snapshots.get(temporada)
+            if snapshot is None:
+                # Nada que conservar: tabla vacía sin guardar, se reintenta en la siguiente lectura
+                return {'temporada': temporada, 'version': 0, 'tabla': [], 'generated_at': None,
+                        'stamp': None, 'checked_at': float('-inf')}
+            # Sin marca el siguiente intento (tras revalidate_interval) reconstruye aunque la BD no cambie
+            snapshot['stamp'] = None
+            snapshot['checked_at'] = time.monotonic()
+            return snapshot
+        return self._store(temporada, tabla, stamp)
+    
+    def invalidate(self, temporada: Optional[str] = None) -> None:
+        """Descartar uno o todos los snapshots"""
+        with self._lock:
+            if temporada is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(temporada, None)
+    
+    def _store(self, temporada: str, tabla: List[Dict], stamp) -> Dict[str, Any]:
+        self._version += 1
+        snapshot = {
+            'temporada': temporada,
+            'version': self._version,
+            'tabla': tabla,
+            'generated_at': datetime.utcnow().isoformat(),
+            'stamp': stamp,
+            # Sin marca (error de BD) se vuelve a validar en la siguiente lectura
+            'checked_at': time.monotonic() if stamp is not None else float('-inf')
+        }
+        self._snapshots[temporada] = snapshot
+        return snapshot
+    
+    @staticmethod
+    def _source_stamp(temporada: str):
+        """Marca barata para detectar cambios: última actualización y número de filas"""
+        try:
+            with app.app_context():
+                return tuple(db.session.query(
+                    db.func.max(LigaMXPosicion.ultima_actualizacion),
+                    db.func.count(LigaMXPosicion.id)
+                ).filter(LigaMXPosicion.temporada == temporada).one())
+        except Exception as e:
+            logger.error(f"Error consultando marca de la tabla {temporada}: {e}")
+            return None
+
+# Snapshot compartido por todas las instancias del gestor
+standings_snapshot = StandingsSnapshot()
+
 class LigaMXDataManager:
     """Gestor de datos reales de Liga MX con integración a base de datos"""
     
@@ -54,36 +170,39 @@ class LigaMXDataManager:
                     'fuentes_exitosas': datos_reales.get('fuentes_exitosas', [])
                 }
                 
-                # Actualizar equipos y tabla
-                if datos_reales.get('tabla_posiciones'):
-                    equipos_count = self.update_equipos_tabla(datos_reales['tabla_posiciones'])
-                    results['equipos_actualizados'] = equipos_count
-                    logger.info(f"✅ {equipos_count} equipos actualizados con datos reales")
-                
-                # Actualizar partidos
-                if datos_reales.get('partidos'):
-                    partidos_count = self.update_partidos(datos_reales['partidos'])
-                    results['partidos_actualizados'] = partidos_count
-                    logger.info(f"✅ {partidos_count} partidos actualizados")
-                
-                # Actualizar jugadores
-                if datos_reales.get('jugadores'):
-                    jugadores_count = self.update_jugadores(datos_reales['jugadores'])
-                    results['jugadores_actualizados'] = jugadores_count
-                    logger.info(f"✅ {jugadores_count} jugadores actualizados")
-                
-                # Actualizar noticias
-                if datos_reales.get('noticias'):
-                    noticias_count = self.update_noticias(datos_reales['noticias'])
-                    results['noticias_actualizadas'] = noticias_count
-                    logger.info(f"✅ {noticias_count} noticias actualizadas")
+                # Cada etapa devuelve insertados / actualizados / sin_cambios
+                etapas = [
+                    ('tabla_posiciones', 'equipos_actualizados', 'equipos', self.update_equipos_tabla),
+                    ('partidos', 'partidos_actualizados', 'partidos', self.update_partidos),
+                    ('jugadores', 'jugadores_actualizados', 'jugadores', self.update_jugadores),
+                    ('noticias', 'noticias_actualizadas', 'noticias', self.update_noticias),
+                ]
+                totales = _conteo()
+                results['conteos'] = {}
+                for clave_datos, clave_resultado, nombre, actualizar in etapas:
+                    if not datos_reales.get(clave_datos):
+                        continue
+                    conteo = actualizar(datos_reales[clave_datos])
+                    results['conteos'][nombre] = conteo
+                    results[clave_resultado] = conteo['insertados'] + conteo['actualizados']
+                    for campo in totales:
+                        totales[campo] += conteo[campo]
+                    logger.info(f"✅ {nombre}: {conteo['insertados']} nuevos, {conteo['actualizados']} modificados, "
+                                f"{conteo['sin_cambios']} sin cambios")
                 
                 # Completar registro de actualización
                 actualizacion.status = 'success'
-                actualizacion.elementos_actualizados = results["equipos_actualizados"] + results["partidos_actualizados"] + results["jugadores_actualizados"] + results["noticias_actualizadas"]
-                actualizacion.detalles = f'Equipos: {results["equipos_actualizados"]}, Partidos: {results["partidos_actualizados"]}, Jugadores: {results["jugadores_actualizados"]}, Noticias: {results["noticias_actualizadas"]}'
+                actualizacion.elementos_insertados = totales['insertados']
+                actualizacion.elementos_modificados = totales['actualizados']
+                actualizacion.elementos_sin_cambios = totales['sin_cambios']
+                actualizacion.elementos_actualizados = totales['insertados'] + totales['actualizados']
+                actualizacion.detalles = f'Equipos: {results["equipos_actualizados"]}, Partidos: {results["partidos_actualizados"]}, Jugadores: {results["jugadores_actualizados"]}, Noticias: {results["noticias_actualizadas"]}, Sin cambios: {totales["sin_cambios"]}'
                 db.session.commit()
                 
+                # Las respuestas públicas cacheadas ya no reflejan los datos nuevos
+                if actualizacion.elementos_actualizados:
+                    response_cache.invalidate('liga_mx')
+                
                 logger.info("🎉 Actualización completa con datos reales terminada")
                 return results
                 
@@ -99,244 +218,303 @@ class LigaMXDataManager:
                 pass
             return {'error': str(e)}
     
-    def update_equipos_tabla(self, tabla_data: List[Dict]) -> int:
+    # ==================== INGESTA POR LOTES ====================
+    
+    def _load_team_map(self) -> Dict[str, int]:
+        """Mapa nombre -> id de todos los equipos en una sola consulta"""
+        return dict(db.session.query(LigaMXEquipo.nombre, LigaMXEquipo.id).all())
+    
+    def _insert_ignore_conflicts(self, model, rows: List[Dict], index_elements: List[str]) -> None:
+        """INSERT multi-fila que ignora filas que ya existen (ON CONFLICT DO NOTHING)"""
+        if not rows:
+            return
+        
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            db.session.execute(insert(model), rows)
+            return
+        
+        db.session.execute(dialect_insert(model).on_conflict_do_nothing(index_elements=index_elements), rows)
+    
+    def _bulk_upsert(self, model, rows: List[Dict], key_columns: Tuple[str, ...],
+                     entidad: str) -> Tuple[Dict[str, int], List[Dict]]:
+        """Upsert por lotes que solo escribe filas nuevas o cuya huella cambió
+
+        Devuelve el conteo (insertados, actualizados, sin_cambios) y las filas escritas.
+        Los cambios quedan en el registro de cambios dentro de la misma transacción.
+        """
+        if not rows:
+            return _conteo(), []
+        
+        # Si la misma clave aparece varias veces gana la última fila
+        por_clave = {tuple(row[c] for c in key_columns): row for row in rows}
+        
+        columnas = [getattr(model, c) for c in key_columns]
+        existentes = {
+            tuple(fila[2:]): (fila[0], fila[1])
+            for fila in db.session.query(model.id, model.fingerprint, *columnas).filter(
+                tuple_(*columnas).in_(list(por_clave))
+            ).all()
+        }
+        
+        inserts = []
+        updates = []
+        sin_cambios = 0
+        for clave, row in por_clave.items():
+            huella = record_fingerprint(row)
+            if clave not in existentes:
+                inserts.append(dict(row, fingerprint=huella))
+                continue
+            fila_id, huella_actual = existentes[clave]
+            if huella_actual == huella:
+                sin_cambios += 1
+            else:
+                updates.append(dict(row, id=fila_id, fingerprint=huella))
+        
+        if inserts:
+            db.session.execute(insert(model), inserts)
+        if updates:
+            db.session.execute(update(model), updates)
+        
+        insertados_ids = []
+        if inserts:
+            claves = [tuple(row[c] for c in key_columns) for row in inserts]
+            insertados_ids = [fila[0] for fila in db.session.query(model.id).filter(tuple_(*columnas).in_(claves)).all()]
+        change_log.record(entidad, insertados_ids, [row['id'] for row in updates])
+        
+        return _conteo(len(inserts), len(updates), sin_cambios), inserts + updates
+    
+    def update_equipos_tabla(self, tabla_data: List[Dict]) -> Dict[str, int]:
         """Actualizar equipos y tabla de posiciones con datos reales"""
         try:
-            equipos_actualizados = 0
+            ahora = datetime.utcnow()
             
+            # Crear en un solo INSERT los equipos que aún no existen
+            equipos_ids = self._load_team_map()
+            nuevos_equipos = {}
             for equipo_data in tabla_data:
-                # Buscar o crear equipo
-                equipo = LigaMXEquipo.query.filter_by(nombre=equipo_data['nombre']).first()
-                
-                if not equipo:
-                    equipo = LigaMXEquipo(
-                        nombre=equipo_data['nombre'],
-                        nombre_completo=equipo_data.get('nombre_completo', equipo_data['nombre']),
-                        ciudad=self.scraper.get_team_city(equipo_data['nombre']),
-                        estadio=self.scraper.get_team_stadium(equipo_data['nombre']),
-                        fundacion=self.scraper.get_team_foundation(equipo_data['nombre']),
-                        colores_primarios=self.scraper.get_team_colors(equipo_data['nombre']),
-                        logo_url=f'/static/logos/{equipo_data["nombre"].lower().replace(" ", "_")}.png'
-                    )
-                    db.session.add(equipo)
-                    db.session.flush()  # Para obtener el ID
-                
-                # Actualizar datos del equipo con info real
-                equipo.updated_at = datetime.utcnow()
-                
-                # Buscar o crear posición actual
-                posicion = LigaMXPosicion.query.filter_by(
-                    equipo_id=equipo.id,
-                    temporada='2024'
-                ).first()
-                
-                if not posicion:
-                    posicion = LigaMXPosicion(
-                        equipo_id=equipo.id,
-                        temporada='2024'
-                    )
-                    db.session.add(posicion)
-                
-                # Actualizar datos de posición con datos reales
-                posicion.posicion = equipo_data.get('posicion', 0)
-                posicion.partidos_jugados = equipo_data.get('partidos_jugados', 0)
-                posicion.ganados = equipo_data.get('ganados', 0)
-                posicion.empatados = equipo_data.get('empatados', 0)
-                posicion.perdidos = equipo_data.get('perdidos', 0)
-                posicion.goles_favor = equipo_data.get('goles_favor', 0)
-                posicion.goles_contra = equipo_data.get('goles_contra', 0)
-                posicion.diferencia_goles = equipo_data.get('diferencia_goles', 0)
-                posicion.puntos = equipo_data.get('puntos', 0)
-                posicion.fuente = equipo_data.get('fuente', 'ESPN México')
-                posicion.ultima_actualizacion = datetime.utcnow()
-                
-                equipos_actualizados += 1
+                nombre = equipo_data['nombre']
+                if nombre not in equipos_ids and nombre not in nuevos_equipos:
+                    nuevos_equipos[nombre] = {
+                        'nombre': nombre,
+                        'nombre_completo': equipo_data.get('nombre_completo', nombre),
+                        'ciudad': self.scraper.get_team_city(nombre),
+                        'estadio': self.scraper.get_team_stadium(nombre),
+                        'fundacion': self.scraper.get_team_foundation(nombre),
+                        'colores_primarios': self.scraper.get_team_colors(nombre),
+                        'logo_url': f'/static/logos/{nombre.lower().replace(" ", "_")}.png'
+                    }
+            if nuevos_equipos:
+                self._insert_ignore_conflicts(LigaMXEquipo, list(nuevos_equipos.values()), ['nombre'])
+                equipos_ids = self._load_team_map()
+            
+            posiciones = []
+            for equipo_data in tabla_data:
+                posiciones.append({
+                    'equipo_id': equipos_ids[equipo_data['nombre']],
+                    'temporada': TEMPORADA_TABLA,
+                    'posicion': equipo_data.get('posicion', 0),
+                    'partidos_jugados': equipo_data.get('partidos_jugados', 0),
+                    'ganados': equipo_data.get('ganados', 0),
+                    'empatados': equipo_data.get('empatados', 0),
+                    'perdidos': equipo_data.get('perdidos', 0),
+                    'goles_favor': equipo_data.get('goles_favor', 0),
+                    'goles_contra': equipo_data.get('goles_contra', 0),
+                    'diferencia_goles': equipo_data.get('diferencia_goles', 0),
+                    'puntos': equipo_data.get('puntos', 0),
+                    'fuente': equipo_data.get('fuente', 'ESPN México'),
+                    'ultima_actualizacion': ahora
+                })
             
+            conteo, escritas = self._bulk_upsert(LigaMXPosicion, posiciones, ('equipo_id', 'temporada'), 'posicion')
+            
+            # Marcar como actualizados solo los equipos cuya posición cambió
+            if escritas:
+                db.session.execute(
+                    update(LigaMXEquipo).where(
+                        LigaMXEquipo.id.in_({fila['equipo_id'] for fila in escritas})
+                    ).values(updated_at=ahora)
+                )
             db.session.commit()
-            return equipos_actualizados
+            
+            # Regenerar el snapshot materializado de la tabla
+            if escritas or nuevos_equipos:
+                standings_snapshot.rebuild(TEMPORADA_TABLA, self._build_tabla)
+            return conteo
             
         except Exception as e:
             logger.error(f"Error actualizando equipos: {e}")
             db.session.rollback()
-            return 0
+            return _conteo()
     
-    def update_partidos(self, partidos_data: List[Dict]) -> int:
+    def update_partidos(self, partidos_data: List[Dict]) -> Dict[str, int]:
         """Actualizar partidos con datos reales"""
         try:
-            partidos_actualizados = 0
+            ahora = datetime.utcnow()
+            equipos_ids = self._load_team_map()
             
+            partidos = []
             for partido_data in partidos_data:
-                # Buscar equipos
-                equipo_local = LigaMXEquipo.query.filter_by(nombre=partido_data['equipo_local']).first()
-                equipo_visitante = LigaMXEquipo.query.filter_by(nombre=partido_data['equipo_visitante']).first()
+                local_id = equipos_ids.get(partido_data['equipo_local'])
+                visitante_id = equipos_ids.get(partido_data['equipo_visitante'])
                 
-                if not equipo_local or not equipo_visitante:
+                if not local_id or not visitante_id:
                     logger.warning(f"Equipos no encontrados para partido: {partido_data['equipo_local']} vs {partido_data['equipo_visitante']}")
                     continue
                 
-                # Verificar si el partido ya existe
-                partido_existente = LigaMXPartido.query.filter_by(
-                    jornada=partido_data.get('jornada', 1),
-                    equipo_local_id=equipo_local.id,
-                    equipo_visitante_id=equipo_visitante.id,
-                    temporada='2024'
-                ).first()
-                
-                if not partido_existente:
-                    # Crear nuevo partido
-                    partido = LigaMXPartido(
-                        temporada='2025-2026',
-                        jornada=partido_data.get('jornada', 1),
-                        equipo_local_id=equipo_local.id,
-                        equipo_visitante_id=equipo_visitante.id,
-                        fecha_partido=datetime.fromisoformat(partido_data['fecha_partido']) if partido_data.get('fecha_partido') else None,
-                        estado=partido_data.get('estado', 'programado'),
-                        goles_local=partido_data.get('goles_local'),
-                        goles_visitante=partido_data.get('goles_visitante'),
-                        estadio=partido_data.get('estadio'),
-                        fuente=partido_data.get('fuente', 'Mediotiempo'),
-                        ultima_actualizacion=datetime.utcnow()
-                    )
-                    db.session.add(partido)
-                    partidos_actualizados += 1
-                else:
-                    # Actualizar partido existente
-                    if partido_data.get('goles_local') is not None:
-                        partido_existente.goles_local = partido_data['goles_local']
-                    if partido_data.get('goles_visitante') is not None:
-                        partido_existente.goles_visitante = partido_data['goles_visitante']
-                    
-                    partido_existente.estado = partido_data.get('estado', partido_existente.estado)
-                    partido_existente.ultima_actualizacion = datetime.utcnow()
-                    partidos_actualizados += 1
+                partido = {
+                    'temporada': TEMPORADA_PARTIDOS,
+                    'jornada': partido_data.get('jornada', 1),
+                    'equipo_local_id': local_id,
+                    'equipo_visitante_id': visitante_id,
+                    'estado': partido_data.get('estado', 'programado'),
+                    'fuente': partido_data.get('fuente', 'Mediotiempo'),
+                    'ultima_actualizacion': ahora
+                }
+                if partido_data.get('fecha_partido'):
+                    partido['fecha_partido'] = datetime.fromisoformat(partido_data['fecha_partido'])
+                # Un marcador vacío no sobrescribe el existente
+                if partido_data.get('goles_local') is not None:
+                    partido['goles_local'] = partido_data['goles_local']
+                if partido_data.get('goles_visitante') is not None:
+                    partido['goles_visitante'] = partido_data['goles_visitante']
+                if partido_data.get('estadio'):
+                    partido['estadio'] = partido_data['estadio']
+                partidos.append(partido)
             
+            conteo, _ = self._bulk_upsert(
+                LigaMXPartido, partidos, ('temporada', 'jornada', 'equipo_local_id', 'equipo_visitante_id'), 'partido'
+            )
             db.session.commit()
-            return partidos_actualizados
+            return conteo
             
         except Exception as e:
             logger.error(f"Error actualizando partidos: {e}")
             db.session.rollback()
-            return 0
+            return _conteo()
     
-    def update_jugadores(self, jugadores_data: List[Dict]) -> int:
+    def update_jugadores(self, jugadores_data: List[Dict]) -> Dict[str, int]:
         """Actualizar jugadores con datos reales"""
         try:
-            jugadores_actualizados = 0
+            equipos_ids = self._load_team_map()
             
+            jugadores = []
             for jugador_data in jugadores_data:
-                # Buscar equipo del jugador
-                equipo = LigaMXEquipo.query.filter_by(nombre=jugador_data['equipo']).first()
-                if not equipo:
+                equipo_id = equipos_ids.get(jugador_data['equipo'])
+                if not equipo_id:
                     logger.warning(f"Equipo no encontrado para jugador: {jugador_data['nombre']} - {jugador_data['equipo']}")
                     continue
                 
-                # Buscar o crear jugador
-                jugador = LigaMXJugador.query.filter_by(
-                    nombre=jugador_data['nombre'],
-                    equipo_id=equipo.id
-                ).first()
-                
-                if not jugador:
-                    jugador = LigaMXJugador(
-                        nombre=jugador_data['nombre'],
-                        equipo_id=equipo.id
-                    )
-                    db.session.add(jugador)
-                
-                # Actualizar estadísticas del jugador
-                jugador.posicion = jugador_data.get('posicion')
-                jugador.numero = jugador_data.get('numero')
-                jugador.edad = jugador_data.get('edad')
-                jugador.nacionalidad = jugador_data.get('nacionalidad')
-                jugador.goles = jugador_data.get('goles', 0)
-                jugador.asistencias = jugador_data.get('asistencias', 0)
-                jugador.partidos_jugados = jugador_data.get('partidos_jugados', 0)
-                jugador.minutos_jugados = jugador_data.get('minutos_jugados', 0)
-                jugador.tarjetas_amarillas = jugador_data.get('tarjetas_amarillas', 0)
-                jugador.tarjetas_rojas = jugador_data.get('tarjetas_rojas', 0)
-                jugador.updated_at = datetime.utcnow()
-                
-                jugadores_actualizados += 1
+                jugadores.append({
+                    'nombre': jugador_data['nombre'],
+                    'equipo_id': equipo_id,
+                    'posicion': jugador_data.get('posicion'),
+                    'numero_camisa': jugador_data.get('numero'),
+                    'edad': jugador_data.get('edad'),
+                    'nacionalidad': jugador_data.get('nacionalidad')
+                })
             
+            conteo, _ = self._bulk_upsert(LigaMXJugador, jugadores, ('nombre', 'equipo_id'), 'jugador')
             db.session.commit()
-            return jugadores_actualizados
+            return conteo
             
         except Exception as e:
             logger.error(f"Error actualizando jugadores: {e}")
             db.session.rollback()
-            return 0
+            return _conteo()
     
-    def update_noticias(self, noticias_data: List[Dict]) -> int:
+    def update_noticias(self, noticias_data: List[Dict]) -> Dict[str, int]:
         """Actualizar noticias con datos reales"""
         try:
-            noticias_actualizadas = 0
+            ahora = datetime.utcnow()
             
+            # Descartar en una sola consulta las noticias ya guardadas por título
+            titulos = {noticia_data['titulo'] for noticia_data in noticias_data}
+            existentes = {
+                fila[0] for fila in db.session.query(LigaMXNoticia.titulo).filter(
+                    LigaMXNoticia.titulo.in_(titulos)
+                ).all()
+            }
+            
+            nuevas = {}
             for noticia_data in noticias_data:
-                # Verificar si la noticia ya existe por título
-                noticia_existente = LigaMXNoticia.query.filter_by(
-                    titulo=noticia_data['titulo']
-                ).first()
-                
-                if not noticia_existente:
-                    # Crear nueva noticia
-                    noticia = LigaMXNoticia(
-                        titulo=noticia_data['titulo'],
-                        resumen=noticia_data.get('resumen'),
-                        url=noticia_data.get('url'),
-                        fuente=noticia_data.get('fuente'),
-                        fecha=datetime.fromisoformat(noticia_data['fecha']) if noticia_data.get('fecha') else datetime.utcnow(),
-                        imagen_url=noticia_data.get('imagen_url'),
-                        created_at=datetime.utcnow()
-                    )
-                    db.session.add(noticia)
-                    noticias_actualizadas += 1
+                titulo = noticia_data['titulo']
+                if titulo in existentes or titulo in nuevas:
+                    continue
+                nuevas[titulo] = {
+                    'titulo': titulo,
+                    'resumen': noticia_data.get('resumen'),
+                    'url': noticia_data.get('url'),
+                    'fuente': noticia_data.get('fuente'),
+                    'fecha': datetime.fromisoformat(noticia_data['fecha']) if noticia_data.get('fecha') else ahora,
+                    'imagen_url': noticia_data.get('imagen_url'),
+                    'hash_contenido': hashlib.sha256(titulo.encode('utf-8')).hexdigest(),
+                    'created_at': ahora
+                }
             
+            self._insert_ignore_conflicts(LigaMXNoticia, list(nuevas.values()), ['hash_contenido'])
+            if nuevas:
+                hashes = [noticia['hash_contenido'] for noticia in nuevas.values()]
+                change_log.record('noticia', [
+                    fila[0] for fila in db.session.query(LigaMXNoticia.id).filter(
+                        LigaMXNoticia.hash_contenido.in_(hashes),
+                        LigaMXNoticia.created_at == ahora
+                    ).all()
+                ])
             db.session.commit()
-            return noticias_actualizadas
+            # Las noticias no se editan: las ya guardadas cuentan como sin cambios
+            return _conteo(insertados=len(nuevas), sin_cambios=len(titulos) - len(nuevas))
             
         except Exception as e:
             logger.error(f"Error actualizando noticias: {e}")
             db.session.rollback()
-            return 0
+            return _conteo()
     
-    def get_tabla_actualizada(self) -> List[Dict]:
-        """Obtener tabla de posiciones actualizada"""
-        try:
-            with app.app_context():
-                # Join entre equipos y posiciones
-                query = db.session.query(LigaMXEquipo, LigaMXPosicion).join(
-                    LigaMXPosicion, LigaMXEquipo.id == LigaMXPosicion.equipo_id
-                ).filter(
-                    LigaMXPosicion.temporada == '2024'
-                ).order_by(
-                    LigaMXPosicion.puntos.desc(),
-                    LigaMXPosicion.diferencia_goles.desc(),
-                    LigaMXPosicion.goles_favor.desc()
-                ).all()
-                
-                tabla_actual = []
-                for i, (equipo, posicion) in enumerate(query, 1):
-                    tabla_actual.append({
-                        'posicion': i,
-                        'equipo': equipo.nombre,
-                        'nombre_corto': self.scraper.get_short_name(equipo.nombre),
-                        'partidos_jugados': posicion.partidos_jugados,
-                        'ganados': posicion.ganados,
-                        'empatados': posicion.empatados,
-                        'perdidos': posicion.perdidos,
-                        'goles_favor': posicion.goles_favor,
-                        'goles_contra': posicion.goles_contra,
-                        'diferencia_goles': posicion.diferencia_goles,
-                        'puntos': posicion.puntos,
-                        'ultima_actualizacion': posicion.ultima_actualizacion.isoformat() if posicion.ultima_actualizacion else None,
-                        'fuente': posicion.fuente
-                    })
-                
-                return tabla_actual
-                
-        except Exception as e:
-            logger.error(f"Error obteniendo tabla actualizada: {e}")
-            return []
+    def get_tabla_actualizada(self, temporada: str = TEMPORADA_TABLA) -> List[Dict]:
+        """Obtener tabla de posiciones actualizada (desde el snapshot en memoria, no modificar)"""
+        return self.get_tabla_snapshot(temporada)['tabla']
+    
+    def get_tabla_snapshot(self, temporada: str = TEMPORADA_TABLA) -> Dict[str, Any]:
+        """Obtener el snapshot de la tabla con su número de versión"""
+        return standings_snapshot.get(temporada, self._build_tabla)
+    
+    def _build_tabla(self, temporada: str) -> List[Dict]:
+        """Construir la tabla de posiciones desde la base de datos (los errores de BD se propagan)"""
+        with app.app_context():
+            # Join entre equipos y posiciones
+            query = db.session.query(LigaMXEquipo, LigaMXPosicion).join(
+                LigaMXPosicion, LigaMXEquipo.id == LigaMXPosicion.equipo_id
+            ).filter(
+                LigaMXPosicion.temporada == temporada
+            ).order_by(
+                LigaMXPosicion.puntos.desc(),
+                LigaMXPosicion.diferencia_goles.desc(),
+                LigaMXPosicion.goles_favor.desc()
+            ).all()
+            
+            tabla_actual = []
+            for i, (equipo, posicion) in enumerate(query, 1):
+                tabla_actual.append({
+                    'posicion': i,
+                    'equipo': equipo.nombre,
+                    'nombre_corto': self.scraper.get_short_name(equipo.nombre),
+                    'partidos_jugados': posicion.partidos_jugados,
+                    'ganados': posicion.ganados,
+                    'empatados': posicion.empatados,
+                    'perdidos': posicion.perdidos,
+                    'goles_favor': posicion.goles_favor,
+                    'goles_contra': posicion.goles_contra,
+                    'diferencia_goles': posicion.diferencia_goles,
+                    'puntos': posicion.puntos,
+                    'ultima_actualizacion': posicion.ultima_actualizacion.isoformat() if posicion.ultima_actualizacion else None,
+                    'fuente': posicion.fuente
+                })
+            
+            return tabla_actual
 
 if __name__ == "__main__":
     manager = LigaMXDataManager()
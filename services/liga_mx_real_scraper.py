@@ -4,36 +4,30 @@ Liga MX Real Data Scraper - Sistema de scraping profesional
 Obtiene datos reales y actuales desde fuentes mexicanas oficiales
 """
 
-import requests
 import logging
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
 import re
 import json
-import time
 import random
-from typing import Dict, List, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Any
 import sys
 import os
 
 # Agregar directorio padre al path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from services.http_client import build_session, http_fetcher
+from services.html_parsing import parse_html, MATCH_CLASS, NEWS_CLASS, ESPN_ROW_CLASSES
+
 logger = logging.getLogger(__name__)
 
 class LigaMXRealScraper:
     """Scraper profesional para datos reales de Liga MX desde fuentes mexicanas"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'es-MX,es;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1'
-        })
+        # Sesión con pool de conexiones, compartida por los hilos de scrape_all_data
+        self.session = build_session()
         
         # Fuentes oficiales mexicanas
         self.sources = {
@@ -84,53 +78,82 @@ class LigaMXRealScraper:
             'timestamp': datetime.now().isoformat()
         }
         
-        # 1. Scraping tabla de posiciones desde ESPN México
-        tabla_data = self.scrape_tabla_espn_mx()
+        # Cada fuente se descarga en paralelo; las pausas de cortesía son por host
+        tareas: Dict[str, Callable[[], List[Dict]]] = {
+            'tabla': self.scrape_tabla_espn_mx,
+            'partidos': self.scrape_partidos_mediotiempo,
+            'equipos': self.scrape_equipos_oficial,
+            'noticias': self.scrape_noticias_multiple,
+            'goleadores': self.scrape_goleadores
+        }
+        datos = self._run_parallel(tareas)
+        
+        # 1. Tabla de posiciones desde ESPN México
+        tabla_data = datos.get('tabla')
         if tabla_data:
             results['tabla_posiciones'] = tabla_data
             results['fuentes_exitosas'].append('ESPN MX - Tabla')
             logger.info(f"✅ ESPN MX: {len(tabla_data)} equipos en tabla")
         
-        # 2. Scraping partidos desde Mediotiempo
-        partidos_data = self.scrape_partidos_mediotiempo()
+        # 2. Partidos desde Mediotiempo
+        partidos_data = datos.get('partidos')
         if partidos_data:
             results['partidos'] = partidos_data
             results['fuentes_exitosas'].append('Mediotiempo - Partidos')
             logger.info(f"✅ Mediotiempo: {len(partidos_data)} partidos obtenidos")
         
-        # 3. Scraping equipos desde Liga MX oficial
-        equipos_data = self.scrape_equipos_oficial()
+        # 3. Equipos desde Liga MX oficial
+        equipos_data = datos.get('equipos')
         if equipos_data:
             results['equipos'] = equipos_data
             results['fuentes_exitosas'].append('Liga MX Oficial - Equipos')
             logger.info(f"✅ Liga MX Oficial: {len(equipos_data)} equipos obtenidos")
         
-        # 4. Scraping noticias desde múltiples fuentes
-        noticias_data = self.scrape_noticias_multiple()
+        # 4. Noticias desde múltiples fuentes
+        noticias_data = datos.get('noticias')
         if noticias_data:
             results['noticias'] = noticias_data
             results['fuentes_exitosas'].append('Múltiples - Noticias')
             logger.info(f"✅ Noticias: {len(noticias_data)} noticias obtenidas")
         
-        # 5. Scraping jugadores goleadores
-        goleadores_data = self.scrape_goleadores()
+        # 5. Jugadores goleadores
+        goleadores_data = datos.get('goleadores')
         if goleadores_data:
             results['jugadores'] = goleadores_data
             results['fuentes_exitosas'].append('Goleadores')
             logger.info(f"✅ Goleadores: {len(goleadores_data)} jugadores obtenidos")
         
+        for nombre, error in datos.get('_errores', {}).items():
+            results['errores'].append(f'{nombre}: {error}')
+        
         logger.info(f"🎉 Scraping completado. Fuentes exitosas: {len(results['fuentes_exitosas'])}")
         return results
     
+    def _run_parallel(self, tareas: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """Ejecutar tareas de scraping en un pool de hilos; el total lo marca la fuente más lenta"""
+        resultados: Dict[str, Any] = {'_errores': {}}
+        with ThreadPoolExecutor(max_workers=len(tareas), thread_name_prefix='ligamx-scraper') as executor:
+            futuros = {nombre: executor.submit(tarea) for nombre, tarea in tareas.items()}
+            for nombre, futuro in futuros.items():
+                try:
+                    resultados[nombre] = futuro.result()
+                except Exception as e:
+                    logger.error(f"Error en tarea de scraping {nombre}: {e}")
+                    resultados['_errores'][nombre] = str(e)
+        return resultados
+    
     def scrape_tabla_espn_mx(self) -> List[Dict]:
         """Scraping tabla de posiciones desde ESPN México"""
         try:
             logger.info("🏆 Scraping tabla desde ESPN México...")
             
-            response = self.session.get(self.sources['espn_mx']['tabla_url'], timeout=15)
-            response.raise_for_status()
+            fetched = http_fetcher.fetch(self.session, self.sources['espn_mx']['tabla_url'], source='espn_mx', timeout=15)
+            tabla_data = http_fetcher.parsed(fetched, 'tabla')
+            if tabla_data:
+                logger.info("📦 Tabla ESPN México sin cambios, se reutiliza el último parseo")
+                return tabla_data
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(fetched.content, 'tablas')
             tabla_data = []
             
             # Buscar tabla de posiciones
@@ -179,6 +202,9 @@ class LigaMXRealScraper:
                             logger.warning(f"Error procesando fila de {equipo_nombre}: {e}")
                             continue
             
+            if tabla_data:
+                http_fetcher.remember(fetched, 'tabla', tabla_data)
+            
             # Si no encontramos tabla, intentar método alternativo
             if not tabla_data:
                 tabla_data = self.scrape_tabla_alternativo_espn(soup)
@@ -194,17 +220,21 @@ class LigaMXRealScraper:
         try:
             logger.info("⚽ Scraping partidos desde Mediotiempo...")
             
-            response = self.session.get(self.sources['mediotiempo']['partidos_url'], timeout=15)
-            response.raise_for_status()
+            fetched = http_fetcher.fetch(self.session, self.sources['mediotiempo']['partidos_url'], source='mediotiempo', timeout=15)
+            partidos_data = http_fetcher.parsed(fetched, 'partidos')
+            if partidos_data is not None:
+                logger.info("📦 Partidos Mediotiempo sin cambios, se reutiliza el último parseo")
+                return partidos_data
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(fetched.content, 'partidos')
             partidos_data = []
             
             # Buscar contenedores de partidos
-            partidos_containers = soup.find_all(['div', 'article'], class_=re.compile(r'match|partido|game'))
+            partidos_containers = soup.find_all(['div', 'article'], class_=MATCH_CLASS)
             
             if not partidos_containers:
                 # Método alternativo - buscar por estructura
+                soup = parse_html(fetched.content, 'partidos_data_id')
                 partidos_containers = soup.find_all('div', attrs={'data-id': True})
             
             for container in partidos_containers[:20]:  # Limitar a 20 partidos más recientes
@@ -216,6 +246,7 @@ class LigaMXRealScraper:
                     logger.warning(f"Error procesando partido: {e}")
                     continue
             
+            http_fetcher.remember(fetched, 'partidos', partidos_data)
             return partidos_data
             
         except Exception as e:
@@ -274,30 +305,10 @@ class LigaMXRealScraper:
                 }
             ]
             
-            for fuente in fuentes:
-                try:
-                    response = self.session.get(fuente['url'], timeout=10)
-                    response.raise_for_status()
-                    
-                    soup = BeautifulSoup(response.content, 'html.parser')
-                    
-                    # Buscar artículos de noticias
-                    articulos = soup.find_all(['article', 'div'], class_=re.compile(r'news|noticia|article'))
-                    
-                    for articulo in articulos[:5]:  # Máximo 5 noticias por fuente
-                        try:
-                            noticia_data = self.extract_noticia_data(articulo, fuente['nombre'])
-                            if noticia_data:
-                                noticias_data.append(noticia_data)
-                        except Exception as e:
-                            continue
-                    
-                    # Pausa entre requests
-                    time.sleep(random.uniform(1, 3))
-                    
-                except Exception as e:
-                    logger.warning(f"Error scraping noticias de {fuente['nombre']}: {e}")
-                    continue
+            # Cada fuente es un host distinto: se descargan en paralelo
+            with ThreadPoolExecutor(max_workers=len(fuentes), thread_name_prefix='ligamx-noticias') as executor:
+                for noticias_fuente in executor.map(self._scrape_noticias_fuente, fuentes):
+                    noticias_data.extend(noticias_fuente)
             
             return noticias_data
             
@@ -305,6 +316,35 @@ class LigaMXRealScraper:
             logger.error(f"Error scraping noticias múltiples: {e}")
             return []
     
+    def _scrape_noticias_fuente(self, fuente: Dict[str, str]) -> List[Dict]:
+        """Scraping de noticias de una sola fuente"""
+        noticias_data = []
+        try:
+            fetched = http_fetcher.fetch(self.session, fuente['url'], source=fuente['nombre'], timeout=10)
+            memo = http_fetcher.parsed(fetched, 'noticias')
+            if memo is not None:
+                return memo
+            
+            soup = parse_html(fetched.content, 'noticias')
+            
+            # Buscar artículos de noticias
+            articulos = soup.find_all(['article', 'div'], class_=NEWS_CLASS)
+            
+            for articulo in articulos[:5]:  # Máximo 5 noticias por fuente
+                try:
+                    noticia_data = self.extract_noticia_data(articulo, fuente['nombre'])
+                    if noticia_data:
+                        noticias_data.append(noticia_data)
+                except Exception as e:
+                    continue
+            
+            http_fetcher.remember(fetched, 'noticias', noticias_data)
+            
+        except Exception as e:
+            logger.warning(f"Error scraping noticias de {fuente['nombre']}: {e}")
+        
+        return noticias_data
+    
     def scrape_goleadores(self) -> List[Dict]:
         """Scraping tabla de goleadores REALES Apertura 2025"""
         try:
@@ -599,9 +639,13 @@ class LigaMXRealScraper:
             # Intentar obtener datos más actuales desde múltiples fuentes
             try:
                 # Hacer request adicional para datos más actuales
-                response_actual = self.session.get('https://www.espn.com.mx/futbol/liga/_/nombre/mex.1/tabla', timeout=10)
-                if response_actual.status_code == 200:
-                    soup_actual = BeautifulSoup(response_actual.content, 'html.parser')
+                response_actual = http_fetcher.fetch(self.session, 'https://www.espn.com.mx/futbol/liga/_/nombre/mex.1/tabla',
+                                                     source='espn_mx', timeout=10)
+                tabla_memo = http_fetcher.parsed(response_actual, 'tabla_actual')
+                if tabla_memo:
+                    return tabla_memo
+                if response_actual.content:
+                    soup_actual = parse_html(response_actual.content, 'tablas')
                     tabla_rows = soup_actual.find_all('tr')
                     
                     if len(tabla_rows) > 1:
@@ -626,6 +670,7 @@ class LigaMXRealScraper:
                         
                         if tabla_actual:
                             logger.info(f"✅ Tabla actual obtenida: {len(tabla_actual)} equipos")
+                            http_fetcher.remember(response_actual, 'tabla_actual', tabla_actual)
                             return tabla_actual
             except Exception as e:
                 logger.warning(f"Error obteniendo tabla actual: {e}")
@@ -636,22 +681,17 @@ class LigaMXRealScraper:
             # Intentar obtener datos reales de ESPN México primero
             try:
                 espn_url = "https://www.espn.com.mx/futbol/liga/_/nombre/mex.1/tabla"
-                espn_headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                    'Accept-Language': 'es-MX,es;q=0.9,en;q=0.8',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1'
-                }
-                response = requests.get(espn_url, headers=espn_headers, timeout=10)
+                response = http_fetcher.fetch(self.session, espn_url, source='espn_mx', timeout=10)
+                tabla_memo = http_fetcher.parsed(response, 'tabla_real')
+                if tabla_memo:
+                    return tabla_memo
                 
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.content, 'html.parser')
+                if response.content:
+                    soup = parse_html(response.content, 'tablas')
                     tabla_data = []
                     
                     # Buscar tabla de posiciones en ESPN
-                    tabla_rows = soup.find_all('tr', class_=['Table__TR', 'Table__TR--sm'])
+                    tabla_rows = soup.find_all('tr', class_=ESPN_ROW_CLASSES)
                     
                     for i, row in enumerate(tabla_rows[:18], 1):  # Top 18 equipos
                         cells = row.find_all(['td', 'th'])
@@ -687,6 +727,7 @@ class LigaMXRealScraper:
                     
                     if tabla_data:
                         logger.info(f"✅ ESPN MX Real: {len(tabla_data)} equipos obtenidos desde fuente oficial")
+                        http_fetcher.remember(response, 'tabla_real', tabla_data)
                         return tabla_data
                         
             except Exception as e:
@@ -4,7 +4,6 @@ Incluye múltiples fuentes de datos reales
 """
 
 import requests
-from bs4 import BeautifulSoup
 import json
 import time
 import logging
@@ -12,6 +11,9 @@ from datetime import datetime, timedelta
 from urllib.parse import urljoin, urlparse
 import re
 
+from services.http_client import http_fetcher
+from services.html_parsing import NEWS_CLASS_I, TITLE_CLASS_I, DATE_CLASS_I
+
 logger = logging.getLogger(__name__)
 
 class LigaMXScraper:
@@ -66,10 +68,8 @@ class LigaMXScraper:
         try:
             logger.info("🏆 Scraping tabla desde ESPN...")
             url = self.sources['espn']
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = http_fetcher.fetch_soup(self.session, url, source='espn', timeout=10,
+                                           region='tablas', polite=False)
             
             # Buscar tabla de posiciones
             tabla_data = []
@@ -122,18 +122,16 @@ class LigaMXScraper:
         try:
             logger.info("📰 Scraping noticias desde Mediotiempo...")
             url = self.sources['mediotiempo']
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = http_fetcher.fetch_soup(self.session, url, source='mediotiempo', timeout=10,
+                                           region='noticias_i', polite=False)
             
             noticias = []
             # Buscar artículos de noticias
-            articles = soup.find_all(['article', 'div'], class_=re.compile(r'.*noticia.*|.*article.*|.*news.*', re.I))
+            articles = soup.find_all(['article', 'div'], class_=NEWS_CLASS_I)
             
             for article in articles[:10]:  # Máximo 10 noticias
                 try:
-                    title_elem = article.find(['h1', 'h2', 'h3', 'h4'], class_=re.compile(r'.*title.*|.*titulo.*', re.I))
+                    title_elem = article.find(['h1', 'h2', 'h3', 'h4'], class_=TITLE_CLASS_I)
                     if not title_elem:
                         title_elem = article.find(['h1', 'h2', 'h3', 'h4'])
                     
@@ -148,7 +146,7 @@ class LigaMXScraper:
                         
                         # Buscar fecha
                         fecha = datetime.now().isoformat()
-                        date_elem = article.find(['time', 'span'], class_=re.compile(r'.*date.*|.*fecha.*', re.I))
+                        date_elem = article.find(['time', 'span'], class_=DATE_CLASS_I)
                         if date_elem:
                             fecha_text = date_elem.get_text(strip=True)
                             # Aquí podrías parsear la fecha si es necesario
@@ -177,10 +175,8 @@ class LigaMXScraper:
         try:
             logger.info("📊 Scraping estadísticas desde Futbol Total...")
             url = self.sources['futboltotal']
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = http_fetcher.fetch_soup(self.session, url, source='futboltotal', timeout=10,
+                                           region='tablas', polite=False)
             
             estadisticas = {
                 'goleadores': [],
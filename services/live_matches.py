@@ -0,0 +1,272 @@
+"""
+Motor de partidos en vivo para Panel L3HO
+Consulta las fuentes en segundo plano con intervalo adaptativo y guarda los
+partidos en memoria indexados por id para que los endpoints respondan sin scraping
+"""
+
+import os
+import uuid
+import threading
+import time
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Estados en los que el marcador puede cambiar en cualquier momento
+ESTADOS_ACTIVOS = ('en_vivo', 'medio_tiempo')
+
+# Campos cuyo cambio se publica como delta a los suscriptores
+CAMPOS_DELTA = ('goles_local', 'goles_visitante', 'minuto', 'estado')
+
+
+def resumen_partido(partido: Dict[str, Any]) -> Dict[str, Any]:
+    """Datos de marcador de un partido para el stream en vivo"""
+    return {
+        'id': partido.get('id'),
+        'equipo_local': partido.get('equipo_local'),
+        'equipo_visitante': partido.get('equipo_visitante'),
+        'goles_local': partido.get('goles_local'),
+        'goles_visitante': partido.get('goles_visitante'),
+        'minuto': partido.get('minuto'),
+        'estado': partido.get('estado'),
+        'fecha': partido.get('fecha'),
+        'hora': partido.get('hora')
+    }
+
+
+class LiveMatchEngine:
+    """Sondeo en segundo plano de TransmisionesService con almacén de partidos por id"""
+
+    def __init__(self, live_interval: float = 20.0, idle_interval: float = 300.0,
+                 error_interval: float = 60.0, max_changes: int = 1000):
+        self.live_interval = live_interval
+        self.idle_interval = idle_interval
+        self.error_interval = error_interval
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._matches: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # Registro acotado de cambios; los suscriptores esperan en la condición sin cola propia
+        self._changes: deque = deque(maxlen=max_changes)
+        self._changed = threading.Condition(self._lock)
+        self.sequence = 0
+        self.subscribers = 0
+        self.rejected_subscribers = 0
+        # Época del registro de cambios: las secuencias solo tienen sentido dentro de este proceso
+        self.epoch = uuid.uuid4().hex[:12]
+        self._wakeup = threading.Event()
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self.version = 0
+        self.polls = 0
+        self.errors = 0
+        self.next_poll_at: Optional[float] = None
+        self.last_poll_at: Optional[float] = None
+
+    # ==================== CICLO DE SONDEO ====================
+
+    def start(self) -> None:
+        """Arrancar el hilo de sondeo (una vez por proceso)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # Proceso nuevo (fork de gunicorn): sus secuencias no continúan las del padre
+                self.epoch = uuid.uuid4().hex[:12]
+            self._pid = os.getpid()
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name='live-matches', daemon=True)
+            self._thread.start()
+            logger.info("Motor de partidos en vivo iniciado")
+
+    def poll_now(self) -> None:
+        """Adelantar el siguiente sondeo"""
+        self._wakeup.set()
+
+    def _service(self):
+        from services.registry import get_transmisiones_service
+        return get_transmisiones_service()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                interval = self._poll()
+            except Exception as e:
+                self.errors += 1
+                interval = self.error_interval
+                logger.error(f"Error sondeando partidos en vivo: {e}")
+            finally:
+                self._ready.set()
+
+            self.next_poll_at = time.time() + interval
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+
+    def _poll(self) -> float:
+        """Consultar las fuentes, actualizar el almacén y devolver el intervalo hasta el siguiente sondeo"""
+        snapshot = self._service().get_partidos_en_vivo()
+        self.polls += 1
+        self.last_poll_at = time.time()
+
+        if not snapshot.get('success'):
+            self.errors += 1
+            if self._snapshot is None:
+                self._publish(snapshot, [])
+            return self.error_interval
+
+        partidos = snapshot.get('todos_los_partidos', [])
+        self._publish(snapshot, partidos)
+        return self._next_interval(partidos)
+
+    def _publish(self, snapshot: Dict[str, Any], partidos: List[Dict[str, Any]]) -> None:
+        """Reemplazar el almacén completo de una sola vez (los lectores nunca ven estados a medias)"""
+        matches = {partido['id']: partido for partido in partidos if partido.get('id')}
+        with self._lock:
+            cambios = self._diff(self._matches, matches) if self._snapshot is not None else []
+            self._snapshot = snapshot
+            self._matches = matches
+            self.version += 1
+            for cambio in cambios:
+                self.sequence += 1
+                cambio['seq'] = self.sequence
+                self._changes.append(cambio)
+            if cambios:
+                self._changed.notify_all()
+
+    @staticmethod
+    def _diff(anteriores: Dict[str, Dict[str, Any]], actuales: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cambios de marcador, minuto y estado entre dos almacenes"""
+        cambios = []
+        for partido_id, partido in actuales.items():
+            anterior = anteriores.get(partido_id)
+            if anterior is None:
+                cambios.append({'tipo': 'nuevo', 'id': partido_id, 'partido': resumen_partido(partido)})
+                continue
+            campos = {campo: partido.get(campo) for campo in CAMPOS_DELTA
+                      if partido.get(campo) != anterior.get(campo)}
+            if campos:
+                cambios.append({'tipo': 'cambio', 'id': partido_id, 'cambios': campos})
+        for partido_id in anteriores.keys() - actuales.keys():
+            cambios.append({'tipo': 'eliminado', 'id': partido_id})
+        return cambios
+
+    def _next_interval(self, partidos: List[Dict[str, Any]]) -> float:
+        """Rápido con partidos en juego, lento sin ellos, despertando a la hora del próximo silbatazo"""
+        if any(partido.get('estado') in ESTADOS_ACTIVOS for partido in partidos):
+            return self.live_interval
+
+        interval = self.idle_interval
+        now = datetime.now()
+        for partido in partidos:
+            if partido.get('estado') != 'programado':
+                continue
+            inicio = self._kickoff(partido)
+            if inicio is None:
+                continue
+            faltan = (inicio - now).total_seconds()
+            if faltan <= 0:
+                # Debió empezar: vigilar de cerca hasta que la fuente lo marque en vivo
+                return self.live_interval
+            interval = min(interval, max(faltan, self.live_interval))
+        return interval
+
+    @staticmethod
+    def _kickoff(partido: Dict[str, Any]) -> Optional[datetime]:
+        try:
+            return datetime.strptime(f"{partido['fecha']} {partido['hora']}", '%Y-%m-%d %H:%M')
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    # ==================== LECTURA ====================
+
+    def _ensure_ready(self, timeout: float = 20.0) -> None:
+        """Arrancar el motor y, si aún no hay datos, esperar el primer sondeo"""
+        self.start()
+        if self._snapshot is None:
+            self._ready.wait(timeout)
+
+    def get_snapshot(self) -> Optional[Dict[str, Any]]:
+        """Último resultado completo de get_partidos_en_vivo"""
+        self._ensure_ready()
+        return self._snapshot
+
+    def get_match(self, partido_id: str) -> Optional[Dict[str, Any]]:
+        """Partido por id en O(1)"""
+        self._ensure_ready()
+        return self._matches.get(partido_id)
+
+    def get_matches(self) -> List[Dict[str, Any]]:
+        """Todos los partidos del almacén"""
+        self._ensure_ready()
+        return list(self._matches.values())
+
+    def event_id(self, seq: int) -> str:
+        """Id de evento SSE: época del proceso y secuencia"""
+        return f"{self.epoch}-{seq}"
+
+    def parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Secuencia del Last-Event-ID si pertenece a este proceso; None si hay que enviar el estado completo"""
+        if not event_id:
+            return None
+        epoch, _, seq = event_id.rpartition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            # Id de otro worker o de antes de un reinicio
+            return None
+        seq = int(seq)
+        return seq if seq <= self.sequence else None
+
+    def add_subscriber(self, limit: int) -> bool:
+        """Reservar un lugar de suscriptor del stream; False si ya hay limit en este proceso"""
+        with self._lock:
+            if self.subscribers >= limit:
+                self.rejected_subscribers += 1
+                return False
+            self.subscribers += 1
+            return True
+
+    def remove_subscriber(self) -> None:
+        with self._lock:
+            self.subscribers = max(0, self.subscribers - 1)
+
+    def wait_for_changes(self, after: int, timeout: float) -> Tuple[Optional[List[Dict[str, Any]]], int]:
+        """Esperar cambios posteriores a la secuencia dada
+
+        Devuelve (cambios, última secuencia). Si la secuencia ya salió del registro
+        devuelve (None, última secuencia) y el cliente debe pedir el estado completo.
+        """
+        self.start()
+        with self._changed:
+            if self.sequence <= after:
+                self._changed.wait_for(lambda: self.sequence > after, timeout)
+            if self.sequence <= after:
+                return [], self.sequence
+            primero = self._changes[0]['seq'] if self._changes else self.sequence + 1
+            if after + 1 < primero:
+                return None, self.sequence
+            return [cambio for cambio in self._changes if cambio['seq'] > after], self.sequence
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado del motor: versión, partidos guardados y próximo sondeo"""
+        return {
+            'running': self._thread is not None and self._thread.is_alive(),
+            'version': self.version,
+            'epoch': self.epoch,
+            'subscribers': self.subscribers,
+            'rejected_subscribers': self.rejected_subscribers,
+            'sequence': self.sequence,
+            'partidos': len(self._matches),
+            'en_juego': sum(1 for partido in self._matches.values() if partido.get('estado') in ESTADOS_ACTIVOS),
+            'polls': self.polls,
+            'errors': self.errors,
+            'last_poll_at': datetime.fromtimestamp(self.last_poll_at).isoformat() if self.last_poll_at else None,
+            'next_poll_at': datetime.fromtimestamp(self.next_poll_at).isoformat() if self.next_poll_at else None
+        }
+
+
+# Motor global del proceso (se arranca con la primera lectura)
+live_match_engine = LiveMatchEngine()
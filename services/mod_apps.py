@@ -3,20 +3,21 @@ Servicio de apps modificadas para Panel L3HO - Solo datos reales
 Conectado con APKMirror para obtener información real de aplicaciones
 """
 
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
 import logging
 from typing import Dict, List, Optional, Any
 import re
 
+from services.html_parsing import parse_html
+from services.http_client import build_session
+
 class ModAppsService:
     """Servicio para gestionar apps modificadas con datos reales de APKMirror"""
     
     def __init__(self):
         self.base_url = "https://www.apkmirror.com"
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Sesión con pool de conexiones: el servicio vive en el registro y se reutiliza entre peticiones
+        self.session = build_session({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'es-MX,es;q=0.9,en;q=0.8',
@@ -78,7 +79,7 @@ class ModAppsService:
             if response.status_code != 200:
                 return None
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(response.content, 'apk_post')
             
             # Extraer información básica
             title_element = soup.find('h1', class_='post-title')
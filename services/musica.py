@@ -26,6 +26,11 @@ try:
 except ImportError:
     lyricsgenius = None
 
+from services.single_flight import SingleFlight
+
+# Búsquedas idénticas simultáneas comparten una sola consulta a las APIs
+_flight = SingleFlight('musica')
+
 class MusicService:
     """Servicio profesional de música con múltiples fuentes y descargas automáticas"""
     
@@ -103,6 +108,7 @@ class MusicService:
         except Exception as e:
             self.logger.error(f"Error configurando APIs: {e}")
     
+    @_flight.coalesce()
     def search_songs(self, query: str, limit: int = 20) -> Dict[str, Any]:
         """Buscar canciones por nombre o artista"""
         try:
@@ -169,6 +175,7 @@ class MusicService:
                 'error': f'Error interno: {str(e)}'
             }
     
+    @_flight.coalesce()
     def search_albums(self, query: str, limit: int = 20) -> Dict[str, Any]:
         """Buscar álbumes por título o artista"""
         try:
@@ -219,6 +226,7 @@ class MusicService:
                 'error': f'Error buscando álbumes: {str(e)}'
             }
     
+    @_flight.coalesce()
     def get_top_charts(self, country: str = 'global', chart_type: str = 'tracks', limit: int = 50) -> Dict[str, Any]:
         """Obtener top charts globales o por país"""
         try:
@@ -247,6 +255,7 @@ class MusicService:
                 'error': f'Error obteniendo charts: {str(e)}'
             }
     
+    @_flight.coalesce()
     def get_artist_details(self, artist_name: str) -> Dict[str, Any]:
         """Obtener detalles completos de un artista"""
         try:
@@ -284,6 +293,7 @@ class MusicService:
                 'error': f'Error obteniendo datos del artista: {str(e)}'
             }
     
+    @_flight.coalesce()
     def get_song_lyrics(self, song_title: str, artist_name: str) -> Dict[str, Any]:
         """Obtener letras de una canción"""
         try:
@@ -0,0 +1,120 @@
+"""
+Registro de servicios de Panel L3HO
+Instancias únicas por proceso, creadas de forma perezosa y seguras entre hilos
+"""
+
+import os
+import threading
+import logging
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Singletons de servicios compartidos por todas las peticiones y hilos del worker"""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        # Tras un fork (workers de gunicorn) no se comparten sesiones HTTP con el proceso padre
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        """Registrar la fábrica de un servicio (se ejecuta en el primer get)"""
+        with self._lock:
+            self._factories[name] = factory
+            self._instances.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """Obtener la instancia del servicio, creándola la primera vez"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            instance = self._instances.get(name)
+            if instance is None:
+                factory = self._factories.get(name)
+                if factory is None:
+                    raise KeyError(f"Servicio no registrado: {name}")
+                instance = factory()
+                self._instances[name] = instance
+                logger.info(f"Servicio inicializado: {name}")
+            return instance
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Descartar una instancia (o todas) para que se vuelva a crear"""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+            else:
+                self._instances.pop(name, None)
+
+    def _after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._instances.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Servicios registrados e inicializados"""
+        return {
+            'registered': sorted(self._factories),
+            'initialized': sorted(self._instances)
+        }
+
+
+def _futbol():
+    from services.futbol import FutbolService
+    return FutbolService()
+
+
+def _transmisiones():
+    from services.transmisiones import TransmisionesService
+    return TransmisionesService()
+
+
+def _movies():
+    from services.movies import MoviesService
+    return MoviesService()
+
+
+def _music():
+    from services.music import MusicService
+    return MusicService()
+
+
+def _mod_apps():
+    from services.mod_apps import ModAppsService
+    return ModAppsService()
+
+
+def _liga_mx_data_manager():
+    from services.liga_mx_data_manager import LigaMXDataManager
+    return LigaMXDataManager()
+
+
+# Registro global del proceso
+services = ServiceRegistry()
+services.register('futbol', _futbol)
+services.register('transmisiones', _transmisiones)
+services.register('movies', _movies)
+services.register('music', _music)
+services.register('mod_apps', _mod_apps)
+services.register('liga_mx_data_manager', _liga_mx_data_manager)
+
+
+def get_futbol_service():
+    """FutbolService compartido"""
+    return services.get('futbol')
+
+
+def get_transmisiones_service():
+    """TransmisionesService compartido"""
+    return services.get('transmisiones')
+
+
+def get_liga_mx_data_manager():
+    """LigaMXDataManager compartido"""
+    return services.get('liga_mx_data_manager')
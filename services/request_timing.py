@@ -0,0 +1,64 @@
+"""
+Instrumentación de tiempos por petición para Panel L3HO
+Mide cada petición /api/* y la registra en ApiUsage a través del escritor por lotes
+"""
+
+import time
+import logging
+from typing import Optional
+
+from flask import g, request
+
+from services.api_usage_writer import api_usage_writer
+
+logger = logging.getLogger(__name__)
+
+API_PREFIX = '/api/'
+# Endpoint registrado para peticiones que no coinciden con ninguna ruta
+NO_ROUTE = '<404>'
+
+
+def extract_api_key() -> Optional[str]:
+    """Obtener la API key de la petición en cualquiera de los formatos aceptados"""
+    api_key = request.args.get('key') or request.args.get('api_key') or request.headers.get('X-API-Key')
+    if api_key:
+        return api_key
+
+    authorization = request.headers.get('Authorization', '')
+    if authorization.startswith('Bearer '):
+        return authorization[len('Bearer '):].strip() or None
+    return None
+
+
+def init_request_timing(app) -> None:
+    """Registrar los hooks before_request/after_request que miden las rutas de API"""
+
+    @app.before_request
+    def start_request_timer():
+        if request.path.startswith(API_PREFIX) and request.method != 'OPTIONS':
+            g.request_started_at = time.perf_counter()
+
+    @app.after_request
+    def record_request_timing(response):
+        started_at = g.pop('request_started_at', None)
+        if started_at is None:
+            return response
+
+        elapsed_ms = (time.perf_counter() - started_at) * 1000.0
+        try:
+            # Usar la regla de la ruta para no fragmentar estadísticas por parámetros;
+            # las URLs sin ruta se agrupan para no crear una fila por cada URL inventada
+            endpoint = request.url_rule.rule if request.url_rule else NO_ROUTE
+            # Solo keys autenticadas: una key falsa no debe abrir una dimensión nueva
+            api_user = g.get('api_user')
+            api_usage_writer.record(
+                extract_api_key() if api_user else None,
+                endpoint,
+                api_user.id if api_user else None,
+                request.remote_addr,
+                status_code=response.status_code,
+                response_time=round(elapsed_ms, 3)
+            )
+        except Exception as e:
+            logger.error(f"Error registrando tiempo de petición: {e}")
+        return response
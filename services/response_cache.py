@@ -0,0 +1,200 @@
+"""
+Caché de respuestas JSON pre-serializadas para Panel L3HO
+Guarda los bytes finales por ruta y query string, con ETag fuerte y respuestas 304,
+y junto a ellos las variantes gzip/brotli ya comprimidas
+"""
+
+import hashlib
+import threading
+import time
+import logging
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Optional, Any, Tuple
+
+from flask import current_app, request
+
+from services.compression import choose_encoding, compress, compression_stats, MIN_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """Respuesta ya codificada lista para reenviarse"""
+
+    __slots__ = ('body', 'etag', 'status', 'mimetype', 'group', 'generation', 'expires_at', 'created_at',
+                 'variants')
+
+    def __init__(self, body: bytes, etag: str, status: int, mimetype: str,
+                 group: str, generation: int, expires_at: float):
+        self.body = body
+        self.etag = etag
+        self.status = status
+        self.mimetype = mimetype
+        self.group = group
+        self.generation = generation
+        self.expires_at = expires_at
+        self.created_at = time.time()
+        self.variants: Dict[str, bytes] = {}
+
+    def variant(self, encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Cuerpo en la codificación pedida, comprimido solo la primera vez; (cuerpo, codificación)"""
+        if encoding is None or len(self.body) < MIN_SIZE:
+            return self.body, None
+        body = self.variants.get(encoding)
+        nueva = body is None
+        if nueva:
+            # Dos hilos pueden comprimir a la vez: el resultado es idéntico
+            body = self.variants.setdefault(encoding, compress(self.body, encoding, stored=True))
+        compression_stats.record('cached', encoding, len(self.body), len(body), nueva)
+        return body, encoding
+
+
+class ResponseCache:
+    """Caché LRU en memoria de respuestas JSON agrupadas para invalidación conjunta"""
+
+    def __init__(self, max_entries: int = 512, default_ttl: int = 1800):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: 'OrderedDict[str, CachedResponse]' = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._version_sources: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    # ==================== INVALIDACIÓN ====================
+
+    def invalidate(self, group: Optional[str] = None) -> None:
+        """Invalidar todas las respuestas de un grupo (o todas si no se indica)"""
+        with self._lock:
+            groups = [group] if group else list(self._generations)
+            for name in groups:
+                self._generations[name] = self._generations.get(name, 0) + 1
+            if group is None:
+                self._entries.clear()
+        logger.info(f"Caché de respuestas invalidada: {group or 'todas'}")
+
+    def register_version_source(self, group: str, source: Callable[[], Any], interval: float = 30.0) -> None:
+        """Registrar una marca de versión externa (p. ej. en BD) para detectar cambios hechos por otros procesos"""
+        self._version_sources[group] = {'source': source, 'interval': interval, 'token': None, 'checked_at': 0.0}
+
+    def _check_version_source(self, group: str) -> None:
+        entry = self._version_sources.get(group)
+        if not entry or time.monotonic() - entry['checked_at'] < entry['interval']:
+            return
+        entry['checked_at'] = time.monotonic()
+        try:
+            token = entry['source']()
+        except Exception as e:
+            logger.error(f"Error consultando versión de caché {group}: {e}")
+            return
+        if entry['token'] is not None and token != entry['token']:
+            self.invalidate(group)
+        entry['token'] = token
+
+    # ==================== DECORADOR ====================
+
+    def cached(self, group: str, ttl: Optional[int] = None, max_age: int = 60,
+               vary_headers: Tuple[str, ...] = (), private: bool = False) -> Callable:
+        """Decorador para vistas JSON: sirve bytes guardados y responde 304 si el ETag coincide
+
+        private=True para respuestas por usuario (API key en la URL): los proxies no deben compartirlas.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                self._check_version_source(group)
+                key = self._make_key(vary_headers)
+                entry = self._get(key, group)
+
+                if entry is None:
+                    response = current_app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed or response.mimetype != 'application/json':
+                        return response
+                    entry = self._store(key, group, response, ttl or self.default_ttl)
+                    cache_status = 'MISS'
+                else:
+                    cache_status = 'HIT'
+
+                return self._build_response(entry, cache_status, max_age, vary_headers, private)
+            return wrapper
+        return decorator
+
+    def _build_response(self, entry: CachedResponse, cache_status: str, max_age: int,
+                        vary_headers: Tuple[str, ...], private: bool = False):
+        """Construir la respuesta final (200 con cuerpo o 304 sin cuerpo)"""
+        encoding = choose_encoding() if len(entry.body) >= MIN_SIZE else None
+        etag = f'{entry.etag}-{encoding}' if encoding else entry.etag
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            self.not_modified += 1
+        else:
+            body, encoding = entry.variant(encoding)
+            response = current_app.response_class(body, status=entry.status, mimetype=entry.mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = f"{'private' if private else 'public'}, max-age={max_age}"
+        response.headers['X-Cache'] = cache_status
+        for header in vary_headers:
+            response.vary.add(header)
+        return response
+
+    # ==================== ALMACENAMIENTO ====================
+
+    @staticmethod
+    def _make_key(vary_headers: Tuple[str, ...]) -> str:
+        """Clave por ruta, query string ordenado y cabeceras que alteran la respuesta"""
+        query = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        key = f'{request.path}?{query}'
+        for header in vary_headers:
+            key += f'|{header}={request.headers.get(header, "")}'
+        return key
+
+    def _get(self, key: str, group: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.generation != self._generations.get(group, 0) or time.monotonic() >= entry.expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _store(self, key: str, group: str, response, ttl: int) -> CachedResponse:
+        body = response.get_data()
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        with self._lock:
+            entry = CachedResponse(body, etag, response.status_code, response.mimetype, group,
+                                   self._generations.get(group, 0), time.monotonic() + ttl)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas del caché de respuestas"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': sum(len(entry.body) for entry in self._entries.values()),
+                'compressed_bytes': sum(len(body) for entry in self._entries.values()
+                                        for body in entry.variants.values()),
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+                'generations': dict(self._generations)
+            }
+
+
+# Instancia global del caché de respuestas
+response_cache = ResponseCache()
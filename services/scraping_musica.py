@@ -3,7 +3,6 @@ Sistema de scraping profesional para música - Panel L3HO
 Extracción de datos reales de múltiples fuentes sin dependencia de APIs oficiales
 """
 
-import requests
 import os
 import json
 import time
@@ -14,10 +13,16 @@ import hashlib
 from urllib.parse import urljoin, urlparse, quote_plus
 import yt_dlp
 from pydub import AudioSegment
-from bs4 import BeautifulSoup
 import re
 import random
 
+from services.html_parsing import parse_html
+from services.http_client import build_session
+from services.single_flight import SingleFlight
+
+# Búsquedas idénticas simultáneas comparten un solo scraping
+_flight = SingleFlight('scraping_musica')
+
 class MusicScrapingService:
     """Servicio de scraping profesional para música con múltiples fuentes"""
     
@@ -75,19 +80,20 @@ class MusicScrapingService:
             }
         }
         
-        # Headers para evitar detección
-        self.headers = {
+        # Sesión con pool de conexiones y headers para evitar detección: las instancias viven a nivel de módulo
+        self.session = build_session({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'es-ES,es;q=0.5',
             'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive',
-        }
+        })
         
         # Configurar logging
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
     
+    @_flight.coalesce()
     def search_songs(self, query: str, limit: int = 20) -> Dict[str, Any]:
         """Buscar canciones usando scraping de múltiples fuentes"""
         try:
@@ -159,6 +165,7 @@ class MusicScrapingService:
                 'error': f'Error interno: {str(e)}'
             }
     
+    @_flight.coalesce()
     def search_albums(self, query: str, limit: int = 20) -> Dict[str, Any]:
         """Buscar álbumes usando scraping"""
         try:
@@ -219,6 +226,7 @@ class MusicScrapingService:
                 'error': f'Error buscando álbumes: {str(e)}'
             }
     
+    @_flight.coalesce()
     def get_top_charts(self, country: str = 'global', limit: int = 50) -> Dict[str, Any]:
         """Obtener top charts por scraping"""
         try:
@@ -268,6 +276,7 @@ class MusicScrapingService:
                 'error': f'Error obteniendo charts: {str(e)}'
             }
     
+    @_flight.coalesce()
     def get_song_lyrics(self, song_title: str, artist_name: str) -> Dict[str, Any]:
         """Obtener letras por scraping"""
         try:
@@ -425,11 +434,11 @@ class MusicScrapingService:
             search_url = "https://soundcloud.com/search/sounds"
             params = {'q': query}
             
-            response = requests.get(search_url, params=params, headers=self.headers, timeout=10)
+            response = self.session.get(search_url, params=params, timeout=10)
             response.raise_for_status()
             
             # Buscar datos JSON embebidos en la página
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(response.content, 'scripts')
             scripts = soup.find_all('script')
             
             songs = []
@@ -489,7 +498,7 @@ class MusicScrapingService:
                 'include': 'musicinfo+licenses+stats'
             }
             
-            response = requests.get(api_url, params=params, headers=self.headers, timeout=10)
+            response = self.session.get(api_url, params=params, timeout=10)
             response.raise_for_status()
             data = response.json()
             
@@ -523,10 +532,10 @@ class MusicScrapingService:
             search_url = "https://www.audiomack.com/search"
             params = {'q': query}
             
-            response = requests.get(search_url, params=params, headers=self.headers, timeout=10)
+            response = self.session.get(search_url, params=params, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(response.content, 'audiomack_items')
             
             songs = []
             # Buscar elementos de canciones en la página
@@ -566,10 +575,10 @@ class MusicScrapingService:
             search_url = "https://bandcamp.com/search"
             params = {'q': query, 'item_type': 't'}  # 't' para tracks
             
-            response = requests.get(search_url, params=params, headers=self.headers, timeout=10)
+            response = self.session.get(search_url, params=params, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(response.content, 'bandcamp_resultados')
             
             songs = []
             # Buscar elementos de resultados
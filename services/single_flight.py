@@ -0,0 +1,114 @@
+"""
+Coalescencia de peticiones (single-flight) para Panel L3HO
+Llamadas concurrentes con la misma clave esperan una sola descarga y comparten su resultado
+"""
+
+import threading
+import logging
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Todas las instancias del proceso, para reportar sus contadores juntos
+_flights: List['SingleFlight'] = []
+_flights_lock = threading.Lock()
+
+
+class _Call:
+    """Llamada en curso: el primero la ejecuta, el resto espera el evento"""
+
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Ejecuta como máximo una llamada por clave a la vez; las demás reciben el mismo resultado
+
+    El resultado se comparte entre todos los que esperaban: debe tratarse como solo lectura.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Any, _Call] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        with _flights_lock:
+            _flights.append(self)
+
+    def do(self, key: Any, fn: Callable, *args, **kwargs) -> Any:
+        """Ejecutar fn(*args, **kwargs) o unirse a la ejecución en curso con la misma clave"""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self, key: Any) -> bool:
+        """Indicar si hay una ejecución en curso para la clave"""
+        with self._lock:
+            return key in self._calls
+
+    def coalesce(self, key_func: Optional[Callable[..., Any]] = None) -> Callable:
+        """Decorador: coalescer llamadas concurrentes con los mismos argumentos"""
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if key_func is not None:
+                    key = key_func(*args, **kwargs)
+                else:
+                    key = (fn.__qualname__, args, tuple(sorted(kwargs.items())))
+                return self.do(key, fn, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    def get_stats(self) -> Dict[str, int]:
+        """Contadores de llamadas, ejecuciones reales y llamadas coalescidas"""
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'errors': self.errors,
+                'in_flight': len(self._calls)
+            }
+
+
+def single_flight_stats() -> Dict[str, Dict[str, int]]:
+    """Contadores de todas las instancias de SingleFlight del proceso"""
+    with _flights_lock:
+        flights = list(_flights)
+    return {flight.name: flight.get_stats() for flight in flights}
@@ -0,0 +1,137 @@
+"""
+Caché stale-while-revalidate para resultados de scraping de Panel L3HO
+Sirve el último resultado bueno al instante y lo refresca en segundo plano
+con una sola descarga a la vez por clave
+"""
+
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """Valor guardado, momento en que se obtuvo y hasta cuándo se considera fresco (reloj monotónico)"""
+
+    __slots__ = ('value', 'fetched_at', 'fresh_until', 'good')
+
+    def __init__(self, value: Any, fetched_at: float, fresh_until: float, good: bool):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.fresh_until = fresh_until
+        self.good = good
+
+
+class StaleWhileRevalidateCache:
+    """Caché por clave con frescura, margen de datos viejos y refresco único en segundo plano"""
+
+    def __init__(self, name: str, fresh_ttl: float = 300, max_stale: float = 6 * 3600,
+                 retry_after: float = 30):
+        self.name = name
+        self.fresh_ttl = fresh_ttl
+        self.max_stale = max_stale
+        self.retry_after = retry_after
+        self._entries: Dict[str, _Entry] = {}
+        self._refreshing: Set[str] = set()
+        self._flight = SingleFlight(f'swr:{name}')
+        self._lock = threading.Lock()
+        self._stats = {'fresh_hits': 0, 'stale_hits': 0, 'loads': 0, 'refreshes': 0, 'failures': 0}
+
+    def get(self, key: str, loader: Callable[[], Any],
+            is_valid: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, float]:
+        """Devolver (valor, edad en segundos); solo bloquea si no hay nada utilizable
+
+        Si la carga en frío falla, el error se comparte con todos los que esperaban
+        (o se devuelve la copia vieja que haya): nunca se repite la descarga por petición.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.fetched_at
+                if now < entry.fresh_until:
+                    self._stats['fresh_hits'] += 1
+                    return entry.value, age
+                if age < self.max_stale:
+                    self._stats['stale_hits'] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, loader, is_valid),
+                                         name=f'swr-{self.name}', daemon=True).start()
+                    return entry.value, age
+
+        # Sin copia utilizable: una sola carga, el resto espera su resultado (o su error)
+        try:
+            self._flight.do(key, self._load, key, loader, is_valid, True)
+        except Exception:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry is None:
+                raise
+            return entry.value, time.monotonic() - entry.fetched_at
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            # Se unió a un refresco en segundo plano que falló y la clave se invalidó mientras tanto
+            raise LookupError(f"Caché {self.name}: sin resultado para {key}")
+        return entry.value, time.monotonic() - entry.fetched_at
+
+    def _load(self, key: str, loader: Callable[[], Any], is_valid: Optional[Callable[[Any], bool]],
+              raise_errors: bool = False) -> None:
+        """Ejecutar el cargador y publicar el resultado (raise_errors: propagar el error a quien espera)"""
+        try:
+            value = loader()
+            good = is_valid(value) if is_valid else True
+            now = time.monotonic()
+            with self._lock:
+                self._stats['loads'] += 1
+                previous = self._entries.get(key)
+                if good:
+                    self._entries[key] = _Entry(value, now, now + self.fresh_ttl, True)
+                elif previous is None or not previous.good:
+                    self._entries[key] = _Entry(value, now, now + self.retry_after, False)
+                else:
+                    # Conservar el último resultado bueno y reintentar más tarde
+                    previous.fresh_until = now + self.retry_after
+                if not good:
+                    self._stats['failures'] += 1
+            if not good:
+                logger.warning(f"Caché {self.name}: resultado no válido para {key}, se reintentará en {self.retry_after}s")
+        except Exception as e:
+            with self._lock:
+                self._stats['failures'] += 1
+                previous = self._entries.get(key)
+                if previous is not None:
+                    previous.fresh_until = time.monotonic() + self.retry_after
+            logger.error(f"Caché {self.name}: error cargando {key}: {e}")
+            if raise_errors:
+                raise
+
+    def _refresh(self, key: str, loader: Callable[[], Any], is_valid: Optional[Callable[[Any], bool]]) -> None:
+        with self._lock:
+            self._stats['refreshes'] += 1
+        try:
+            self._flight.do(key, self._load, key, loader, is_valid)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        """Descartar una clave (o todas)"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de aciertos frescos, viejos y recargas"""
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), refreshing=len(self._refreshing))
+        stats['coalesced'] = self._flight.get_stats()['coalesced']
+        return stats
@@ -4,22 +4,29 @@ API completa de partidos en tiempo real con datos de múltiples fuentes
 Fuentes: Liga MX Oficial, ESPN México, OneFootball, Google Sports
 """
 
-import requests
-from bs4 import BeautifulSoup
 import json
-import re
 from datetime import datetime, timedelta
 import logging
 from urllib.parse import urljoin, urlparse
 import time
 from typing import Dict, List, Optional, Any
 
+from services.http_client import build_session, http_fetcher
+from services.html_parsing import (ESPN_MATCH_CLASS, MATCH_CLASS, TEAM_CLASS, SCORE_CLASS, STATUS_CLASS,
+                                   MINUTE_PATTERN, VS_PATTERN, SCORE_PATTERN)
+from services.single_flight import SingleFlight
+from services.live_matches import live_match_engine
+
+# Las peticiones simultáneas a /api/transmisiones comparten un solo scraping
+_flight = SingleFlight('transmisiones')
+
+
 class TransmisionesService:
     """Servicio completo para transmisiones en vivo de Liga MX"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+        # Sesión con pool de conexiones: el servicio vive en el registro y se reutiliza entre peticiones
+        self.session = build_session({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
             'Accept-Language': 'es-MX,es;q=0.9,en;q=0.8',
@@ -48,6 +55,7 @@ class TransmisionesService:
             'claro_sports': 'Claro Sports'
         }
     
+    @_flight.coalesce()
     def get_partidos_en_vivo(self) -> Dict[str, Any]:
         """Obtiene todos los partidos en vivo con datos reales"""
         try:
@@ -95,20 +103,16 @@ class TransmisionesService:
     def get_detalle_partido(self, partido_id: str) -> Dict[str, Any]:
         """Obtiene detalles completos de un partido específico"""
         try:
-            # Buscar el partido en los datos en vivo
-            partidos = self.get_partidos_en_vivo()
+            # Buscar el partido en el almacén del motor en vivo (sin volver a scrapear)
+            partidos = live_match_engine.get_snapshot()
             
-            if not partidos.get('success'):
+            if not partidos or not partidos.get('success'):
                 return {
                     'success': False,
                     'error': 'No se pueden obtener datos de partidos'
                 }
             
-            partido_encontrado = None
-            for partido in partidos['todos_los_partidos']:
-                if partido.get('id') == partido_id:
-                    partido_encontrado = partido
-                    break
+            partido_encontrado = live_match_engine.get_match(partido_id)
             
             if not partido_encontrado:
                 return {
@@ -142,14 +146,12 @@ class TransmisionesService:
     def _get_partidos_espn_vivo(self) -> List[Dict[str, Any]]:
         """Obtiene partidos en vivo desde ESPN México"""
         try:
-            response = self.session.get(self.urls['espn_en_vivo'], timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = http_fetcher.fetch_soup(self.session, self.urls['espn_en_vivo'], source='espn_en_vivo',
+                                           timeout=15, region='espn_partidos', polite=False)
             partidos = []
             
             # Buscar contenedores de partidos en vivo
-            match_containers = soup.find_all('div', class_=re.compile(r'Table|ScoreCell|MatchInfo'))
+            match_containers = soup.find_all('div', class_=ESPN_MATCH_CLASS)
             
             for container in match_containers:
                 try:
@@ -169,14 +171,12 @@ class TransmisionesService:
     def _get_partidos_ligamx_vivo(self) -> List[Dict[str, Any]]:
         """Obtiene partidos en vivo desde Liga MX oficial"""
         try:
-            response = self.session.get(self.urls['ligamx_en_vivo'], timeout=15)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = http_fetcher.fetch_soup(self.session, self.urls['ligamx_en_vivo'], source='ligamx_en_vivo',
+                                           timeout=15, region='partidos', polite=False)
             partidos = []
             
             # Buscar elementos de partidos en vivo
-            match_elements = soup.find_all(['div', 'article'], class_=re.compile(r'match|partido|game'))
+            match_elements = soup.find_all(['div', 'article'], class_=MATCH_CLASS)
             
             for element in match_elements:
                 try:
@@ -197,7 +197,7 @@ class TransmisionesService:
         """Extrae datos de un partido desde ESPN"""
         try:
             # Buscar equipos
-            team_elements = container.find_all(['span', 'div'], class_=re.compile(r'team|equipo'))
+            team_elements = container.find_all(['span', 'div'], class_=TEAM_CLASS)
             if len(team_elements) < 2:
                 return None
             
@@ -205,7 +205,7 @@ class TransmisionesService:
             equipo_visitante = self._clean_team_name(team_elements[1].get_text(strip=True))
             
             # Buscar marcador
-            score_elements = container.find_all(['span', 'div'], class_=re.compile(r'score|marcador'))
+            score_elements = container.find_all(['span', 'div'], class_=SCORE_CLASS)
             goles_local = 0
             goles_visitante = 0
             
@@ -217,7 +217,7 @@ class TransmisionesService:
                     pass
             
             # Buscar estado del partido
-            status_element = container.find(['span', 'div'], class_=re.compile(r'status|estado|time'))
+            status_element = container.find(['span', 'div'], class_=STATUS_CLASS)
             estado = 'programado'
             minuto = None
             
@@ -226,7 +226,7 @@ class TransmisionesService:
                 if 'vivo' in status_text or 'live' in status_text:
                     estado = 'en_vivo'
                     # Extraer minuto si está disponible
-                    minuto_match = re.search(r"(\d+)'", status_text)
+                    minuto_match = MINUTE_PATTERN.search(status_text)
                     if minuto_match:
                         minuto = int(minuto_match.group(1))
                 elif 'medio tiempo' in status_text or 'halftime' in status_text:
@@ -264,8 +264,7 @@ class TransmisionesService:
             text_content = element.get_text()
             
             # Buscar patrones de equipos vs equipos
-            vs_pattern = r'([A-Za-záéíóúñ\s]+)\s+vs?\s+([A-Za-záéíóúñ\s]+)'
-            match = re.search(vs_pattern, text_content)
+            match = VS_PATTERN.search(text_content)
             
             if not match:
                 return None
@@ -274,8 +273,7 @@ class TransmisionesService:
             equipo_visitante = self._clean_team_name(match.group(2))
             
             # Buscar marcador
-            score_pattern = r'(\d+)\s*-\s*(\d+)'
-            score_match = re.search(score_pattern, text_content)
+            score_match = SCORE_PATTERN.search(text_content)
             
             goles_local = 0
             goles_visitante = 0
@@ -0,0 +1,154 @@
+"""
+Caché en memoria con expiración por entrada para Panel L3HO
+TTL por clave, límite de entradas (se descarta la usada hace más tiempo) y
+estadísticas mantenidas en cada operación, sin recorrer las claves.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """Diccionario con TTL por entrada, expiración perezosa y periódica, y máximo de entradas
+
+    Las entradas vencidas se eliminan al leerlas y, cada purge_interval segundos, en la
+    siguiente operación: un heap ordenado por vencimiento evita revisar las vigentes.
+    """
+
+    def __init__(self, max_entries: int = 512, default_ttl: float = 300, purge_interval: float = 30,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.purge_interval = purge_interval
+        self._clock = clock
+        # clave -> (valor, vence, secuencia); la secuencia identifica la entrada vigente en el heap
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, float, int]]' = OrderedDict()
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._next_purge = clock() + purge_interval
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Valor vigente de la clave (se marca como usada recientemente)"""
+        with self._lock:
+            now = self._clock()
+            self._maybe_purge(now)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if now >= entry[1]:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Guardar un valor por ttl segundos (default_ttl si no se indica)"""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            self._maybe_purge(now)
+            expires_at = now + (self.default_ttl if ttl is None else ttl)
+            seq = next(self._seq)
+            self._entries[key] = (value, expires_at, seq)
+            self._entries.move_to_end(key)
+            heapq.heappush(self._heap, (expires_at, seq, key))
+            self.sets += 1
+
+            if len(self._entries) > self.max_entries:
+                # Primero las vencidas; si no alcanza, la usada hace más tiempo
+                self._purge(now)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._compact()
+
+    def delete(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._heap.clear()
+
+    def ttl(self, key: Hashable) -> Optional[float]:
+        """Segundos que le quedan a la clave (None si no existe o ya venció)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            restante = entry[1] - self._clock()
+            return restante if restante > 0 else None
+
+    def keys(self) -> List[Hashable]:
+        """Claves vigentes, de la usada hace más tiempo a la más reciente"""
+        with self._lock:
+            self._purge(self._clock())
+            return list(self._entries)
+
+    def purge_expired(self) -> int:
+        """Eliminar ya las entradas vencidas; devuelve cuántas"""
+        with self._lock:
+            return self._purge(self._clock())
+
+    def __len__(self) -> int:
+        """Entradas vigentes (se purgan antes las vencidas)"""
+        with self._lock:
+            self._purge(self._clock())
+            return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.ttl(key) is not None
+
+    def _maybe_purge(self, now: float) -> None:
+        if now >= self._next_purge:
+            self._purge(now)
+
+    def _purge(self, now: float) -> int:
+        eliminadas = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, seq, key = heapq.heappop(heap)
+            entry = self._entries.get(key)
+            # Entradas reemplazadas o ya eliminadas dejan registros obsoletos en el heap
+            if entry is not None and entry[2] == seq:
+                del self._entries[key]
+                eliminadas += 1
+        self.expirations += eliminadas
+        self._next_purge = now + self.purge_interval
+        return eliminadas
+
+    def _compact(self) -> None:
+        self._heap = [(expires_at, seq, key) for key, (_, expires_at, seq) in self._entries.items()]
+        heapq.heapify(self._heap)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'default_ttl': self.default_ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / consultas, 3) if consultas else 0.0,
+                'sets': self.sets,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
@@ -6,21 +6,114 @@ import os
 import json
 import hashlib
 import time
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
+from typing import Callable, Dict, List, Optional, Any, Tuple, Union
 import requests
 from pydub import AudioSegment
 import logging
 
+from services.cache_backends import CacheBackend, DiskBackend, configured_backend, create_backend
+from services.single_flight import SingleFlight
+
+class MemoryLRU:
+    """Caché LRU en memoria limitado por número de entradas y por bytes"""
+    
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: 'OrderedDict[str, Tuple[Any, float, int]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Valor guardado si no ha expirado (se marca como usado recientemente)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if time.time() >= expires_at:
+                del self._entries[key]
+                self._bytes -= size
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: str, value: Any, expires_at: float, size: int) -> None:
+        """Guardar un valor; size es el tamaño serializado usado para el límite de bytes"""
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._entries[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+    
+    def discard(self, predicate: Callable[[str], bool]) -> int:
+        """Eliminar las claves que cumplan la condición"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._bytes -= self._entries.pop(key)[2]
+            return len(keys)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expired': self.expired
+            }
+
+def _resultado_exitoso(result: Any) -> bool:
+    return isinstance(result, dict) and bool(result.get('success'))
+
 class CacheManager:
-    """Gestor de caché para optimizar descargas y consultas"""
+    """Gestor de caché para optimizar descargas y consultas
+    
+    Dos niveles: LRU en memoria delante de un backend configurable (CACHE_BACKEND):
+    disco compartido por los procesos de la máquina, redis compartido por todos los
+    workers y el actualizador, o memoria del proceso. Cada entrada se guarda como
+    sobre JSON compacto {"_envelope": 1, "cached_at": ..., "data": ...}.
+    """
     
-    def __init__(self, cache_dir: str = "cache"):
+    def __init__(self, cache_dir: str = "cache", memory_entries: int = 256,
+                 memory_bytes: int = 32 * 1024 * 1024, memory_ttl: float = 60,
+                 disk_bytes: int = 256 * 1024 * 1024, backend: Optional[CacheBackend] = None):
         self.cache_dir = cache_dir
         self.cache_duration = 86400  # 24 horas por defecto
-        
-        # Crear directorio de caché si no existe
-        os.makedirs(cache_dir, exist_ok=True)
+        if backend is None:
+            nombre = configured_backend()
+            backend = (DiskBackend('cache_manager', cache_dir, default_ttl=self.cache_duration, max_bytes=disk_bytes)
+                       if nombre == 'disk' else create_backend('cache_manager', nombre))
+        self.backend = backend
+        # Los otros workers solo ven el backend: una limpieza allí se refleja aquí en memory_ttl segundos.
+        # Con el backend en memoria el nivel LRU sería una copia duplicada del mismo proceso
+        self.memory_ttl = memory_ttl
+        self.memory = MemoryLRU(memory_entries if backend.shared else 0, memory_bytes)
+        self.backend_stats = {'errors': 0}
+        self.fill_stats = {'fills': 0, 'filled_elsewhere': 0, 'lock_timeouts': 0}
+        self._fills = SingleFlight('cache_manager')
         
         # Configurar logging
         self.logger = logging.getLogger(__name__)
@@ -32,59 +125,102 @@ class CacheManager:
         return hashlib.md5(data.encode()).hexdigest()
     
     def get_cached_data(self, cache_key: str) -> Optional[Dict[str, Any]]:
-        """Obtener datos del caché si están válidos"""
+        """Obtener datos del caché si están válidos
+        
+        Devuelve una copia superficial: el llamador puede agregar o cambiar claves
+        de primer nivel, pero no debe modificar objetos anidados.
+        """
+        cached_data = self.memory.get(cache_key)
+        if cached_data is not None:
+            return dict(cached_data)
+        
         try:
-            cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-            
-            if not os.path.exists(cache_file):
+            raw = self.backend.get(cache_key)
+            if raw is None:
                 return None
+            cached_data = self._unwrap(json.loads(raw))
             
-            # Verificar si el caché ha expirado
-            file_age = time.time() - os.path.getmtime(cache_file)
-            if file_age > self.cache_duration:
-                os.remove(cache_file)
-                return None
-            
-            # Cargar datos
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                cached_data = json.load(f)
-            
+            self.memory.set(cache_key, cached_data, time.time() + self.memory_ttl, len(raw))
             self.logger.debug(f"Cache hit para clave: {cache_key}")
-            return cached_data
+            return dict(cached_data)
             
         except Exception as e:
+            self.backend_stats['errors'] += 1
             self.logger.warning(f"Error leyendo caché {cache_key}: {e}")
             return None
     
+    @staticmethod
+    def _unwrap(stored: Any) -> Any:
+        """Datos del sobre con _cached_at como clave de primer nivel (archivos anteriores ya la traen)"""
+        if isinstance(stored, dict) and stored.get('_envelope') == 1:
+            data = stored['data']
+            if isinstance(data, dict):
+                return dict(data, _cached_at=stored['cached_at'])
+            return data
+        return stored
+    
     def cache_data(self, cache_key: str, data: Dict[str, Any]) -> bool:
-        """Guardar datos en caché"""
+        """Guardar datos en caché (el diccionario recibido no se modifica)"""
         try:
-            cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
+            cached_at = datetime.now().isoformat()
             
-            # Agregar timestamp
-            data['_cached_at'] = datetime.now().isoformat()
-            
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            # JSON compacto en un sobre; el backend de disco escribe con temporal + rename
+            envelope = {'_envelope': 1, 'cached_at': cached_at, 'data': data}
+            raw = json.dumps(envelope, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            self.backend.set(cache_key, raw, self.cache_duration)
             
+            # Copia propia: el llamador sigue modificando su diccionario después de guardarlo
+            self.memory.set(cache_key, dict(data, _cached_at=cached_at),
+                            time.time() + self.memory_ttl, len(raw))
             self.logger.debug(f"Datos guardados en caché: {cache_key}")
             return True
             
         except Exception as e:
+            self.backend_stats['errors'] += 1
             self.logger.error(f"Error guardando en caché {cache_key}: {e}")
             return False
     
+    def get_or_fill(self, cache_key: str, loader: Callable[[], Dict[str, Any]],
+                    should_cache: Callable[[Any], bool] = _resultado_exitoso,
+                    lock_timeout: float = 30.0) -> Tuple[Dict[str, Any], bool]:
+        """Obtener del caché o ejecutar loader una sola vez por clave entre hilos y workers
+        
+        Devuelve (datos, True si vinieron del caché). Los datos son una copia superficial propia.
+        """
+        cached_data = self.get_cached_data(cache_key)
+        if cached_data is not None:
+            return cached_data, True
+        
+        # Hilos del proceso: SingleFlight; otros workers: lock del backend por clave
+        result, from_cache = self._fills.do(cache_key, self._fill, cache_key, loader, should_cache, lock_timeout)
+        return dict(result) if isinstance(result, dict) else result, from_cache
+    
+    def _fill(self, cache_key: str, loader: Callable[[], Dict[str, Any]],
+              should_cache: Callable[[Any], bool], lock_timeout: float) -> Tuple[Any, bool]:
+        with self.backend.lock(cache_key, lock_timeout) as bloqueado:
+            if not bloqueado:
+                self.fill_stats['lock_timeouts'] += 1
+            
+            # Otro worker pudo llenarla mientras se esperaba el lock
+            cached_data = self.get_cached_data(cache_key)
+            if cached_data is not None:
+                self.fill_stats['filled_elsewhere'] += 1
+                return cached_data, True
+            
+            result = loader()
+            self.fill_stats['fills'] += 1
+            if should_cache(result):
+                self.cache_data(cache_key, result)
+            return result, False
+    
     def clear_cache(self, pattern: Optional[str] = None) -> int:
-        """Limpiar caché (todo o por patrón)"""
-        cleared = 0
+        """Limpiar caché (todo o por patrón) en memoria y en el backend"""
         try:
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.json'):
-                    if pattern is None or pattern in filename:
-                        os.remove(os.path.join(self.cache_dir, filename))
-                        cleared += 1
+            coincide = lambda key: pattern is None or pattern in f"{key}.json"
+            self.memory.discard(coincide)
+            cleared = self.backend.clear(coincide)
             
-            self.logger.info(f"Caché limpiado: {cleared} archivos eliminados")
+            self.logger.info(f"Caché limpiado: {cleared} entradas eliminadas")
             return cleared
             
         except Exception as e:
@@ -92,33 +228,21 @@ class CacheManager:
             return 0
     
     def get_cache_stats(self) -> Dict[str, Any]:
-        """Obtener estadísticas del caché"""
+        """Obtener estadísticas del caché (desde el backend, sin recorrer el directorio)"""
         try:
-            total_files = 0
-            total_size = 0
-            oldest_file = None
-            newest_file = None
-            
-            for filename in os.listdir(self.cache_dir):
-                if filename.endswith('.json'):
-                    file_path = os.path.join(self.cache_dir, filename)
-                    file_stat = os.stat(file_path)
-                    
-                    total_files += 1
-                    total_size += file_stat.st_size
-                    
-                    if oldest_file is None or file_stat.st_mtime < oldest_file:
-                        oldest_file = file_stat.st_mtime
-                    
-                    if newest_file is None or file_stat.st_mtime > newest_file:
-                        newest_file = file_stat.st_mtime
-            
+            backend = self.backend.get_stats()
             return {
-                'total_files': total_files,
-                'total_size_mb': round(total_size / (1024 * 1024), 2),
-                'oldest_cache': datetime.fromtimestamp(oldest_file).isoformat() if oldest_file else None,
-                'newest_cache': datetime.fromtimestamp(newest_file).isoformat() if newest_file else None,
-                'cache_duration_hours': self.cache_duration / 3600
+                'backend': self.backend.name,
+                'total_files': backend['entries'],
+                'total_size_mb': round(backend.get('total_bytes', 0) / (1024 * 1024), 2),
+                'oldest_cache': backend.get('oldest'),
+                'newest_cache': backend.get('newest'),
+                'cache_duration_hours': self.cache_duration / 3600,
+                'tiers': {
+                    'memory': self.memory.get_stats(),
+                    self.backend.name: dict(backend, errors=backend['errors'] + self.backend_stats['errors'])
+                },
+                'fills': dict(self.fill_stats, coalesced=self._fills.get_stats()['coalesced'])
             }
             
         except Exception as e: